@@ -1,10 +1,9 @@
 from __future__ import print_function, division
 import os
-from collections import OrderedDict
+import re
+from collections import OrderedDict, MutableMapping
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.dates import DateFormatter
 from .building import Building
 from .datastore.datastore import join_key
 from .utils import get_datastore
@@ -14,9 +13,10 @@ class DataSet(object):
     """
     Attributes
     ----------
-    buildings : OrderedDict
+    buildings : Buildings (or OrderedDict if there is no store)
         Each key is an integer, starting from 1.
-        Each value is a nilmtk.Building object.
+        Each value is a nilmtk.Building object.  Each building's metadata
+        is only loaded the first time the building is accessed.
 
     store : nilmtk.DataStore
 
@@ -27,7 +27,7 @@ class DataSet(object):
         See http://nilm-metadata.readthedocs.org/en/latest/dataset_metadata.html#dataset
     """
 
-    def __init__(self, filename=None, format='HDF'):
+    def __init__(self, filename=None, format='HDF', buildings=None):
         """
         Parameters
         ----------
@@ -36,36 +36,36 @@ class DataSet(object):
         
         format : str
             format of output. Either 'HDF' or 'CSV'. Defaults to 'HDF'
+
+        buildings : list of ints, optional
+            Building instances to use.  If not specified then use all
+            buildings in the data set.
         """
         self.store = None
         self.buildings = OrderedDict()
         self.metadata = {}
         if filename is not None:
-            self.import_metadata(get_datastore(filename, format))
+            self.import_metadata(get_datastore(filename, format), buildings)
         
-    def import_metadata(self, store):
+    def import_metadata(self, store, buildings=None):
         """
         Parameters
         ----------
         store : nilmtk.DataStore
+        buildings : list of ints, optional
+            see `__init__`
         """
         self.store = store
         self.metadata = store.load_metadata()
-        self._init_buildings(store)
+        self._init_buildings(store, buildings)
         return self
         
     def save(self, destination):
         for b_id, building in self.buildings.iteritems():
             building.save(destination, '/building' + str(b_id))
 
-    def _init_buildings(self, store):
-        buildings = store.elements_below_key('/')
-        buildings.sort()
-
-        for b_key in buildings:
-            building = Building()
-            building.import_metadata(store, '/'+b_key, self.metadata.get('name'))
-            self.buildings[building.identifier.instance] = building
+    def _init_buildings(self, store, instances=None):
+        self.buildings = Buildings(store, self.metadata.get('name'), instances)
 
     def set_window(self, start=None, end=None):
         """Set the timeframe window on self.store. Used for setting the 
@@ -106,6 +106,7 @@ class DataSet(object):
         -------
         axes : list of axes
         """
+        import matplotlib.pyplot as plt
         n = len(self.buildings)
         if axes is None:
             n_meters_per_building = [len(elec.all_meters()) 
@@ -141,6 +142,7 @@ class DataSet(object):
             elec.clear_cache()
 
     def plot_mains_power_histograms(self, axes=None, **kwargs):
+        import matplotlib.pyplot as plt
         n = len(self.buildings)
         if axes is None:
             fig, axes = plt.subplots(n, 1, sharex=True)
@@ -150,3 +152,98 @@ class DataSet(object):
             ax = elec.mains().plot_power_histogram(ax=ax, **kwargs)
             ax.set_title('House {}'.format(elec.building()))
         return axes
+
+
+class Buildings(MutableMapping):
+    """Mapping from building instance to nilmtk.Building which loads
+    each building's metadata (and creates its ElecMeters and Appliances)
+    the first time the building is accessed.
+
+    Buildings are listed from the store the first time the keys are
+    needed (e.g. `len()`, iteration or an unknown instance), unless
+    `instances` is given, so creating a Buildings object does not read
+    anything from the store.  Buildings are stored under keys of the
+    form '/building<instance>'; any other key is loaded straight away
+    to find its instance.
+    """
+
+    def __init__(self, store, dataset_name, instances=None):
+        """
+        Parameters
+        ----------
+        store : nilmtk.DataStore
+        dataset_name : str
+        instances : list of ints, optional
+            If given then only these buildings are used.
+        """
+        self.store = store
+        self.dataset_name = dataset_name
+        self._loaded = {}
+        if instances is None:
+            self._keys = None
+        else:
+            self._keys = OrderedDict(
+                (instance, 'building{}'.format(instance))
+                for instance in instances)
+
+    def loaded(self):
+        """Returns list of the instances of buildings which have been
+        loaded."""
+        return [instance for instance in self if instance in self._loaded]
+
+    def _key_for_each_instance(self):
+        if self._keys is None:
+            keys = OrderedDict()
+            b_keys = self.store.elements_below_key('/')
+            b_keys.sort()
+            for b_key in b_keys:
+                instance = _instance_from_key(b_key)
+                if instance is None:
+                    building = self._load(b_key)
+                    instance = building.identifier.instance
+                    self._loaded[instance] = building
+                keys[instance] = b_key
+            self._keys = keys
+        return self._keys
+
+    def _load(self, b_key):
+        building = Building()
+        building.import_metadata(self.store, '/'+b_key, self.dataset_name)
+        return building
+
+    def __getitem__(self, instance):
+        try:
+            return self._loaded[instance]
+        except KeyError:
+            pass
+        b_key = self._key_for_each_instance()[instance]
+        building = self._load(b_key)
+        self._loaded[instance] = building
+        return building
+
+    def __setitem__(self, instance, building):
+        self._key_for_each_instance().setdefault(instance, None)
+        self._loaded[instance] = building
+
+    def __delitem__(self, instance):
+        del self._key_for_each_instance()[instance]
+        self._loaded.pop(instance, None)
+
+    def __iter__(self):
+        return iter(self._key_for_each_instance())
+
+    def __len__(self):
+        return len(self._key_for_each_instance())
+
+    def __contains__(self, instance):
+        return instance in self._key_for_each_instance()
+
+    def __repr__(self):
+        return "{}(instances={}, loaded={})".format(
+            self.__class__.__name__, list(self), self.loaded())
+
+
+def _instance_from_key(b_key):
+    """Returns the instance in a key like 'building1', or None."""
+    match = re.match(r'^building(\d+)$', b_key)
+    return None if match is None else int(match.group(1))
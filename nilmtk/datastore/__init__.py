@@ -1,4 +1,8 @@
 from .datastore import DataStore, MAX_MEM_ALLOWANCE_IN_BYTES
 from .hdfdatastore import HDFDataStore
 from .csvdatastore import CSVDataStore
+from .parquetdatastore import ParquetDataStore
+from .mmapdatastore import MmapDataStore
 from .key import Key
+from .chunkcache import (ChunkCache, enable_chunk_cache,
+                         disable_chunk_cache, get_chunk_cache)
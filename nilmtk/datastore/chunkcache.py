@@ -0,0 +1,206 @@
+from __future__ import print_function, division
+import threading
+from collections import OrderedDict
+from os.path import abspath
+from nilmtk.timeframegroup import TimeFrameGroup
+from nilmtk.utils import copy_chunk
+from .writesession import _nbytes
+
+
+DEFAULT_MAX_BYTES = 2**30
+
+_chunk_cache = None
+
+
+def enable_chunk_cache(max_bytes=DEFAULT_MAX_BYTES):
+    """Enables the process-wide chunk cache used by every `DataStore.load`.
+
+    Parameters
+    ----------
+    max_bytes : int, optional
+        Memory budget for cached chunks.  Defaults to 1 GiB.
+
+    Returns
+    -------
+    ChunkCache
+    """
+    global _chunk_cache
+    if _chunk_cache is None:
+        _chunk_cache = ChunkCache(max_bytes)
+    else:
+        _chunk_cache.max_bytes = max_bytes
+        _chunk_cache.evict()
+    return _chunk_cache
+
+
+def disable_chunk_cache():
+    """Disables and empties the process-wide chunk cache."""
+    global _chunk_cache
+    if _chunk_cache is not None:
+        _chunk_cache.clear()
+    _chunk_cache = None
+
+
+def get_chunk_cache():
+    """Returns the process-wide ChunkCache or None if it is disabled."""
+    return _chunk_cache
+
+
+class ChunkCache(object):
+    """Least-recently-used, in-memory cache of the chunks returned by
+    `DataStore.load`.
+
+    Each entry holds every chunk returned by one call to `load`, keyed
+    by the DataStore's file, the table key, `cols`, `sections`,
+    `n_look_ahead_rows`, `chunksize` and the DataStore's window.  An
+    entry is only added once the consumer has iterated over every chunk.
+    Chunks are copied on the way in and on the way out so consumers may
+    modify chunks in place.  DataStores invalidate entries for a key
+    whenever the key is modified.
+
+    Attributes
+    ----------
+    max_bytes : int
+        Memory budget.  Least recently used entries are evicted to keep
+        `n_bytes` <= `max_bytes`.
+    n_bytes : int
+        Total size of the cached chunks.
+    hits, misses, evictions : int
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.n_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __repr__(self):
+        return ("ChunkCache(n_entries={:d}, n_bytes={:d}, max_bytes={:d},"
+                " hits={:d}, misses={:d}, evictions={:d})"
+                .format(len(self), self.n_bytes, self.max_bytes, self.hits,
+                        self.misses, self.evictions))
+
+    def load(self, store, load_func, key, cols=None, sections=None,
+             n_look_ahead_rows=0, chunksize=None, **kwargs):
+        """Returns a generator of chunks for `key`, from the cache if
+        possible, otherwise from `load_func` (which must have the same
+        signature as `DataStore._load`)."""
+        cache_key = self._cache_key(store, key, cols, sections,
+                                    n_look_ahead_rows, chunksize, kwargs)
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._entries[cache_key] = self._entries.pop(cache_key)
+
+        if entry is None:
+            generator = load_func(key, cols=cols, sections=sections,
+                                  n_look_ahead_rows=n_look_ahead_rows,
+                                  chunksize=chunksize, **kwargs)
+            return self._load_and_add(store, cache_key, generator)
+        else:
+            chunks, n_bytes, all_sections_smaller_than_chunksize = entry
+            store.all_sections_smaller_than_chunksize = (
+                all_sections_smaller_than_chunksize)
+            return (copy_chunk(chunk) for chunk in chunks)
+
+    def invalidate(self, store, key='/'):
+        """Removes all entries for `store` at or below `key`."""
+        store_id = _store_id(store)
+        key = _normalise_key(key)
+        with self._lock:
+            for cache_key in self._entries.keys():
+                entry_store_id, entry_key = cache_key[:2]
+                if entry_store_id == store_id and _is_at_or_below(entry_key,
+                                                                  key):
+                    self._remove(cache_key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.n_bytes = 0
+
+    def evict(self):
+        """Evicts least recently used entries until `n_bytes` <=
+        `max_bytes`."""
+        with self._lock:
+            while self.n_bytes > self.max_bytes and self._entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _load_and_add(self, store, cache_key, generator):
+        chunks = []
+        n_bytes = 0
+        for chunk in generator:
+            if chunks is not None:
+                n_bytes += _chunk_nbytes(chunk)
+                if n_bytes > self.max_bytes:
+                    # Too big to cache.
+                    chunks = None
+                else:
+                    chunks.append(copy_chunk(chunk))
+            yield chunk
+
+        if chunks is not None:
+            entry = (chunks, n_bytes, store.all_sections_smaller_than_chunksize)
+            with self._lock:
+                if cache_key in self._entries:
+                    self._remove(cache_key)
+                self._entries[cache_key] = entry
+                self.n_bytes += n_bytes
+            self.evict()
+
+    def _remove(self, cache_key):
+        chunks, n_bytes, _ = self._entries.pop(cache_key)
+        self.n_bytes -= n_bytes
+
+    def _cache_key(self, store, key, cols, sections, n_look_ahead_rows,
+                   chunksize, kwargs):
+        if cols is not None:
+            cols = tuple([tuple(col) if isinstance(col, list) else col
+                          for col in cols])
+        if sections is not None:
+            sections = tuple([_timeframe_key(section)
+                              for section in TimeFrameGroup(sections)])
+        kwargs = tuple(sorted([(name, value) for name, value in kwargs.items()
+                               if name != 'verbose']))
+        return (_store_id(store), _normalise_key(key), cols, sections,
+                n_look_ahead_rows, chunksize, _timeframe_key(store.window),
+                kwargs)
+
+
+def _store_id(store):
+    filename = getattr(store, 'filename', None)
+    if filename is None:
+        return id(store)
+    return (store.__class__.__name__, abspath(filename))
+
+
+def _normalise_key(key):
+    return '/' + key.strip('/')
+
+
+def _is_at_or_below(key, parent_key):
+    return (parent_key == '/' or key == parent_key or
+            key.startswith(parent_key + '/'))
+
+
+def _timeframe_key(timeframe):
+    return (timeframe.start, timeframe.end, timeframe.include_end,
+            timeframe.enabled)
+
+
+def _chunk_nbytes(chunk):
+    n_bytes = _nbytes(chunk)
+    look_ahead = getattr(chunk, 'look_ahead', None)
+    if look_ahead is not None:
+        n_bytes += _nbytes(look_ahead)
+    return n_bytes
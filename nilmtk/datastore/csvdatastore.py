@@ -6,7 +6,7 @@ from copy import deepcopy
 from collections import OrderedDict
 import numpy as np
 import yaml
-from os.path import isdir, isfile, join, exists, dirname
+from os.path import isdir, isfile, join, exists, dirname, getsize
 from os import listdir, makedirs, remove
 from shutil import rmtree
 import re
@@ -17,18 +17,39 @@ from nilmtk.node import Node
 from nilmtk.datastore import DataStore, MAX_MEM_ALLOWANCE_IN_BYTES
 from nilmtk.datastore.key import Key
 from nilmtk.datastore.datastore import write_yaml_to_file, join_key
+from nilmtk.datastore.directorydatastore import rechunk
 from nilmtk.docinherit import doc_inherit
 
 # do not edit! added by PythonBreakpoints
 from pdb import set_trace as _breakpoint
 
 
-class CSVDataStore(DataStore):
+# Number of lines written by `DataFrame.to_csv` before the first row
+# of data: two rows of column labels and one row of index names.
+N_HEADER_LINES = 3
+INDEX_SUFFIX = '.idx'
 
-    @doc_inherit
-    def __init__(self, filename):
 
+class CSVDataStore(DataStore):
+
+    def __init__(self, filename, index_step=None):
+        """
+        Parameters
+        ----------
+        filename : string
+            Root directory of the dataset.
+        index_step : int or None, optional
+            If an int then a sidecar index file (`<meter>.csv.idx`) is kept
+            next to each CSV file.  It records the timestamp and byte offset
+            of every `index_step`th row so `load` and `get_timeframe` can
+            seek straight to the bytes they need instead of parsing the
+            CSV file from the top.  The index is updated on `put` and
+            `append` and is built lazily for existing files.
+            If None (the default) then no index is used.
+        """
         self.filename = filename
+        self.index_step = index_step
+        self._indexes = {}
         # make root directory
         path = self._key_to_abs_path('/')
         if not exists(path):
@@ -49,8 +70,8 @@ class CSVDataStore(DataStore):
             raise KeyError('{} not found'.format(key))
 
     @doc_inherit
-    def load(self, key, cols=None, sections=None, n_look_ahead_rows=0,
-             chunksize=MAX_MEM_ALLOWANCE_IN_BYTES):
+    def _load(self, key, cols=None, sections=None, n_look_ahead_rows=0,
+              chunksize=MAX_MEM_ALLOWANCE_IN_BYTES):
              
         file_path = self._key_to_abs_path(key)
         
@@ -59,6 +80,12 @@ class CSVDataStore(DataStore):
         sections = TimeFrameGroup(sections)
 
         self.all_sections_smaller_than_chunksize = True
+
+        if self.index_step is not None:
+            for chunk in self._load_using_index(
+                    file_path, cols, sections, n_look_ahead_rows, chunksize):
+                yield chunk
+            return
         
         # iterate through parameter sections
         # requires 1 pass through file for each section
@@ -109,6 +136,35 @@ class CSVDataStore(DataStore):
                     
                     yield subchunk
 
+    def _load_using_index(self, file_path, cols, sections, n_look_ahead_rows,
+                          chunksize):
+        """Loads `sections` by seeking to the byte offsets recorded in
+        the sidecar index rather than parsing the file from the top."""
+        index = self._get_index(file_path)
+        if len(index.rows) == 0:
+            # The file only has a header.
+            return
+        columns = pd.read_csv(file_path, index_col=0, header=[0,1],
+                              nrows=1).columns
+
+        for section in sections:
+            window_intersect = self.window.intersection(section)
+            if window_intersect.empty:
+                continue
+            start_i = index.entry_for(window_intersect.start)
+            end_i = index.entry_for(window_intersect.end, side='right')
+            rows_upper_bound = (index.rows[end_i] - index.rows[start_i] + 
+                                index.step)
+            if rows_upper_bound > chunksize:
+                self.all_sections_smaller_than_chunksize = False
+
+            frames = _read_csv_from_offset(file_path, index.offsets[start_i],
+                                           columns, cols, chunksize)
+            for chunk in rechunk(frames, window_intersect, chunksize,
+                                 n_look_ahead_rows):
+                if not chunk.empty:
+                    yield chunk
+
     @doc_inherit
     def append(self, key, value):
     
@@ -116,9 +172,14 @@ class CSVDataStore(DataStore):
         path = dirname(file_path)
         if not exists(path):
             makedirs(path)
+        # Only write the header if we're starting a new file
         value.to_csv(file_path,
                     mode='a',
-                    header=True)
+                    header=not isfile(file_path))
+        self._on_key_modified(key)
+        if self.index_step is not None:
+            # Only indexes the newly appended rows.
+            self._get_index(file_path)
                     
     @doc_inherit
     def put(self, key, value):
@@ -130,14 +191,23 @@ class CSVDataStore(DataStore):
         value.to_csv(file_path,
                     mode='w',
                     header=True)
+        self._on_key_modified(key)
+        self._remove_index(file_path)
+        if self.index_step is not None:
+            self._get_index(file_path)
                   
     @doc_inherit
     def remove(self, key):
-    	file_path = self._key_to_abs_path(key)
-    	if isfile(file_path):
-    	    remove(file_path)
+        self._on_key_modified(key)
+        file_path = self._key_to_abs_path(key)
+        if isfile(file_path):
+            remove(file_path)
+            self._remove_index(file_path)
         else:
             rmtree(file_path)
+            for indexed_path in self._indexes.keys():
+                if indexed_path.startswith(file_path):
+                    del self._indexes[indexed_path]
 
     @doc_inherit
     def load_metadata(self, key='/'):
@@ -217,6 +287,12 @@ class CSVDataStore(DataStore):
     def get_timeframe(self, key):
     
         file_path = self._key_to_abs_path(key)
+        if self.index_step is not None:
+            index = self._get_index(file_path)
+            timeframe = TimeFrame(index.first_timestamp(file_path),
+                                  index.last_timestamp(file_path))
+            return self.window.intersection(timeframe)
+
         text_file_reader = pd.read_csv(file_path, 
                                         index_col=0, 
                                         header=[0,1], 
@@ -230,6 +306,38 @@ class CSVDataStore(DataStore):
             end = df.index[-1]
         timeframe = TimeFrame(start, end)
         return self.window.intersection(timeframe)
+
+    def _read_only_copy_args(self):
+        return (self.filename,), {'index_step': self.index_step}
+
+    def _get_index(self, file_path):
+        """Returns the up-to-date `CSVIndex` for `file_path`.  Loads the
+        sidecar index from disk if necessary and extends it if the
+        CSV file has grown (or rebuilds it if the CSV has changed)."""
+        if not isfile(file_path):
+            raise KeyError("'{}' not found".format(file_path))
+        file_size = getsize(file_path)
+        index = self._indexes.get(file_path)
+        index_path = file_path + INDEX_SUFFIX
+        if index is None and isfile(index_path):
+            index = CSVIndex.from_file(index_path)
+        if index is not None and index.file_size == file_size:
+            self._indexes[file_path] = index
+            return index
+
+        if (index is None or index.step != self.index_step or
+                not index.is_valid_prefix_of(file_path)):
+            index = CSVIndex(self.index_step)
+        index.update(file_path)
+        index.to_file(index_path)
+        self._indexes[file_path] = index
+        return index
+
+    def _remove_index(self, file_path):
+        self._indexes.pop(file_path, None)
+        index_path = file_path + INDEX_SUFFIX
+        if isfile(index_path):
+            remove(index_path)
         
     def _get_metadata_path(self):
         return join(self.filename, 'metadata')
@@ -245,3 +353,143 @@ class CSVDataStore(DataStore):
             if key_object.building and key_object.meter:
                 abs_path += '.csv'
         return abs_path
+
+
+class CSVIndex(object):
+    """Sparse index of a CSV file: the row number, timestamp and byte
+    offset of every `step`th row of data.
+
+    Attributes
+    ----------
+    step : int
+    rows, timestamps, offsets : np.ndarrays of int64
+        `timestamps` are `pd.Timestamp.value` (nanoseconds).
+    n_rows : int
+        Number of rows of data indexed so far.
+    file_size : int
+        Number of bytes of the CSV file indexed so far.
+    last_offset : int
+        Byte offset of the last row of data.
+    """
+
+    def __init__(self, step):
+        self.step = step
+        self.rows = np.empty(0, dtype=np.int64)
+        self.timestamps = np.empty(0, dtype=np.int64)
+        self.offsets = np.empty(0, dtype=np.int64)
+        self.n_rows = 0
+        self.file_size = 0
+        self.last_offset = -1
+
+    @classmethod
+    def from_file(cls, index_path):
+        with open(index_path, 'rb') as fh:
+            npz = np.load(fh)
+            index = cls(int(npz['step']))
+            for attr in ['rows', 'timestamps', 'offsets']:
+                setattr(index, attr, npz[attr])
+            for attr in ['n_rows', 'file_size', 'last_offset']:
+                setattr(index, attr, int(npz[attr]))
+        return index
+
+    def to_file(self, index_path):
+        with open(index_path, 'wb') as fh:
+            np.savez(fh, step=self.step, rows=self.rows,
+                     timestamps=self.timestamps, offsets=self.offsets,
+                     n_rows=self.n_rows, file_size=self.file_size,
+                     last_offset=self.last_offset)
+
+    def is_valid_prefix_of(self, file_path):
+        """Returns True if `file_path` still starts with the bytes
+        which were indexed, i.e. it has only been appended to."""
+        if self.file_size > getsize(file_path):
+            return False
+        if self.last_offset < 0:
+            return True
+        with open(file_path, 'rb') as fh:
+            fh.seek(self.offsets[-1])
+            line = fh.readline()
+        return (len(line) > 0 and 
+                _timestamp_from_line(line).value == self.timestamps[-1])
+
+    def update(self, file_path):
+        """Index any rows which have been appended to `file_path` since
+        this index was last updated."""
+        rows, timestamps, offsets = [], [], []
+        row = self.n_rows
+        last_offset = self.last_offset
+        with open(file_path, 'rb') as fh:
+            if self.file_size == 0:
+                for _ in range(N_HEADER_LINES):
+                    fh.readline()
+                offset = fh.tell()
+            else:
+                offset = self.file_size
+                fh.seek(offset)
+            for line in fh:
+                if line.strip():
+                    if row % self.step == 0:
+                        rows.append(row)
+                        timestamps.append(_timestamp_from_line(line).value)
+                        offsets.append(offset)
+                    last_offset = offset
+                    row += 1
+                offset += len(line)
+        self.rows = np.concatenate([self.rows, np.array(rows, dtype=np.int64)])
+        self.timestamps = np.concatenate(
+            [self.timestamps, np.array(timestamps, dtype=np.int64)])
+        self.offsets = np.concatenate(
+            [self.offsets, np.array(offsets, dtype=np.int64)])
+        self.n_rows = row
+        self.file_size = offset
+        self.last_offset = last_offset
+
+    def entry_for(self, timestamp, side='left'):
+        """Returns the position in `rows` / `offsets` of the last indexed
+        row at or before `timestamp` (or, if `side` is 'right', the first
+        indexed row after `timestamp`)."""
+        if timestamp is None:
+            return 0 if side == 'left' else len(self.rows) - 1
+        if side == 'left':
+            i = self.timestamps.searchsorted(timestamp.value, side='right') - 1
+        else:
+            i = self.timestamps.searchsorted(timestamp.value, side='left')
+        return min(max(i, 0), len(self.rows) - 1)
+
+    def first_timestamp(self, file_path):
+        """Returns None if no rows have been indexed."""
+        if len(self.offsets) == 0:
+            return
+        return _timestamp_at(file_path, self.offsets[0])
+
+    def last_timestamp(self, file_path):
+        """Returns None if no rows have been indexed."""
+        if self.last_offset < 0:
+            return
+        return _timestamp_at(file_path, self.last_offset)
+
+
+def _timestamp_at(file_path, offset):
+    # Parse the line (rather than using the cached nanoseconds) so we
+    # keep any timezone information in the file.
+    with open(file_path, 'rb') as fh:
+        fh.seek(offset)
+        return _timestamp_from_line(fh.readline())
+
+
+def _timestamp_from_line(line):
+    return pd.Timestamp(line.split(b',', 1)[0].decode('utf8'))
+
+
+def _read_csv_from_offset(file_path, offset, columns, cols, chunksize):
+    """Generator of DataFrames read from `file_path` starting at byte
+    `offset` (which must be the start of a row of data)."""
+    with open(file_path, 'rb') as fh:
+        fh.seek(offset)
+        text_file_reader = pd.read_csv(fh, index_col=0, header=None,
+                                       parse_dates=True, chunksize=chunksize)
+        for chunk in text_file_reader:
+            chunk.columns = columns
+            if cols:
+                chunk = chunk[cols]
+            yield chunk
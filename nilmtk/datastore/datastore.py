@@ -10,9 +10,16 @@ from os.path import isdir, isfile, join, exists, dirname
 from os import listdir, makedirs, remove
 from shutil import rmtree
 import re
+import multiprocessing as mp
+from Queue import Empty
+from traceback import format_exc
 from nilm_metadata.convert_yaml_to_hdf5 import _load_file
 from nilmtk.timeframe import TimeFrame
+from nilmtk.timeframegroup import TimeFrameGroup
 from nilmtk.node import Node
+from .prefetch import ChunkPrefetcher, serialise_reads
+from .writesession import WriteSession
+from .chunkcache import get_chunk_cache
 
 # do not edit! added by PythonBreakpoints
 from pdb import set_trace as _breakpoint
@@ -44,7 +51,27 @@ class DataStore(object):
     ----------
     window : nilmtk.TimeFrame
         Defines the timeframe we are interested in.
+    io_wait_time : float
+        Total number of seconds consumers of `load(prefetch=...)` have
+        spent waiting for chunks to be read.  Set to 0 to reset.
+    supports_concurrent_reads : boolean
+        True if copies made by `read_only_copy` can be read from different
+        threads at the same time.  If False then reads from different
+        threads must be serialised with a lock.
+    cached_stat_indexes : dict
+        Maps keys of cached statistics (with a leading slash) to an
+        in-memory `nilmtk.stats.cachedstatindex.CachedStatIndex`.
+        Maintained by `ElecMeter`.  Entries are dropped whenever their
+        key is modified.
+    rollup_ends : dict
+        Maps keys of rollup tails (with a leading slash) to the end of
+        the last bucket of the rollup, or to None if there is no rollup.
+        Maintained by `ElecMeter` so that `load(sample_period=...)` only
+        looks for rollups in the DataStore once per meter.  Entries are
+        dropped whenever their key is modified.
     """
+    supports_concurrent_reads = True
+
     def __init__(self):
         """
         Parameters
@@ -52,6 +79,9 @@ class DataStore(object):
         filename : string
         """
         self.window = TimeFrame()
+        self.io_wait_time = 0.0
+        self.cached_stat_indexes = {}
+        self.rollup_ends = {}
         
     def __getitem__(self, key):
         """Loads all of a DataFrame from disk.
@@ -80,7 +110,7 @@ class DataStore(object):
         self._window = window
         
     def load(self, key, cols=None, sections=None, n_look_ahead_rows=0,
-             chunksize=MAX_MEM_ALLOWANCE_IN_BYTES):
+             chunksize=MAX_MEM_ALLOWANCE_IN_BYTES, prefetch=0, **kwargs):
         """
         Parameters
         ----------
@@ -97,6 +127,18 @@ class DataStore(object):
             property which will be a DataFrame of length `n_look_ahead_rows`
             of the data immediately in front of the data in the main DataFrame.
         chunksize : int, optional
+        prefetch : int, optional, defaults to 0
+            If >0 then chunks are read on a background thread, keeping up
+            to `prefetch` chunks ready while the consumer processes the
+            current chunk.  The time the consumer spends waiting for chunks
+            is added to `self.io_wait_time`.  Do not use the same DataStore
+            from another thread (e.g. to write) until the generator
+            is exhausted.  If `self.supports_concurrent_reads` is False
+            then every `load` generator reads while holding
+            `nilmtk.datastore.prefetch.SERIAL_READ_LOCK`, so several
+            prefetching generators (and plain `load` generators) can be
+            used together without racing.
+        **kwargs : any other key word arguments to pass to the subclass
 
         Returns
         ------- 
@@ -116,8 +158,137 @@ class DataStore(object):
         Raises
         ------
         KeyError if `key` is not in store.
+
+        Notes
+        -----
+        If the process-wide chunk cache is enabled (see
+        `nilmtk.datastore.chunkcache.enable_chunk_cache`) then chunks
+        are returned from the cache if the same chunks have been loaded
+        before.
+        """
+        chunk_cache = get_chunk_cache()
+        if chunk_cache is None:
+            generator = self._load(key, cols=cols, sections=sections,
+                                   n_look_ahead_rows=n_look_ahead_rows,
+                                   chunksize=chunksize, **kwargs)
+        else:
+            generator = chunk_cache.load(self, self._load, key, cols=cols,
+                                         sections=sections,
+                                         n_look_ahead_rows=n_look_ahead_rows,
+                                         chunksize=chunksize, **kwargs)
+        if not self.supports_concurrent_reads:
+            generator = serialise_reads(generator)
+        if prefetch:
+            generator = ChunkPrefetcher(generator, n_chunks=prefetch,
+                                        on_wait=self._add_io_wait_time)
+        return generator
+
+    def _load(self, key, cols=None, sections=None, n_look_ahead_rows=0,
+              chunksize=MAX_MEM_ALLOWANCE_IN_BYTES):
+        """Generator of DataFrames for `key`.  Implemented by subclasses;
+        see `load` for the parameters and the attributes each DataFrame
+        must have.
+        """
+        raise NotImplementedError("NotImplementedError")
+
+    def read_only_copy(self):
+        """Returns a new DataStore which reads the same data through
+        its own file handles.  Use one copy per thread (or process)
+        to read concurrently.  The copy has the same `window`.  Close
+        the copy when finished with it.
         """
+        return self.read_only_copy_factory()()
+
+    def read_only_copy_factory(self):
+        """Returns a picklable callable which returns a `read_only_copy`
+        of this DataStore.  The callable holds the DataStore's class and
+        the arguments needed to re-open it, but no open file handles, so
+        it can be passed to another process which then opens its own copy.
+        """
+        args, kwargs = self._read_only_copy_args()
+        return _ReadOnlyCopyFactory(self.__class__, args, kwargs,
+                                    deepcopy(self.window))
+
+    def _read_only_copy_args(self):
+        """Returns (args, kwargs) to pass to this DataStore's 
+        constructor to open a read-only copy."""
         raise NotImplementedError("NotImplementedError")
+
+    def _on_key_modified(self, key):
+        """Must be called by subclasses whenever `key` (or any key below
+        `key`) is modified."""
+        chunk_cache = get_chunk_cache()
+        if chunk_cache is not None:
+            chunk_cache.invalidate(self, key)
+        prefix = '/' + key.strip('/')
+        for memo in [self.cached_stat_indexes, self.rollup_ends]:
+            for memo_key in memo.keys():
+                if (prefix == '/' or memo_key == prefix or
+                        memo_key.startswith(prefix + '/')):
+                    del memo[memo_key]
+
+    def _add_io_wait_time(self, seconds):
+        self.io_wait_time += seconds
+
+    def load_many(self, keys, cols=None, sections=None,
+                  chunksize=MAX_MEM_ALLOWANCE_IN_BYTES):
+        """Loads several tables at once, aligned in time.
+
+        Parameters
+        ----------
+        keys : list of strings
+        cols : list of Measurements; or dict mapping each key to a list
+            of Measurements, optional.  If a list then the same columns
+            are loaded from every key.  If None then load all columns.
+        sections : TimeFrameGroup; or list of nilmtk.TimeFrame objects;
+            or a pd.PeriodIndex, optional.  See `load`.
+        chunksize : int, optional
+            The (approximate) maximum number of rows per key per chunk.
+
+        Returns
+        -------
+        generator of OrderedDicts mapping each key to a DataFrame.
+            All the DataFrames in each dict cover the same time span, given
+            by their `timeframe` attribute, and none has more than
+            `chunksize` rows.  Each section is covered by one or more
+            consecutive dicts.  A key with no data in a time span maps to
+            an empty DataFrame.
+
+        Raises
+        ------
+        KeyError if any key is not in store.
+
+        Notes
+        -----
+        This default implementation reads each key separately with `load`
+        and ends each dict just before the earliest timestamp at which 
+        any key would exceed `chunksize` rows.  Subclasses should 
+        override this to plan reads across keys.
+        """
+        sections = [TimeFrame()] if sections is None else sections
+        for section in TimeFrameGroup(sections):
+            section = self.window.intersection(section)
+            readers = OrderedDict()
+            for key in keys:
+                key_cols = cols.get(key) if isinstance(cols, dict) else cols
+                readers[key] = _AlignedReader(
+                    self.load(key, cols=key_cols, sections=[section],
+                              chunksize=chunksize), chunksize)
+            start = section.start
+            while True:
+                ends = [reader.fill() for reader in readers.values()]
+                ends = [end for end in ends if end is not None]
+                end = min(ends) if ends else section.end
+                timeframe = TimeFrame(start, end)
+                chunks = OrderedDict()
+                for key, reader in readers.iteritems():
+                    data = reader.take_before(end if ends else None)
+                    data.timeframe = timeframe
+                    chunks[key] = data
+                yield chunks
+                if not ends:
+                    break
+                start = end
         
     def append(self, key, value):
         """
@@ -142,6 +313,28 @@ class DataStore(object):
         value : pd.DataFrame
         """
         raise NotImplementedError("NotImplementedError")
+
+    def write_session(self, dtype=None, **kwargs):
+        """Returns a context manager for writing many chunks efficiently.
+
+        Parameters
+        ----------
+        dtype : numpy dtype, optional
+            e.g. np.float32.  If set then floating point columns are
+            converted to `dtype` before being written.
+        **kwargs : any other key word arguments for the subclass's 
+            WriteSession (e.g. compression settings).
+
+        Returns
+        -------
+        nilmtk.datastore.writesession.WriteSession
+            Has `append` and `put` methods with the same signature as 
+            `DataStore.append` and `DataStore.put`.  Data is guaranteed 
+            to be written to disk (and indexed) only after the session
+            is closed.  `session.stats` reports rows, bytes and seconds
+            written per key.
+        """
+        return WriteSession(self, dtype=dtype, **kwargs)
         
     def remove(self, key, value):
         """
@@ -195,6 +388,93 @@ class DataStore(object):
         """
         raise NotImplementedError("NotImplementedError")
 
+    def _nrows(self, key, timeframe=None):
+        """Returns the number of rows of `key` within `timeframe` (or the 
+        whole table if `timeframe` is None) after intersecting with
+        self.window.  This default implementation loads the data;
+        subclasses which can count rows without loading should override it.
+        """
+        sections = None if timeframe is None else [timeframe]
+        nrows = 0
+        last_timestamp = None
+        for chunk in self.load(key, sections=sections):
+            # `load` may repeat the last row of the previous chunk.
+            if last_timestamp is not None:
+                chunk = chunk[chunk.index > last_timestamp]
+            if not chunk.empty:
+                nrows += len(chunk)
+                last_timestamp = chunk.index[-1]
+        return nrows
+
+
+class _ReadOnlyCopyFactory(object):
+    """Picklable callable which opens a read-only copy of a DataStore.
+    See `DataStore.read_only_copy_factory`."""
+
+    def __init__(self, store_class, args, kwargs, window):
+        self.store_class = store_class
+        self.args = args
+        self.kwargs = kwargs
+        self.window = window
+
+    def __call__(self):
+        store = self.store_class(*self.args, **self.kwargs)
+        store.window = deepcopy(self.window)
+        return store
+
+
+class _AlignedReader(object):
+    """Buffers the chunks from one key's `load` generator so 
+    `DataStore.load_many` can cut every key at the same timestamp."""
+
+    def __init__(self, generator, chunksize):
+        self.generator = generator
+        self.chunksize = chunksize
+        self.buffer = pd.DataFrame()
+        self.exhausted = False
+        self.last_timestamp = None
+
+    def fill(self):
+        """Reads chunks until more than `chunksize` rows are buffered
+        or the generator is exhausted.
+
+        Returns
+        -------
+        The timestamp of the first row beyond `chunksize`, or None if 
+        every buffered row fits in one chunk.
+        """
+        while not self.exhausted and len(self.buffer) <= self.chunksize:
+            try:
+                chunk = next(self.generator)
+            except StopIteration:
+                self.exhausted = True
+                break
+            # `load` may repeat the last row of the previous chunk.
+            if self.last_timestamp is not None:
+                chunk = chunk[chunk.index > self.last_timestamp]
+            if chunk.empty:
+                continue
+            self.last_timestamp = chunk.index[-1]
+            if self.buffer.empty:
+                self.buffer = chunk
+            else:
+                self.buffer = pd.concat([self.buffer, chunk])
+        if len(self.buffer) > self.chunksize:
+            return self.buffer.index[self.chunksize]
+        return None
+
+    def take_before(self, end):
+        """Removes and returns the buffered rows before `end`
+        (or all the buffered rows if `end` is None)."""
+        if end is None:
+            data, self.buffer = self.buffer, pd.DataFrame()
+        else:
+            n_rows = self.buffer.index.searchsorted(end)
+            data = self.buffer.iloc[:n_rows]
+            self.buffer = self.buffer.iloc[n_rows:]
+        return data
+
+
 def write_yaml_to_file(metadata_filename, metadata):
     metadata_file = file(metadata_filename, 'w')
     yaml.dump(metadata, metadata_file)
@@ -222,16 +502,43 @@ def join_key(*args):
         key = key[:-1] # remove last trailing slash
     return key
         
-def convert_datastore(input_store, output_store):
+def convert_datastore(input_store, output_store, n_jobs=1,
+                      max_chunks_in_flight=4, resume=False, verbose=True):
     """
     Parameters
     ----------
     input_store : nilmtk.DataStore
     output_store : nilmtk.DataStore
+    n_jobs : int, optional, defaults to 1
+        Number of processes to read meters from `input_store` in parallel.
+        Each process opens its own `input_store.read_only_copy()` (see 
+        `DataStore.read_only_copy_factory`).
+        All writes are done by the calling process.
+    max_chunks_in_flight : int, optional, defaults to 4
+        Maximum number of chunks which have been read but not yet written
+        when `n_jobs` > 1.  Bounds memory usage.
+    resume : boolean, optional, defaults to False
+        If True then skip meters which are already in `output_store` and 
+        have the same timeframe and number of rows as in `input_store`.
+        Meters which are only partially in `output_store` are removed and
+        converted again.
+    verbose : boolean, optional, defaults to True
+        If True then print throughput for each meter and in total.
+
+    Returns
+    -------
+    pd.DataFrame with one row per meter converted (in the order the
+    meters are listed in `input_store`, even when `n_jobs` > 1) and columns
+    'n_rows', 'n_bytes', 'seconds', 'MB_per_sec' and 'rows_per_sec'.
+    'n_bytes' (and hence 'MB_per_sec') is the in-memory size of the
+    data converted (see `WriteSession.stats`), not the size on disk.
     """
+    t0 = time()
+
     # dataset metadata
     metadata = input_store.load_metadata()
     output_store.save_metadata('/', metadata)
+    meter_keys = []
     for building in input_store.elements_below_key():
         building_key = '/'+building
         # building metadata
@@ -244,8 +551,158 @@ def convert_datastore(input_store, output_store):
                 if meter == 'cache':
                     continue
                 meter_key = utility_key+'/'+meter
-                # store meter data
+                if resume and _meter_already_converted(input_store,
+                                                       output_store,
+                                                       meter_key):
+                    if verbose:
+                        print("Skipping", meter_key, "(already converted)")
+                    continue
+                meter_keys.append(meter_key)
+
+    # store meter data
+    stats = OrderedDict()
+    if n_jobs > 1 and len(meter_keys) > 1:
+        _convert_meters_in_parallel(input_store, output_store, meter_keys,
+                                    n_jobs, max_chunks_in_flight, stats,
+                                    verbose)
+    else:
+        for meter_key in meter_keys:
+            meter_t0 = time()
+            with output_store.write_session() as session:
                 for df in input_store.load(meter_key):
-                    output_store.append(meter_key, df)
+                    if not df.empty:
+                        session.append(meter_key, df)
+            _record_meter_stats(stats, meter_key, session, meter_t0, verbose)
+
+    # Workers finish meters in any order.
+    stats = _conversion_stats_dataframe(stats).reindex(meter_keys)
+    if verbose:
+        total = _conversion_stats_dataframe(
+            {'total': {'n_rows': stats['n_rows'].sum(),
+                       'n_bytes': stats['n_bytes'].sum(),
+                       'seconds': time() - t0}})
+        print("Converted {:d} meters: {:.1f} MB at {:.1f} MB/s, {:.0f} rows/s"
+              .format(len(stats), total['n_bytes'].iloc[0] / 1E6,
+                      total['MB_per_sec'].iloc[0],
+                      total['rows_per_sec'].iloc[0]))
+    return stats
+
+
+def _meter_already_converted(input_store, output_store, meter_key):
+    """Returns True if `meter_key` is in `output_store` and has the same
+    timeframe and number of rows as in `input_store`.  Removes `meter_key`
+    from `output_store` if it is only partially converted."""
+    try:
+        output_timeframe = output_store.get_timeframe(meter_key)
+    except (KeyError, IOError):
+        return False
+    # A meter with a gap in the middle has the right timeframe.
+    if (output_timeframe == input_store.get_timeframe(meter_key) and
+            output_store._nrows(meter_key) == input_store._nrows(meter_key)):
+        return True
+    output_store.remove(meter_key)
+    return False
+
+
+def _convert_meters_in_parallel(input_store, output_store, meter_keys,
+                                n_jobs, max_chunks_in_flight, stats, verbose):
+    """Reads meters in `n_jobs` worker processes and writes them in this
+    process, with one write session per meter.  Each worker opens its 
+    own copy of `input_store`: open file handles are not passed to 
+    the workers."""
+    task_queue = mp.Queue()
+    for meter_key in meter_keys:
+        task_queue.put(meter_key)
+    n_jobs = min(n_jobs, len(meter_keys))
+    for _ in range(n_jobs):
+        task_queue.put(None)
+    chunk_queue = mp.Queue(maxsize=max_chunks_in_flight)
+    processes = [mp.Process(target=_read_meters,
+                            args=(input_store.read_only_copy_factory(),
+                                  task_queue, chunk_queue))
+                 for _ in range(n_jobs)]
+    for process in processes:
+        process.daemon = True
+        process.start()
+
+    sessions = {}
+    start_times = {}
+    n_meters_remaining = len(meter_keys)
+    try:
+        while n_meters_remaining:
+            try:
+                kind, meter_key, payload = chunk_queue.get(timeout=1)
+            except Empty:
+                if not any([process.is_alive() for process in processes]):
+                    raise RuntimeError("All convert_datastore worker "
+                                       "processes have died.")
+                continue
+
+            if kind == 'start':
+                start_times[meter_key] = payload
+                sessions[meter_key] = output_store.write_session()
+            elif kind == 'chunk':
+                sessions[meter_key].append(meter_key, payload)
+            elif kind == 'done':
+                session = sessions.pop(meter_key)
+                session.close()
+                _record_meter_stats(stats, meter_key, session, 
+                                    start_times[meter_key], verbose)
+                n_meters_remaining -= 1
+            else:
+                raise RuntimeError("Failed to read '{}':\n{}"
+                                   .format(meter_key, payload))
+    finally:
+        # Partially written meters are left for `resume` to clean up.
+        for session in sessions.values():
+            session.close()
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+            process.join()
+
+
+def _read_meters(open_input_store, task_queue, chunk_queue):
+    """Worker process for `_convert_meters_in_parallel`.
+    `open_input_store` is from `DataStore.read_only_copy_factory`."""
+    store = open_input_store()
+    try:
+        for meter_key in iter(task_queue.get, None):
+            chunk_queue.put(('start', meter_key, time()))
+            try:
+                for df in store.load(meter_key):
+                    if not df.empty:
+                        chunk_queue.put(('chunk', meter_key, df))
+            except Exception:
+                chunk_queue.put(('error', meter_key, format_exc()))
+                return
+            chunk_queue.put(('done', meter_key, None))
+    finally:
+        store.close()
+
+
+def _record_meter_stats(stats, meter_key, session, start_time, verbose):
+    if meter_key in session.stats.index:
+        meter_stats = session.stats.loc[meter_key]
+        n_rows, n_bytes = meter_stats['n_rows'], meter_stats['n_bytes']
+    else:
+        n_rows, n_bytes = 0, 0
+    seconds = time() - start_time
+    stats[meter_key] = {'n_rows': n_rows, 'n_bytes': n_bytes,
+                        'seconds': seconds}
+    if verbose:
+        print("{}: {:d} rows, {:.1f} MB in {:.1f}s ({:.1f} MB/s, {:.0f} rows/s)"
+              .format(meter_key, int(n_rows), n_bytes / 1E6, seconds,
+                      n_bytes / 1E6 / seconds if seconds else np.NaN,
+                      n_rows / seconds if seconds else np.NaN))
+
+
+def _conversion_stats_dataframe(stats):
+    stats = pd.DataFrame(stats.values(), index=stats.keys(),
+                         columns=['n_rows', 'n_bytes', 'seconds'])
+    seconds = stats['seconds'].replace(0, np.NaN)
+    stats['MB_per_sec'] = stats['n_bytes'] / 1E6 / seconds
+    stats['rows_per_sec'] = stats['n_rows'] / seconds
+    return stats
 
 
@@ -0,0 +1,206 @@
+from __future__ import print_function, division
+import pandas as pd
+import numpy as np
+import re
+from os.path import isdir, isfile, join, exists
+from os import listdir, makedirs
+from shutil import rmtree
+from nilm_metadata.convert_yaml_to_hdf5 import _load_file
+from nilmtk.timeframe import TimeFrame
+from .datastore import DataStore, write_yaml_to_file
+from .key import Key
+from .hdfdatastore import _timeframe_for_chunk, _normalise_key
+from nilmtk.docinherit import doc_inherit
+
+
+class DirectoryDataStore(DataStore):
+    """Base class for DataStores which keep each table in its own
+    directory below a root directory, e.g.
+
+        <filename>/building1/elec/meter1/
+        <filename>/building1/elec/cache/meter1/total_energy/
+
+    Metadata is stored as YAML in `<filename>/metadata/` using the same
+    layout as NILM Metadata (dataset.yaml, meter_devices.yaml and
+    building<I>.yaml).  Subclasses decide how the table data inside
+    each directory is laid out on disk.
+    """
+
+    @doc_inherit
+    def __init__(self, filename):
+        self.filename = filename
+        for path in [self._key_to_abs_path('/'), self._get_metadata_path()]:
+            if not exists(path):
+                makedirs(path)
+        super(DirectoryDataStore, self).__init__()
+
+    @doc_inherit
+    def remove(self, key):
+        path = self._key_to_abs_path(key)
+        if not isdir(path):
+            raise KeyError("key '{}' not found".format(key))
+        rmtree(path)
+        self._on_key_modified(key)
+
+    @doc_inherit
+    def load_metadata(self, key='/'):
+        filepath = self._get_metadata_path()
+        if key == '/':
+            metadata = _load_file(filepath, 'dataset.yaml')
+            meter_devices = _load_file(filepath, 'meter_devices.yaml')
+            if meter_devices is not None:
+                metadata['meter_devices'] = meter_devices
+        else:
+            key_object = Key(key)
+            if not key_object.building or key_object.meter:
+                raise NotImplementedError(
+                    "Can only load metadata for the dataset or a building.")
+            filename = 'building{:d}.yaml'.format(key_object.building)
+            metadata = _load_file(filepath, filename)
+
+        if metadata is None:
+            raise KeyError("no metadata for key '{}'".format(key))
+        return metadata
+
+    @doc_inherit
+    def save_metadata(self, key, metadata):
+        if key == '/':
+            dataset_metadata = dict(metadata)
+            meter_devices_metadata = dataset_metadata.pop('meter_devices', {})
+            write_yaml_to_file(
+                join(self._get_metadata_path(), 'dataset.yaml'),
+                dataset_metadata)
+            write_yaml_to_file(
+                join(self._get_metadata_path(), 'meter_devices.yaml'),
+                meter_devices_metadata)
+        else:
+            key_object = Key(key)
+            assert key_object.building and not key_object.meter
+            write_yaml_to_file(
+                join(self._get_metadata_path(),
+                     'building{:d}.yaml'.format(key_object.building)),
+                metadata)
+
+    @doc_inherit
+    def elements_below_key(self, key='/'):
+        elements = []
+        if key == '/' or not key:
+            for element in listdir(self.filename):
+                path = join(self.filename, element)
+                if isdir(path) and re.match('building[0-9]+$', element):
+                    elements.append(element)
+        else:
+            path = self._key_to_abs_path(key)
+            if isdir(path):
+                elements = [element for element in listdir(path)
+                            if isdir(join(path, element))]
+        return sorted(elements)
+
+    @doc_inherit
+    def close(self):
+        # not needed for directory-based data stores
+        pass
+
+    @doc_inherit
+    def open(self):
+        # not needed for directory-based data stores
+        pass
+
+    def _get_metadata_path(self):
+        return join(self.filename, 'metadata')
+
+    def _key_to_abs_path(self, key):
+        relative_path = key.strip('/') if key else ''
+        if relative_path:
+            return join(self.filename, *relative_path.split('/'))
+        else:
+            return self.filename
+
+    def _check_key(self, key):
+        if not isdir(self._key_to_abs_path(key)):
+            raise KeyError("key '{}' not found".format(key))
+
+
+def rechunk(frames, window_intersect, chunksize, n_look_ahead_rows=0):
+    """Turns a time-ordered stream of DataFrames read from disk into
+    chunks of at most `chunksize` rows within `window_intersect`.
+
+    Parameters
+    ----------
+    frames : iterable of pd.DataFrames
+        Consecutive rows from disk, in time order.  Rows before
+        `window_intersect.start` are dropped.  The stream may continue
+        beyond `window_intersect.end`; those rows are only consumed to
+        fill `look_ahead` and the stream is abandoned as soon as enough
+        look ahead rows have been read.
+    window_intersect : nilmtk.TimeFrame
+    chunksize : int
+    n_look_ahead_rows : int, optional
+
+    Returns
+    -------
+    generator of pd.DataFrames with a `timeframe` attribute (and
+    a `look_ahead` attribute if `n_look_ahead_rows` > 0).  An empty
+    DataFrame is yielded if no rows fall within `window_intersect`.
+    """
+    start = window_intersect.start
+    end = window_intersect.end
+    end_side = 'right' if window_intersect.include_end else 'left'
+    pieces = []
+    n_buffered = 0
+    n_in_section = 0
+    section_finished = False
+    chunk_i = 0
+
+    def pop_chunk(n_rows, there_are_more_subchunks):
+        buffered = pieces[0] if len(pieces) == 1 else pd.concat(pieces)
+        chunk = buffered.iloc[:n_rows]
+        if n_look_ahead_rows > 0:
+            chunk.look_ahead = buffered.iloc[n_rows:n_rows+n_look_ahead_rows]
+        chunk.timeframe = _timeframe_for_chunk(
+            there_are_more_subchunks, chunk_i, window_intersect, chunk.index)
+        del pieces[:]
+        pieces.append(buffered.iloc[n_rows:])
+        return chunk
+
+    for frame in frames:
+        if section_finished:
+            n_wanted = n_look_ahead_rows - (n_buffered - n_in_section)
+            frame = frame.iloc[:n_wanted]
+        else:
+            if start is not None and chunk_i == 0 and n_buffered == 0:
+                frame = frame.iloc[frame.index.searchsorted(start):]
+            if end is None:
+                n_in_frame = len(frame)
+            else:
+                n_in_frame = frame.index.searchsorted(end, side=end_side)
+            n_in_section += n_in_frame
+            section_finished = n_in_frame < len(frame)
+        if len(frame) == 0:
+            continue
+        pieces.append(frame)
+        n_buffered += len(frame)
+
+        while (n_in_section > chunksize and
+               n_buffered >= chunksize + n_look_ahead_rows):
+            yield pop_chunk(chunksize, there_are_more_subchunks=True)
+            n_buffered -= chunksize
+            n_in_section -= chunksize
+            chunk_i += 1
+
+        if section_finished and n_buffered - n_in_section >= n_look_ahead_rows:
+            break
+
+    if n_in_section == 0 and chunk_i == 0:
+        data = pd.DataFrame()
+        data.timeframe = window_intersect
+        if n_look_ahead_rows > 0:
+            data.look_ahead = pd.DataFrame()
+        yield data
+        return
+
+    while n_in_section > 0:
+        n_rows = min(chunksize, n_in_section)
+        yield pop_chunk(n_rows, there_are_more_subchunks=n_in_section > n_rows)
+        n_in_section -= n_rows
+        chunk_i += 1
@@ -15,19 +15,43 @@ from nilmtk.timeframe import TimeFrame
 from nilmtk.timeframegroup import TimeFrameGroup
 from nilmtk.node import Node
 from .datastore import DataStore, MAX_MEM_ALLOWANCE_IN_BYTES
+from .writesession import WriteSession
 from nilmtk.docinherit import doc_inherit
 
 # do not edit! added by PythonBreakpoints
 from pdb import set_trace as _breakpoint
 
 
+SPARSE_INDEX_STEP = 1024
+
+
 class HDFDataStore(DataStore):
 
-    @doc_inherit
-    def __init__(self, filename, mode='a'):
+    # The HDF5 library is not thread-safe, even across separate files.
+    supports_concurrent_reads = False
+
+    def __init__(self, filename, mode='a', sparse_index_step=SPARSE_INDEX_STEP):
+        """
+        Parameters
+        ----------
+        filename : string
+        mode : 'a' (append) or 'w' (write), optional
+        sparse_index_step : int or None, optional
+            The first and last row of each section are found by binary
+            search over the (sorted) index column on disk.  If
+            `sparse_index_step` is an int then every `sparse_index_step`th
+            timestamp of each table is cached in memory the first time
+            the table is loaded so only one block of `sparse_index_step`
+            timestamps needs to be read from disk per search.  If None
+            then the binary search is done entirely on disk.
+        """
         if mode == 'a' and not isfile(filename):
             raise IOError("No such file as " + filename)
+        self.filename = filename
+        self.mode = mode
         self.store = pd.HDFStore(filename, mode, complevel=9, complib='blosc')
+        self.sparse_index_step = sparse_index_step
+        self._sparse_indexes = {}
         super(HDFDataStore, self).__init__()
 
     @doc_inherit
@@ -35,8 +59,8 @@ class HDFDataStore(DataStore):
         return self.store[key]
 
     @doc_inherit
-    def load(self, key, cols=None, sections=None, n_look_ahead_rows=0,
-             chunksize=MAX_MEM_ALLOWANCE_IN_BYTES, verbose=False):
+    def _load(self, key, cols=None, sections=None, n_look_ahead_rows=0,
+              chunksize=MAX_MEM_ALLOWANCE_IN_BYTES, verbose=False):
         # TODO: calculate chunksize default based on physical
         # memory installed and number of columns
 
@@ -86,24 +110,15 @@ class HDFDataStore(DataStore):
                     yield data
                     continue
             else:
-                try:
-                    coords = self.store.select_as_coordinates(key=key, where=terms)
-                except AttributeError as e:
-                    if str(e) == ("'NoneType' object has no attribute "
-                                  "'read_coordinates'"):
-                        raise KeyError("key '{}' not found".format(key))
-                    else:
-                        raise
-                n_coords = len(coords)
-                if n_coords == 0:
+                section_start_i, section_stop_i = self._row_range(
+                    key, window_intersect)
+                if section_stop_i <= section_start_i:
                     data = pd.DataFrame()
                     data.timeframe = window_intersect
                     yield data
                     continue
 
-                section_start_i = coords[0]
-                section_end_i   = coords[-1]
-                del coords
+                section_end_i = section_stop_i - 1
             slice_starts = xrange(section_start_i, section_end_i, chunksize)
             n_chunks = int(np.ceil((section_end_i - section_start_i) / chunksize))
 
@@ -118,24 +133,21 @@ class HDFDataStore(DataStore):
                     chunk_end_i = section_end_i
                 chunk_end_i += 1
 
-                data = self.store.select(key=key, columns=cols,
-                                         start=chunk_start_i, stop=chunk_end_i)
+                # Read the chunk and its look ahead in a single select
+                # and then split them.
+                data = self.store.select(
+                    key=key, columns=cols, start=chunk_start_i,
+                    stop=chunk_end_i + n_look_ahead_rows)
 
                 # if len(data) <= 2:
                 #     yield pd.DataFrame()
 
-                # Load look ahead if necessary
                 if n_look_ahead_rows > 0:
+                    n_chunk_rows = chunk_end_i - chunk_start_i
+                    look_ahead = data.iloc[n_chunk_rows:]
+                    data = data.iloc[:n_chunk_rows]
                     if len(data.index) > 0:
-                        look_ahead_start_i = chunk_end_i
-                        look_ahead_end_i = look_ahead_start_i + n_look_ahead_rows
-                        try:
-                            data.look_ahead = self.store.select(
-                                key=key, columns=cols, 
-                                start=look_ahead_start_i,
-                                stop=look_ahead_end_i)
-                        except ValueError:
-                            data.look_ahead = pd.DataFrame()
+                        data.look_ahead = look_ahead
                     else:
                         data.look_ahead = pd.DataFrame()
 
@@ -145,6 +157,106 @@ class HDFDataStore(DataStore):
                 yield data
                 del data
 
+    def load_many(self, keys, cols=None, sections=None,
+                  chunksize=MAX_MEM_ALLOWANCE_IN_BYTES):
+        """Loads several tables at once, aligned in time.
+
+        For each section, the rows of every key which lie within the 
+        section are found once (by binary search, see `_row_range`).
+        The section is then split into consecutive time spans such that
+        the key with the most rows in the section has `chunksize` rows
+        per time span.  Each time span is read with a single select per
+        key, continuing from where the previous select for that key
+        stopped.
+
+        See `DataStore.load_many` for the parameters and return value.
+        """
+        chunksize = int(chunksize)
+
+        # Set `sections` variable
+        sections = [TimeFrame()] if sections is None else sections
+        sections = TimeFrameGroup(sections)
+
+        keys = list(keys)
+        tables = OrderedDict()
+        key_cols = {}
+        for key in keys:
+            tables[key] = self._get_table(key)
+            these_cols = cols.get(key) if isinstance(cols, dict) else cols
+            # Replace any Nones with '' in cols:
+            if these_cols is not None:
+                these_cols = [('' if pq is None else pq, '' if ac is None else ac)
+                              for pq, ac in these_cols]
+            key_cols[key] = these_cols
+
+        self.all_sections_smaller_than_chunksize = True
+
+        for section in sections:
+            window_intersect = self.window.intersection(section)
+            if window_intersect.empty:
+                yield _empty_chunks(keys, section)
+                continue
+
+            row_ranges = OrderedDict(
+                (key, self._row_range(key, window_intersect)) for key in keys)
+            n_rows = dict((key, stop_i - start_i) 
+                          for key, (start_i, stop_i) in row_ranges.iteritems())
+            reference_key = max(keys, key=lambda key: n_rows[key])
+            if n_rows[reference_key] <= 0:
+                yield _empty_chunks(keys, window_intersect)
+                continue
+
+            # Timestamps at which to split the section, taken from the 
+            # key with the most rows.
+            reference_table = tables[reference_key]
+            reference_start_i, reference_stop_i = row_ranges[reference_key]
+            boundaries_ns = [
+                reference_table.read(start=i, stop=i+1, field='index')[0]
+                for i in xrange(reference_start_i + chunksize, 
+                                reference_stop_i, chunksize)]
+            n_chunks = len(boundaries_ns) + 1
+            if n_chunks > 1:
+                self.all_sections_smaller_than_chunksize = False
+
+            start_is = dict((key, start_i) 
+                            for key, (start_i, _) in row_ranges.iteritems())
+            for chunk_i in range(n_chunks):
+                there_are_more_subchunks = (chunk_i < n_chunks-1)
+                chunks = OrderedDict()
+                for key in keys:
+                    start_i = start_is[key]
+                    if there_are_more_subchunks:
+                        table = tables[key]
+                        stop_i = min(self._search_index(
+                            key, table, table.nrows, boundaries_ns[chunk_i],
+                            'left'), row_ranges[key][1])
+                    else:
+                        stop_i = row_ranges[key][1]
+                    if stop_i > start_i:
+                        data = self.store.select(key=key, columns=key_cols[key],
+                                                 start=start_i, stop=stop_i)
+                        start_is[key] = stop_i
+                    else:
+                        data = pd.DataFrame()
+                    chunks[key] = data
+
+                # Every chunk in `chunks` gets the same timeframe
+                tz = chunks[reference_key].index.tz
+                start = (window_intersect.start if chunk_i == 0 else
+                         _timestamp_from_ns(boundaries_ns[chunk_i-1], tz))
+                end = (_timestamp_from_ns(boundaries_ns[chunk_i], tz)
+                       if there_are_more_subchunks else window_intersect.end)
+                if start is None:
+                    start = min([data.index[0] for data in chunks.values()
+                                 if not data.empty])
+                if end is None:
+                    end = max([data.index[-1] for data in chunks.values()
+                               if not data.empty])
+                timeframe = TimeFrame(start, end)
+                for data in chunks.values():
+                    data.timeframe = timeframe
+                yield chunks
+
     @doc_inherit
     def append(self, key, value):
         """
@@ -161,6 +273,8 @@ class HDFDataStore(DataStore):
         """
         self.store.append(key=key, value=value)
         self.store.flush()
+        self._sparse_indexes.pop(_normalise_key(key), None)
+        self._on_key_modified(key)
 
     @doc_inherit
     def put(self, key, value):
@@ -169,10 +283,45 @@ class HDFDataStore(DataStore):
         self.store.create_table_index(key, columns=['index'], 
                                       kind='full', optlevel=9)
         self.store.flush()
+        self._sparse_indexes.pop(_normalise_key(key), None)
+        self._on_key_modified(key)
+
+    def write_session(self, dtype=None, complib=None, complevel=None,
+                      index=True):
+        """Returns a context manager which batches appends and puts.
+        Nothing is flushed until the session closes.
+
+        Parameters
+        ----------
+        dtype : numpy dtype, optional
+            e.g. np.float32.  If set then floating point columns are
+            converted to `dtype` before being written.  Must match the
+            dtype of any existing table being appended to.
+        complib : {'zlib', 'bzip2', 'lzo', 'blosc'}, optional
+            Compression library for new tables.  Defaults to the store's
+            compression library.
+        complevel : int, 0-9, optional
+            Compression level for new tables.  Defaults to the store's
+            compression level.
+        index : boolean, optional, defaults to True
+            If True then build a full index on the 'index' column of
+            every table written, once per table when the session closes.
+
+        Returns
+        -------
+        HDFWriteSession
+        """
+        return HDFWriteSession(self, dtype=dtype, complib=complib,
+                               complevel=complevel, index=index)
 
     @doc_inherit
     def remove(self, key):
         self.store.remove(key)
+        self._on_key_modified(key)
+        prefix = _normalise_key(key)
+        for cached_key in self._sparse_indexes.keys():
+            if cached_key.startswith(prefix):
+                del self._sparse_indexes[cached_key]
 
     @doc_inherit
     def load_metadata(self, key='/'):    
@@ -209,6 +358,7 @@ class HDFDataStore(DataStore):
     @doc_inherit
     def open(self, mode='a'):
         self.store.open(mode=mode)
+        self.mode = mode
         
     @doc_inherit
     def get_timeframe(self, key):
@@ -289,14 +439,112 @@ class HDFDataStore(DataStore):
         if timeframe_intersect.empty:
             nrows = 0
         elif timeframe_intersect:
-            terms = timeframe_intersect.query_terms('timeframe_intersect')
-            coords = self.store.select_as_coordinates(key, terms)
-            nrows = len(coords)
+            start_i, stop_i = self._row_range(key, timeframe_intersect)
+            nrows = max(stop_i - start_i, 0)
         else:
             storer = self._get_storer(key)
             nrows = storer.nrows
         return nrows
     
+    def _row_range(self, key, timeframe):
+        """Finds the rows of `key` which lie within `timeframe` by binary
+        search over the sorted index column.
+
+        Returns
+        -------
+        start_i, stop_i : ints
+            `timeframe` spans rows [start_i, stop_i).  If `stop_i` <= 
+            `start_i` then `timeframe` does not contain any rows.
+
+        Raises
+        ------
+        KeyError if `key` is not in store.
+        """
+        table = self._get_table(key)
+        nrows = table.nrows
+        if timeframe.start is None:
+            start_i = 0
+        else:
+            start_i = self._search_index(key, table, nrows,
+                                         timeframe.start.value, 'left')
+        if timeframe.end is None:
+            stop_i = nrows
+        else:
+            side = 'right' if timeframe.include_end else 'left'
+            stop_i = self._search_index(key, table, nrows,
+                                        timeframe.end.value, side)
+        return start_i, stop_i
+
+    def _search_index(self, key, table, nrows, timestamp_ns, side):
+        """Returns the row at which `timestamp_ns` would be inserted into
+        the index column of `table` (see `numpy.searchsorted`)."""
+        step = self.sparse_index_step
+        if step is None:
+            # Pure on-disk binary search: O(log n) single-row reads.
+            lo, hi = 0, nrows
+            while lo < hi:
+                mid = (lo + hi) // 2
+                value = table.read(start=mid, stop=mid+1, field='index')[0]
+                if value < timestamp_ns or (side == 'right' and 
+                                            value == timestamp_ns):
+                    lo = mid + 1
+                else:
+                    hi = mid
+            return lo
+
+        # Find the block of `step` rows which contains the answer using
+        # the in-memory sparse index, then search within that block.
+        sparse_index = self._sparse_index(key, table, nrows)
+        block_i = sparse_index.searchsorted(timestamp_ns, side=side)
+        if block_i == 0:
+            return 0
+        block_start_i = (block_i - 1) * step
+        block_stop_i = min(block_i * step, nrows)
+        block = table.read(start=block_start_i, stop=block_stop_i,
+                           field='index')
+        return block_start_i + block.searchsorted(timestamp_ns, side=side)
+
+    def _sparse_index(self, key, table, nrows):
+        """Returns every `self.sparse_index_step`th timestamp (as int64
+        nanoseconds) of the table at `key`.  Cached per key."""
+        key = _normalise_key(key)
+        try:
+            cached_nrows, sparse_index = self._sparse_indexes[key]
+        except KeyError:
+            pass
+        else:
+            if cached_nrows == nrows:
+                return sparse_index
+
+        sparse_index = table.read(field='index', step=self.sparse_index_step)
+        sparse_index = np.asarray(sparse_index, dtype=np.int64)
+        self._sparse_indexes[key] = (nrows, sparse_index)
+        return sparse_index
+
+    def _read_only_copy_args(self):
+        # PyTables refuses to open a file in mode 'r' if it is 
+        # already open for writing so re-open in 'a' mode, which
+        # leaves the file untouched.  Never re-open in 'w' mode!
+        if self.mode == 'r':
+            mode = 'r'
+        else:
+            mode = 'a'
+            self.store.flush()
+        return (self.filename,), {'mode': mode,
+                                  'sparse_index_step': self.sparse_index_step}
+
+    def _get_table(self, key):
+        """Returns the PyTables Table for `key`.
+
+        Raises
+        ------
+        KeyError if `key` is not in store.
+        """
+        storer = self.store.get_storer(key)
+        if storer is None:
+            raise KeyError("key '{}' not found".format(key))
+        return storer.table
+
     def _keys(self):
         return self.store.keys()
 
@@ -316,6 +564,66 @@ class HDFDataStore(DataStore):
             raise KeyError(key + ' not in store')
         
 
+class HDFWriteSession(WriteSession):
+    """Writes chunks to an HDFDataStore without flushing or indexing
+    after every chunk.  Use `HDFDataStore.write_session()` to create one.
+    """
+
+    def __init__(self, datastore, dtype=None, complib=None, complevel=None,
+                 index=True):
+        super(HDFWriteSession, self).__init__(datastore, dtype=dtype)
+        self.index = index
+        self._table_kwargs = {}
+        if complib is not None:
+            self._table_kwargs['complib'] = complib
+        if complevel is not None:
+            self._table_kwargs['complevel'] = complevel
+
+    def _append(self, key, value):
+        self.datastore.store.append(key=key, value=value, index=False,
+                                    **self._table_kwargs)
+        self.datastore._sparse_indexes.pop(_normalise_key(key), None)
+        self.datastore._on_key_modified(key)
+
+    def _put(self, key, value):
+        self.datastore.store.put(key, value, format='table', 
+                                 expectedrows=len(value), index=False,
+                                 **self._table_kwargs)
+        self.datastore._sparse_indexes.pop(_normalise_key(key), None)
+        self.datastore._on_key_modified(key)
+
+    def _close(self):
+        store = self.datastore.store
+        if self.index:
+            for key, stats in self._stats.iteritems():
+                t0 = time()
+                store.create_table_index(key, columns=['index'],
+                                         kind='full', optlevel=9)
+                stats['seconds'] += time() - t0
+        store.flush()
+
+
+def _normalise_key(key):
+    return '/' + key.strip('/')
+
+
+def _timestamp_from_ns(ns, tz=None):
+    """Converts nanoseconds since the epoch (UTC) to a pd.Timestamp."""
+    timestamp = pd.Timestamp(int(ns))
+    if tz is not None:
+        timestamp = timestamp.tz_localize('UTC').tz_convert(tz)
+    return timestamp
+
+
+def _empty_chunks(keys, timeframe):
+    chunks = OrderedDict()
+    for key in keys:
+        data = pd.DataFrame()
+        data.timeframe = timeframe
+        chunks[key] = data
+    return chunks
+
+
 def _timeframe_for_chunk(there_are_more_subchunks, chunk_i, window_intersect, index):
     start = None
     end = None
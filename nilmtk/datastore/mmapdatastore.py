@@ -0,0 +1,291 @@
+from __future__ import print_function, division
+import pandas as pd
+import numpy as np
+import json
+from os.path import isdir, isfile, join, exists, getsize
+from os import makedirs
+from shutil import rmtree
+from nilmtk.timeframe import TimeFrame
+from nilmtk.timeframegroup import TimeFrameGroup
+from .datastore import MAX_MEM_ALLOWANCE_IN_BYTES
+from .directorydatastore import DirectoryDataStore, _normalise_key
+from .hdfdatastore import _timeframe_for_chunk, _timestamp_from_ns
+from .key import Key
+from nilmtk.docinherit import doc_inherit
+
+
+INDEX_FILENAME = 'index.int64'
+VALUES_FILENAME = 'values.float32'
+HEADER_FILENAME = 'header.json'
+PICKLE_FILENAME = 'table.pickle'
+
+
+class MmapDataStore(DirectoryDataStore):
+    """Stores each meter as two raw binary files which are memory-mapped
+    with `numpy.memmap` when loaded:
+
+        <filename>/building1/elec/meter1/index.int64
+            UTC timestamps in nanoseconds, sorted.
+        <filename>/building1/elec/meter1/values.float32
+            Measurements as a row-major (n_rows, n_columns) float32 array.
+        <filename>/building1/elec/meter1/header.json
+            Column labels and timezone.
+
+    `load` finds each section by binary search over the mapped timestamp
+    array and returns chunks whose values are views onto the mapped
+    arrays, so no data is copied or deserialised.  The operating system's
+    page cache does the caching and several processes reading the same
+    file share one physical copy of the data.
+
+    The maps are opened copy-on-write: modifying a chunk in place (as
+    `nilmtk.preprocessing.Clip` does) never changes the data on disk.
+    Selecting a non-contiguous set of `cols` requires a copy.
+
+    Tables which are not meter data (e.g. the statistics cache) are stored
+    as pickled DataFrames.
+    """
+
+    @doc_inherit
+    def __init__(self, filename):
+        self._arrays = {}
+        super(MmapDataStore, self).__init__(filename)
+
+    @doc_inherit
+    def __getitem__(self, key):
+        path = self._key_to_abs_path(key)
+        if isfile(join(path, PICKLE_FILENAME)):
+            return pd.read_pickle(join(path, PICKLE_FILENAME))
+        index, values, header = self._mmap(key)
+        return _make_dataframe(index, values, header)
+
+    @doc_inherit
+    def _load(self, key, cols=None, sections=None, n_look_ahead_rows=0,
+              chunksize=MAX_MEM_ALLOWANCE_IN_BYTES):
+        chunksize = int(chunksize)
+
+        # Set `sections` variable
+        sections = [TimeFrame()] if sections is None else sections
+        sections = TimeFrameGroup(sections)
+
+        index, values, header = self._mmap(key)
+        col_indexer = _column_indexer(header, cols)
+        n_rows = len(index)
+
+        self.all_sections_smaller_than_chunksize = True
+
+        for section in sections:
+            window_intersect = self.window.intersection(section)
+
+            if window_intersect.empty:
+                data = pd.DataFrame()
+                data.timeframe = section
+                yield data
+                continue
+
+            # Binary search over the mapped (sorted) timestamps.
+            if window_intersect.start is None:
+                section_start_i = 0
+            else:
+                section_start_i = index.searchsorted(
+                    window_intersect.start.value)
+            if window_intersect.end is None:
+                section_end_i = n_rows
+            else:
+                section_end_i = index.searchsorted(
+                    window_intersect.end.value,
+                    side='right' if window_intersect.include_end else 'left')
+
+            if section_end_i <= section_start_i:
+                data = pd.DataFrame()
+                data.timeframe = window_intersect
+                if n_look_ahead_rows > 0:
+                    data.look_ahead = pd.DataFrame()
+                yield data
+                continue
+
+            slice_starts = range(section_start_i, section_end_i, chunksize)
+            n_chunks = len(slice_starts)
+            if n_chunks > 1:
+                self.all_sections_smaller_than_chunksize = False
+
+            for chunk_i, chunk_start_i in enumerate(slice_starts):
+                chunk_end_i = min(chunk_start_i + chunksize, section_end_i)
+                there_are_more_subchunks = (chunk_i < n_chunks-1)
+                data = _make_dataframe(index[chunk_start_i:chunk_end_i],
+                                       values[chunk_start_i:chunk_end_i],
+                                       header, col_indexer)
+
+                # Load look ahead if necessary
+                if n_look_ahead_rows > 0:
+                    look_ahead_end_i = min(chunk_end_i + n_look_ahead_rows,
+                                           n_rows)
+                    data.look_ahead = _make_dataframe(
+                        index[chunk_end_i:look_ahead_end_i],
+                        values[chunk_end_i:look_ahead_end_i],
+                        header, col_indexer)
+
+                data.timeframe = _timeframe_for_chunk(there_are_more_subchunks,
+                                                      chunk_i, window_intersect,
+                                                      data.index)
+                yield data
+
+    @doc_inherit
+    def append(self, key, value):
+        path = self._key_to_abs_path(key)
+        if not exists(path):
+            makedirs(path)
+
+        if not _is_meter_key(key) or isfile(join(path, PICKLE_FILENAME)):
+            # Not meter data so just store as a pickled DataFrame.
+            pickle_filename = join(path, PICKLE_FILENAME)
+            if isfile(pickle_filename):
+                value = pd.read_pickle(pickle_filename).append(value)
+            value.to_pickle(pickle_filename)
+            self._on_key_modified(key)
+            return
+
+        if not isinstance(value.index, pd.DatetimeIndex):
+            raise TypeError("MmapDataStore can only store meter data"
+                            " with a DatetimeIndex.")
+        header = _header_for(value)
+        header_filename = join(path, HEADER_FILENAME)
+        if isfile(header_filename):
+            existing_header = _read_header(header_filename)
+            if existing_header['columns'] != header['columns']:
+                raise ValueError("Columns {} do not match the columns already"
+                                 " stored in '{}'".format(list(value.columns),
+                                                         key))
+        else:
+            with open(header_filename, 'w') as fh:
+                json.dump(header, fh)
+
+        # Write values before the index: the number of rows is taken from
+        # the length of the index so a partially written append is ignored.
+        values = np.ascontiguousarray(value.values, dtype=np.float32)
+        with open(join(path, VALUES_FILENAME), 'ab') as fh:
+            values.tofile(fh)
+        with open(join(path, INDEX_FILENAME), 'ab') as fh:
+            np.ascontiguousarray(value.index.asi8, dtype=np.int64).tofile(fh)
+        self._arrays.pop(_normalise_key(key), None)
+        self._on_key_modified(key)
+
+    @doc_inherit
+    def put(self, key, value):
+        path = self._key_to_abs_path(key)
+        if isdir(path):
+            rmtree(path)
+        self._arrays.pop(_normalise_key(key), None)
+        self.append(key, value)
+
+    @doc_inherit
+    def remove(self, key):
+        prefix = _normalise_key(key)
+        for cached_key in self._arrays.keys():
+            if cached_key.startswith(prefix):
+                del self._arrays[cached_key]
+        super(MmapDataStore, self).remove(key)
+
+    @doc_inherit
+    def get_timeframe(self, key):
+        index, values, header = self._mmap(key)
+        if len(index) == 0:
+            raise KeyError("key '{}' is empty".format(key))
+        tz = header['tz']
+        timeframe = TimeFrame(_timestamp_from_ns(index[0], tz),
+                              _timestamp_from_ns(index[-1], tz))
+        return self.window.intersection(timeframe)
+
+    def _read_only_copy_args(self):
+        return (self.filename,), {}
+
+    def _mmap(self, key):
+        """Returns the memory-mapped index, values and header for `key`.
+        Maps are re-opened if the files have grown since they were
+        last mapped."""
+        key = _normalise_key(key)
+        path = self._key_to_abs_path(key)
+        index_filename = join(path, INDEX_FILENAME)
+        if not isfile(index_filename):
+            raise KeyError("key '{}' not found".format(key))
+        file_size = getsize(index_filename)
+        try:
+            cached_file_size, arrays = self._arrays[key]
+        except KeyError:
+            pass
+        else:
+            if cached_file_size == file_size:
+                return arrays
+
+        header = _read_header(join(path, HEADER_FILENAME))
+        n_cols = len(header['columns'])
+        n_rows = file_size // np.dtype(np.int64).itemsize
+        if n_rows == 0:
+            index = np.empty(0, dtype=np.int64)
+            values = np.empty((0, n_cols), dtype=np.float32)
+        else:
+            index = np.memmap(index_filename, dtype=np.int64, mode='c',
+                              shape=(n_rows,))
+            values = np.memmap(join(path, VALUES_FILENAME), dtype=np.float32,
+                               mode='c', shape=(n_rows, n_cols))
+        arrays = (index, values, header)
+        self._arrays[key] = (file_size, arrays)
+        return arrays
+
+
+def _is_meter_key(key):
+    try:
+        key_object = Key(key)
+    except (AssertionError, ValueError):
+        return False
+    return key_object.meter is not None
+
+
+def _header_for(df):
+    columns = [list(col) if isinstance(col, tuple) else col
+               for col in df.columns]
+    column_names = [None if name is None else str(name)
+                    for name in df.columns.names]
+    tz = None if df.index.tz is None else str(df.index.tz)
+    return {'columns': columns, 'column_names': column_names, 'tz': tz}
+
+
+def _read_header(filename):
+    with open(filename) as fh:
+        header = json.load(fh)
+    header['columns'] = [tuple(col) if isinstance(col, list) else col
+                         for col in header['columns']]
+    return header
+
+
+def _column_indexer(header, cols):
+    """Returns a slice (if possible, so we get a view) or a list of
+    column positions for `cols`."""
+    if cols is None:
+        return slice(None)
+    columns = header['columns']
+    positions = []
+    for col in cols:
+        col = tuple('' if level is None else level for level in col)
+        try:
+            positions.append(columns.index(col))
+        except ValueError:
+            raise KeyError("column {} not found".format(col))
+    if positions == list(range(positions[0], positions[-1]+1)):
+        return slice(positions[0], positions[-1]+1)
+    return positions
+
+
+def _make_dataframe(index, values, header, col_indexer=slice(None)):
+    columns = header['columns']
+    if isinstance(col_indexer, slice):
+        columns = columns[col_indexer]
+    else:
+        columns = [columns[i] for i in col_indexer]
+    if columns and all([isinstance(col, tuple) for col in columns]):
+        columns = pd.MultiIndex.from_tuples(columns,
+                                            names=header['column_names'])
+    dt_index = pd.DatetimeIndex(index.view('datetime64[ns]'), copy=False)
+    if header['tz'] is not None:
+        dt_index = dt_index.tz_localize('UTC').tz_convert(header['tz'])
+    return pd.DataFrame(values[:, col_indexer], index=dt_index,
+                        columns=columns, copy=False)
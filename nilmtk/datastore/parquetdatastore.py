@@ -0,0 +1,307 @@
+from __future__ import print_function, division
+import pandas as pd
+import numpy as np
+import json
+from collections import OrderedDict
+from os.path import isdir, join, exists
+from os import listdir, makedirs
+from shutil import rmtree
+from nilmtk.timeframe import TimeFrame
+from nilmtk.timeframegroup import TimeFrameGroup
+from .datastore import MAX_MEM_ALLOWANCE_IN_BYTES
+from .directorydatastore import DirectoryDataStore, rechunk, _normalise_key
+from .hdfdatastore import _timestamp_from_ns
+from nilmtk.docinherit import doc_inherit
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+
+INDEX_COLUMN = '__index_ns'
+METADATA_KEY = b'nilmtk'
+ROW_GROUP_SIZE = 2**16
+PART_FILENAME = 'part-{:05d}.parquet'
+
+
+class ParquetDataStore(DirectoryDataStore):
+    """Stores each table as a directory of Parquet files.
+
+    Every call to `append` writes a new Parquet file (a 'part') to the
+    table's directory and every part is split into row groups of
+    `row_group_size` rows.  Parquet records the minimum and maximum
+    timestamp of each row group in the file footer, so `load` and
+    `get_timeframe` only need to read the footers to work out which
+    row groups overlap the requested sections.  Only overlapping row
+    groups (plus any needed for `n_look_ahead_rows`) and only the
+    requested `cols` are read from disk.
+
+    Requires `pyarrow`.
+
+    Attributes
+    ----------
+    row_group_size : int
+        Number of rows per Parquet row group for new data.
+    """
+
+    @doc_inherit
+    def __init__(self, filename, row_group_size=ROW_GROUP_SIZE):
+        if pq is None:
+            raise ImportError("ParquetDataStore requires pyarrow.  "
+                              "Please install pyarrow.")
+        self.row_group_size = row_group_size
+        self._row_groups_cache = {}
+        super(ParquetDataStore, self).__init__(filename)
+
+    @doc_inherit
+    def __getitem__(self, key):
+        row_groups = self._row_groups(key)
+        frames = [self._read_row_group(row_group) for row_group in row_groups]
+        if frames:
+            return pd.concat(frames)
+        else:
+            return pd.DataFrame()
+
+    @doc_inherit
+    def _load(self, key, cols=None, sections=None, n_look_ahead_rows=0,
+              chunksize=MAX_MEM_ALLOWANCE_IN_BYTES):
+        chunksize = int(chunksize)
+
+        # Set `sections` variable
+        sections = [TimeFrame()] if sections is None else sections
+        sections = TimeFrameGroup(sections)
+
+        # Replace any Nones with '' in cols:
+        if cols is not None:
+            cols = [('' if physical_quantity is None else physical_quantity,
+                     '' if ac is None else ac)
+                    for physical_quantity, ac in cols]
+
+        row_groups = self._row_groups(key)
+        row_group_max_ns = np.array([rg.max_ns for rg in row_groups],
+                                    dtype=np.int64)
+        row_group_min_ns = np.array([rg.min_ns for rg in row_groups],
+                                    dtype=np.int64)
+
+        self.all_sections_smaller_than_chunksize = True
+
+        for section in sections:
+            window_intersect = self.window.intersection(section)
+
+            if window_intersect.empty:
+                data = pd.DataFrame()
+                data.timeframe = section
+                yield data
+                continue
+
+            # Prune row groups using the min / max timestamps
+            # stored in the Parquet footers.
+            if window_intersect.start is None:
+                first_rg_i = 0
+            else:
+                first_rg_i = row_group_max_ns.searchsorted(
+                    window_intersect.start.value)
+            if window_intersect.end is None:
+                end_rg_i = len(row_groups)
+            else:
+                end_rg_i = row_group_min_ns.searchsorted(
+                    window_intersect.end.value,
+                    side='right' if window_intersect.include_end else 'left')
+            n_rows_upper_bound = sum(
+                rg.nrows for rg in row_groups[first_rg_i:end_rg_i])
+            if n_rows_upper_bound > chunksize:
+                self.all_sections_smaller_than_chunksize = False
+
+            # Row groups after `end_rg_i` are only read if they are needed
+            # for the look ahead.
+            frames = (self._read_row_group(row_group, cols)
+                      for row_group in row_groups[first_rg_i:])
+            for chunk in rechunk(frames, window_intersect, chunksize,
+                                 n_look_ahead_rows):
+                yield chunk
+
+    @doc_inherit
+    def append(self, key, value):
+        path = self._key_to_abs_path(key)
+        if not exists(path):
+            makedirs(path)
+        part_filenames = _part_filenames(path)
+        if part_filenames:
+            existing_columns = self._table_metadata(
+                join(path, part_filenames[0]))['columns']
+            if _encode_columns(value.columns) != existing_columns:
+                raise ValueError("Columns {} do not match the columns already"
+                                 " stored in '{}'".format(list(value.columns),
+                                                         key))
+        filename = join(path, PART_FILENAME.format(len(part_filenames)))
+        pq.write_table(_dataframe_to_table(value), filename,
+                       row_group_size=self.row_group_size)
+        self._row_groups_cache.pop(_normalise_key(key), None)
+        self._on_key_modified(key)
+
+    @doc_inherit
+    def put(self, key, value):
+        path = self._key_to_abs_path(key)
+        if isdir(path):
+            rmtree(path)
+        self._row_groups_cache.pop(_normalise_key(key), None)
+        self.append(key, value)
+
+    @doc_inherit
+    def remove(self, key):
+        # Invalidate cached footers for `key` and any keys below `key`.
+        prefix = _normalise_key(key)
+        for cached_key in self._row_groups_cache.keys():
+            if cached_key.startswith(prefix):
+                del self._row_groups_cache[cached_key]
+        super(ParquetDataStore, self).remove(key)
+
+    @doc_inherit
+    def get_timeframe(self, key):
+        row_groups = self._row_groups(key)
+        if not row_groups:
+            raise KeyError("key '{}' is empty".format(key))
+        tz = row_groups[0].tz
+        timeframe = TimeFrame(_timestamp_from_ns(row_groups[0].min_ns, tz),
+                              _timestamp_from_ns(row_groups[-1].max_ns, tz))
+        return self.window.intersection(timeframe)
+
+    def _read_only_copy_args(self):
+        return (self.filename,), {'row_group_size': self.row_group_size}
+
+    def _row_groups(self, key):
+        """Returns a list of `_RowGroup` for every row group in `key`,
+        in the order they appear on disk.  Only the Parquet footers
+        are read.  The list is cached until `key` is modified."""
+        key = _normalise_key(key)
+        try:
+            return self._row_groups_cache[key]
+        except KeyError:
+            pass
+
+        self._check_key(key)
+        path = self._key_to_abs_path(key)
+        row_groups = []
+        for part_filename in _part_filenames(path):
+            filename = join(path, part_filename)
+            parquet_file = pq.ParquetFile(filename)
+            table_metadata = _table_metadata_from_schema(
+                parquet_file.schema_arrow)
+            index_i = parquet_file.schema_arrow.get_field_index(INDEX_COLUMN)
+            file_metadata = parquet_file.metadata
+            for rg_i in range(file_metadata.num_row_groups):
+                rg_metadata = file_metadata.row_group(rg_i)
+                if rg_metadata.num_rows == 0:
+                    continue
+                stats = rg_metadata.column(index_i).statistics
+                if stats is not None and stats.has_min_max:
+                    min_ns, max_ns = stats.min, stats.max
+                else:
+                    index = parquet_file.read_row_group(
+                        rg_i, columns=[INDEX_COLUMN]).column(0).to_pandas()
+                    min_ns, max_ns = index.iloc[0], index.iloc[-1]
+                row_groups.append(_RowGroup(
+                    filename=filename, i=rg_i, nrows=rg_metadata.num_rows,
+                    min_ns=int(min_ns), max_ns=int(max_ns),
+                    columns=table_metadata['columns'],
+                    column_names=table_metadata['column_names'],
+                    tz=table_metadata['tz'],
+                    parquet_file=parquet_file))
+        self._row_groups_cache[key] = row_groups
+        return row_groups
+
+    def _read_row_group(self, row_group, cols=None):
+        """Reads a single row group from disk.  Only reads `cols`
+        (and the index) if `cols` is not None."""
+        if cols is None:
+            columns = row_group.columns
+        else:
+            columns = _encode_columns(cols)
+            missing = set(columns) - set(row_group.columns)
+            if missing:
+                raise KeyError("columns {} not found in '{}'"
+                               .format(cols, row_group.filename))
+        table = row_group.parquet_file.read_row_group(
+            row_group.i, columns=[INDEX_COLUMN] + columns)
+        df = table.to_pandas()
+        index = _index_from_ns(df.pop(INDEX_COLUMN).values, row_group.tz)
+        df.index = index
+        df.columns = _decode_columns(columns, row_group.column_names)
+        return df
+
+    def _table_metadata(self, filename):
+        return _table_metadata_from_schema(pq.read_schema(filename))
+
+
+class _RowGroup(object):
+    """Location and time span of a single Parquet row group."""
+    def __init__(self, filename, i, nrows, min_ns, max_ns,
+                 columns, column_names, tz, parquet_file):
+        self.filename = filename
+        self.i = i
+        self.nrows = nrows
+        self.min_ns = min_ns
+        self.max_ns = max_ns
+        self.columns = columns
+        self.column_names = column_names
+        self.tz = tz
+        self.parquet_file = parquet_file
+
+
+def _part_filenames(path):
+    return sorted([filename for filename in listdir(path)
+                   if filename.endswith('.parquet')])
+
+
+def _encode_columns(columns):
+    """Parquet column names must be strings so we JSON-encode
+    each column label (which might be a tuple)."""
+    return [json.dumps(list(col) if isinstance(col, tuple) else col)
+            for col in columns]
+
+
+def _decode_columns(encoded_columns, column_names):
+    labels = []
+    for encoded in encoded_columns:
+        label = json.loads(encoded)
+        labels.append(tuple(label) if isinstance(label, list) else label)
+    if labels and all([isinstance(label, tuple) for label in labels]):
+        return pd.MultiIndex.from_tuples(labels, names=column_names)
+    else:
+        return pd.Index(labels, name=column_names[0] if column_names else None)
+
+
+def _dataframe_to_table(df):
+    if not isinstance(df.index, pd.DatetimeIndex):
+        raise TypeError("ParquetDataStore can only store DataFrames"
+                        " with a DatetimeIndex.")
+    columns = _encode_columns(df.columns)
+    data = OrderedDict()
+    data[INDEX_COLUMN] = df.index.asi8
+    for encoded, (_, series) in zip(columns, df.iteritems()):
+        data[encoded] = series.values
+    tz = None if df.index.tz is None else str(df.index.tz)
+    column_names = [None if name is None else str(name)
+                    for name in df.columns.names]
+    table_metadata = {'tz': tz, 'columns': columns,
+                      'column_names': column_names}
+    table = pa.Table.from_pandas(pd.DataFrame(data, columns=data.keys()),
+                                 preserve_index=False)
+    schema_metadata = dict(table.schema.metadata or {})
+    schema_metadata[METADATA_KEY] = json.dumps(table_metadata).encode('utf8')
+    return table.replace_schema_metadata(schema_metadata)
+
+
+def _table_metadata_from_schema(schema):
+    return json.loads(schema.metadata[METADATA_KEY].decode('utf8'))
+
+
+def _index_from_ns(index_ns, tz):
+    index = pd.DatetimeIndex(np.asarray(index_ns, dtype=np.int64)
+                             .view('datetime64[ns]'))
+    if tz is not None:
+        index = index.tz_localize('UTC').tz_convert(tz)
+    return index
@@ -0,0 +1,132 @@
+from __future__ import print_function, division
+import sys
+import threading
+from Queue import Queue, Full
+from time import time
+
+
+# Seconds between checks of whether the consumer has gone away.
+_POLL_INTERVAL = 0.1
+
+# Serialises reads from DataStores whose `supports_concurrent_reads` is
+# False (e.g. HDF5, which is not thread-safe even across separate
+# files).  Re-entrant because a read may start another read (e.g. the
+# chunk cache loading through `_load`).
+SERIAL_READ_LOCK = threading.RLock()
+
+
+def serialise_reads(generator, lock=SERIAL_READ_LOCK):
+    """Yields the chunks of `generator`, holding `lock` whenever
+    `generator` is running (i.e. reading) but not while the consumer
+    processes each chunk."""
+    while True:
+        with lock:
+            try:
+                chunk = next(generator)
+            except StopIteration:
+                return
+        yield chunk
+
+
+class ChunkPrefetcher(object):
+    """Iterates over `generator` on a background thread, keeping up to
+    `n_chunks` chunks ready in a bounded queue so the next chunk is
+    read and decoded from disk while the consumer is still processing
+    the current chunk.
+
+    Chunks are passed through untouched, so attributes like `timeframe`
+    and `look_ahead` are preserved.  Any exception raised by `generator`
+    is re-raised in the consumer's thread.
+
+    Attributes
+    ----------
+    wait_time : float
+        Total number of seconds the consumer has spent blocked waiting
+        for the next chunk.  If this is close to zero then I/O is
+        completely hidden behind the consumer's processing.
+    n_chunks_yielded : int
+    """
+
+    def __init__(self, generator, n_chunks=1, on_wait=None):
+        """
+        Parameters
+        ----------
+        generator : generator of pd.DataFrames
+        n_chunks : int, optional
+            Maximum number of chunks to read ahead of the consumer.
+        on_wait : function, optional
+            Called with the number of seconds the consumer waited
+            after each chunk is received.
+        """
+        if n_chunks < 1:
+            raise ValueError("n_chunks must be >= 1")
+        self.wait_time = 0.0
+        self.n_chunks_yielded = 0
+        self._on_wait = on_wait
+        self._queue = Queue(maxsize=n_chunks)
+        self._stop = threading.Event()
+        self._finished = False
+        # The thread must not hold a reference to `self` otherwise
+        # `self` would never be garbage collected if the consumer
+        # stops iterating early.
+        self._thread = threading.Thread(
+            target=_produce, args=(generator, self._queue, self._stop))
+        self._thread.daemon = True
+        self._thread.start()
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        if self._finished:
+            raise StopIteration
+        t0 = time()
+        kind, payload = self._queue.get()
+        wait = time() - t0
+        self.wait_time += wait
+        if self._on_wait is not None:
+            self._on_wait(wait)
+
+        if kind == 'chunk':
+            self.n_chunks_yielded += 1
+            return payload
+        self._finished = True
+        self._thread.join()
+        if kind == 'error':
+            exc_type, exc_value, exc_traceback = payload
+            raise exc_type, exc_value, exc_traceback
+        raise StopIteration
+
+    __next__ = next
+
+    def close(self):
+        """Stop the background thread.  Called automatically when the
+        prefetcher is garbage collected."""
+        self._stop.set()
+        self._finished = True
+
+    def __del__(self):
+        self.close()
+
+
+def _produce(generator, queue, stop):
+    try:
+        for chunk in generator:
+            if not _put(queue, stop, ('chunk', chunk)):
+                return
+    except Exception:
+        _put(queue, stop, ('error', sys.exc_info()))
+    else:
+        _put(queue, stop, ('done', None))
+
+
+def _put(queue, stop, item):
+    """Returns False if the consumer has gone away."""
+    while not stop.is_set():
+        try:
+            queue.put(item, timeout=_POLL_INTERVAL)
+        except Full:
+            continue
+        else:
+            return True
+    return False
@@ -0,0 +1,122 @@
+from __future__ import print_function, division
+import pandas as pd
+import numpy as np
+from collections import OrderedDict
+from time import time
+
+
+class WriteSession(object):
+    """Batches writes to a DataStore.  Use via `DataStore.write_session()`:
+
+        with datastore.write_session(dtype=np.float32) as session:
+            for chunk in chunks:
+                session.append(key, chunk)
+
+    Subclasses defer expensive work (flushing, building indexes) until
+    `close`.  This base class writes straight through to the DataStore.
+
+    Attributes
+    ----------
+    datastore : nilmtk.DataStore
+    dtype : numpy dtype or None
+        If not None then floating point columns are converted to
+        `dtype` before being written.
+    stats : pd.DataFrame
+        One row per key written.  Columns are 'n_rows', 'n_bytes' and
+        'seconds' (wall time spent writing, including any work done for
+        that key in `close`).  'n_bytes' is the in-memory size of the
+        values and index passed to the session (after any conversion to
+        `dtype`), not the number of bytes written to disk, which depends
+        on the DataStore's format and compression.
+    """
+
+    def __init__(self, datastore, dtype=None):
+        self.datastore = datastore
+        self.dtype = dtype
+        self.closed = False
+        self._stats = OrderedDict()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def append(self, key, value):
+        """Appends `value` to `key`.  See `DataStore.append`."""
+        self._write(self._append, key, value)
+
+    def put(self, key, value):
+        """Replaces `key` with `value`.  See `DataStore.put`."""
+        self._write(self._put, key, value)
+
+    def close(self):
+        """Finishes all deferred work.  Called automatically at the end of
+        a `with` block.  The session cannot be used after closing."""
+        if self.closed:
+            return
+        self._close()
+        self.closed = True
+
+    @property
+    def stats(self):
+        stats = pd.DataFrame(self._stats.values(), index=self._stats.keys(),
+                             columns=['n_rows', 'n_bytes', 'seconds'])
+        stats.index.name = 'key'
+        return stats
+
+    def report(self):
+        """Prints the number of rows, in-memory megabytes and seconds for
+        each key."""
+        stats = self.stats
+        stats['MB_in_memory'] = stats.pop('n_bytes') / 1E6
+        print(stats)
+
+    def _write(self, write_func, key, value):
+        if self.closed:
+            raise RuntimeError("WriteSession is closed.")
+        value = _downcast(value, self.dtype)
+        t0 = time()
+        write_func(key, value)
+        stats = self._stats_for(key)
+        stats['seconds'] += time() - t0
+        stats['n_rows'] += len(value)
+        stats['n_bytes'] += _nbytes(value)
+
+    def _stats_for(self, key):
+        return self._stats.setdefault(
+            key, {'n_rows': 0, 'n_bytes': 0, 'seconds': 0.0})
+
+    def _append(self, key, value):
+        self.datastore.append(key, value)
+
+    def _put(self, key, value):
+        self.datastore.put(key, value)
+
+    def _close(self):
+        pass
+
+
+def _downcast(value, dtype):
+    """Returns `value` with floating point columns converted to `dtype`."""
+    if dtype is None or not isinstance(value, pd.DataFrame):
+        return value
+    dtype = np.dtype(dtype)
+    columns_to_convert = [
+        col for col, col_dtype in value.dtypes.iteritems()
+        if col_dtype.kind == 'f' and col_dtype != dtype]
+    if not columns_to_convert:
+        return value
+    elif len(columns_to_convert) == len(value.columns):
+        return value.astype(dtype)
+    value = value.copy()
+    for col in columns_to_convert:
+        value[col] = value[col].astype(dtype)
+    return value
+
+
+def _nbytes(value):
+    nbytes = value.values.nbytes
+    if isinstance(value.index, pd.DatetimeIndex):
+        nbytes += value.index.asi8.nbytes
+    return nbytes
@@ -122,31 +122,35 @@ class CombinatorialOptimisation(object):
         mains_data_location = '{}/elec/meter1'.format(building_path)
         data_is_available = False
 
-        for chunk in mains.power_series(**load_kwargs):
-            # Check that chunk is sensible size before resampling
-            if len(chunk) < self.MIN_CHUNK_LENGTH:
-                continue
-
-            # Record metadata
-            timeframes.append(chunk.timeframe)
-            measurement = chunk.name
-
-            appliance_powers = self.disaggregate_chunk(chunk, vampire_power)
-
-            for i, model in enumerate(self.model):
-                appliance_power = appliance_powers[i]
-                data_is_available = True
-                cols = pd.MultiIndex.from_tuples([chunk.name])
-                meter_instance = model['training_metadata'].instance()
-                df = pd.DataFrame(
-                    appliance_power.values, index=appliance_power.index,
-                    columns=cols)
-                key = '{}/elec/meter{}'.format(building_path, meter_instance)
-                output_datastore.append(key, df)
-
-            # Copy mains data to disag output
-            output_datastore.append(key=mains_data_location,
-                                    value=pd.DataFrame(chunk, columns=cols))
+        # Flush and index output once all chunks are written.
+        with output_datastore.write_session() as session:
+            for chunk in mains.power_series(**load_kwargs):
+                # Check that chunk is sensible size before resampling
+                if len(chunk) < self.MIN_CHUNK_LENGTH:
+                    continue
+
+                # Record metadata
+                timeframes.append(chunk.timeframe)
+                measurement = chunk.name
+
+                appliance_powers = self.disaggregate_chunk(chunk,
+                                                           vampire_power)
+
+                for i, model in enumerate(self.model):
+                    appliance_power = appliance_powers[i]
+                    data_is_available = True
+                    cols = pd.MultiIndex.from_tuples([chunk.name])
+                    meter_instance = model['training_metadata'].instance()
+                    df = pd.DataFrame(
+                        appliance_power.values, index=appliance_power.index,
+                        columns=cols)
+                    key = '{}/elec/meter{}'.format(building_path,
+                                                   meter_instance)
+                    session.append(key, df)
+
+                # Copy mains data to disag output
+                session.append(key=mains_data_location,
+                               value=pd.DataFrame(chunk, columns=cols))
 
         if not data_is_available:
             return
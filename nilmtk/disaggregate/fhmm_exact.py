@@ -7,7 +7,6 @@ from warnings import warn
 
 import pandas as pd
 import numpy as np
-from hmmlearn import hmm
 
 from ..timeframe import merge_timeframes, TimeFrame
 from ..feature_detectors import cluster
@@ -113,6 +112,7 @@ def compute_pi_fhmm(list_pi):
 
 
 def create_combined_hmm(model):
+    from hmmlearn import hmm
     list_pi = [model[appliance].startprob_ for appliance in model]
     list_A = [model[appliance].transmat_ for appliance in model]
     list_means = [model[appliance].means_.flatten().tolist()
@@ -182,6 +182,7 @@ class FHMM(object):
         Online HMMs are welcome if someone can contribute :)
         Assumes all pre-processing has been done.
         """
+        from hmmlearn import hmm
         learnt_model = OrderedDict()
         num_meters = len(metergroup.meters)
         if num_meters > 12:
@@ -308,33 +309,35 @@ class FHMM(object):
         mains_data_location = '{}/elec/meter1'.format(building_path)
         data_is_available = False
 
-        for chunk in mains.power_series(**load_kwargs):
-            # Check that chunk is sensible size before resampling
-            if len(chunk) < MIN_CHUNK_LENGTH:
-                continue
-
-            # Record metadata
-            timeframes.append(chunk.timeframe)
-            measurement = chunk.name
-
-            # Start disaggregation
-            predictions = self.disaggregate_chunk(chunk)
-
-            for meter in predictions.columns:
-                data_is_available = True
-                meter_instance = meter.instance()
-                cols = pd.MultiIndex.from_tuples([chunk.name])
-
-                predicted_power = predictions[[meter]]
-                output_df = pd.DataFrame(predicted_power)
-                output_df.columns = pd.MultiIndex.from_tuples([chunk.name])
-                output_datastore.append('{}/elec/meter{}'
-                                        .format(building_path, meter_instance),
-                                        output_df)
-
-            # Copy mains data to disag output
-            output_datastore.append(key=mains_data_location,
-                                    value=pd.DataFrame(chunk, columns=cols))
+        # Flush and index output once all chunks are written.
+        with output_datastore.write_session() as session:
+            for chunk in mains.power_series(**load_kwargs):
+                # Check that chunk is sensible size before resampling
+                if len(chunk) < MIN_CHUNK_LENGTH:
+                    continue
+
+                # Record metadata
+                timeframes.append(chunk.timeframe)
+                measurement = chunk.name
+
+                # Start disaggregation
+                predictions = self.disaggregate_chunk(chunk)
+
+                for meter in predictions.columns:
+                    data_is_available = True
+                    meter_instance = meter.instance()
+                    cols = pd.MultiIndex.from_tuples([chunk.name])
+
+                    predicted_power = predictions[[meter]]
+                    output_df = pd.DataFrame(predicted_power)
+                    output_df.columns = pd.MultiIndex.from_tuples([chunk.name])
+                    session.append('{}/elec/meter{}'
+                                   .format(building_path, meter_instance),
+                                   output_df)
+
+                # Copy mains data to disag output
+                session.append(key=mains_data_location,
+                               value=pd.DataFrame(chunk, columns=cols))
 
         if not data_is_available:
             return
@@ -423,24 +423,26 @@ class Hart85(object):
             prev[meter] = -1
 
         timeframes = []
-        # Now iterating over mains data and disaggregating chunk by chunk
-        for chunk in mains.power_series(**load_kwargs):
-            # Record metadata
-            timeframes.append(chunk.timeframe)
-            measurement = chunk.name
-            power_df = self.disaggregate_chunk(
-                chunk, prev, transients)
-
-            cols = pd.MultiIndex.from_tuples([chunk.name])
-
-            for meter in learnt_meters:
-                df = power_df[[meter]]
-                df.columns = cols
-                key = '{}/elec/meter{:d}'.format(building_path, meter + 2)
-                output_datastore.append(key, df)
-
-            output_datastore.append(key=mains_data_location,
-                                    value=pd.DataFrame(chunk, columns=cols))
+        # Flush and index output once all chunks are written.
+        with output_datastore.write_session() as session:
+            # Now iterating over mains data and disaggregating chunk by chunk
+            for chunk in mains.power_series(**load_kwargs):
+                # Record metadata
+                timeframes.append(chunk.timeframe)
+                measurement = chunk.name
+                power_df = self.disaggregate_chunk(
+                    chunk, prev, transients)
+
+                cols = pd.MultiIndex.from_tuples([chunk.name])
+
+                for meter in learnt_meters:
+                    df = power_df[[meter]]
+                    df.columns = cols
+                    key = '{}/elec/meter{:d}'.format(building_path, meter + 2)
+                    session.append(key, df)
+
+                session.append(key=mains_data_location,
+                               value=pd.DataFrame(chunk, columns=cols))
 
         # DataSet and MeterDevice metadata:
         meter_devices = {
@@ -3,10 +3,7 @@ import pandas as pd
 import numpy as np
 from ..timeframe import merge_timeframes, TimeFrame
 from disaggregator import Disaggregator
-from matplotlib import pyplot as plt
 from datetime import timedelta
-from scipy.stats import poisson, norm
-from sklearn import mixture
 
 
 class MLE(Disaggregator):
@@ -68,6 +65,8 @@ class MLE(Disaggregator):
         Inizialise of the model by default
 
         """
+        from scipy.stats import poisson
+        from sklearn import mixture
         super(MLE, self).__init__()
 
         # Metadata
@@ -95,6 +94,7 @@ class MLE(Disaggregator):
         self.timeWindow = 0        # To avoid high computation
 
     def __retrain(self, feature, feature_train):
+        from scipy.stats import norm
 
         print "Training " + feature_train.columns[0]
         mu, std = norm.fit(feature_train)
@@ -713,6 +713,7 @@ class MLE(Disaggregator):
                 print "Non valid kwarg"
 
         # Plot structure:
+        import matplotlib.pyplot as plt
         fig = plt.figure()
         ax1 = fig.add_subplot(311)
         ax2 = fig.add_subplot(312)
@@ -803,6 +804,7 @@ class MLE(Disaggregator):
                 print "Non valid kwarg"
 
         # Plot:
+        import matplotlib.pyplot as plt
         fig1 = plt.figure()
         ax1 = fig1.add_subplot(311)
         ax2 = fig1.add_subplot(312)
@@ -1,15 +1,20 @@
 from __future__ import print_function, division
 from warnings import warn
-from collections import namedtuple
+from collections import namedtuple, OrderedDict, deque
+from datetime import timedelta
 from copy import deepcopy
 from itertools import izip
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
 import random
 from .preprocessing import Clip
-from .stats import TotalEnergy, GoodSections, DropoutRate
+from .stats import TotalEnergy, GoodSections, DropoutRate, PowerDistribution
 from .stats.totalenergyresults import TotalEnergyResults
+from .stats.cachedstatindex import CachedStatIndex
+from .rollups import (ROLLUP_PERIODS, ROLLUP_HOWS, aggregate_samples, combine,
+                      get_stat, resample_rollup, floor_to_period,
+                      ceil_to_period)
+from .consts import SECS_PER_DAY
 from .hashable import Hashable
 from .appliance import Appliance
 from .datastore import Key
@@ -20,7 +25,8 @@ from .node import Node
 from .electric import Electric
 from .timeframe import TimeFrame, list_of_timeframe_dicts
 from nilmtk.exceptions import MeasurementError
-from .utils import flatten_2d_list, capitalise_first_letter
+from .utils import (flatten_2d_list, capitalise_first_letter,
+                    tz_localize_naive, copy_chunk)
 from nilmtk.timeframegroup import TimeFrameGroup
 import nilmtk
 
@@ -403,6 +409,12 @@ class ElecMeter(Hashable, Electric):
         preprocessing : list of Node subclass instances
             e.g. [Clip()].
 
+        use_rollups : boolean, defaults to True
+            If True and rollups have been built (see `build_rollups`) then
+            requests for a `sample_period` which exactly divides a day,
+            resampled using 'mean', 'min' or 'max', are served from the
+            coarsest rollup which fits instead of resampling the raw data.
+
         **kwargs : any other key word arguments to pass to `self.store.load()`
 
         Returns
@@ -415,6 +427,21 @@ class ElecMeter(Hashable, Electric):
         nilmtk.exceptions.MeasurementError if a measurement is specified
         which is not available.
         """
+        if kwargs.pop('use_rollups', True):
+            generator = self._load_from_rollups(kwargs)
+            if generator is not None:
+                return generator
+
+        kwargs = self._prep_load_kwargs(**kwargs)
+
+        # Get source node
+        preprocessing = kwargs.pop('preprocessing', [])
+        last_node = self.get_source_node(**kwargs)
+        return self._connect_preprocessing(last_node, preprocessing)
+
+    def _prep_load_kwargs(self, **kwargs):
+        """Returns `load`'s kwargs with resampling defaults set and 
+        resampling converted into a `preprocessing` node."""
         verbose = kwargs.get('verbose')
         if verbose:
             print()
@@ -444,9 +471,11 @@ class ElecMeter(Hashable, Electric):
             print("kwargs after processing")
             print(kwargs)
 
-        # Get source node
-        preprocessing = kwargs.pop('preprocessing', [])
-        last_node = self.get_source_node(**kwargs)
+        return kwargs
+
+    def _connect_preprocessing(self, last_node, preprocessing):
+        """Connects each node in `preprocessing` downstream of `last_node`
+        and returns the generator of the final node."""
         generator = last_node.generator
 
         # Connect together all preprocessing nodes
@@ -631,6 +660,117 @@ class ElecMeter(Hashable, Electric):
         return self._get_stat_from_cache_or_compute(
             nodes, results_obj, loader_kwargs)        
 
+    def power_distribution(self, ac_type='best', **loader_kwargs):
+        """Returns the distribution of power (summed across `ac_type`
+        columns, as `power_series()` does) from the cache if possible.
+        The distribution for each `ac_type` is cached separately.
+
+        Parameters
+        ----------
+        ac_type : str, defaults to 'best'
+        **loader_kwargs : key word arguments for DataStore.load()
+
+        Returns
+        -------
+        nilmtk.stats.powerdistributionresults.PowerDistributionResults
+        """
+        loader_kwargs = self._convert_physical_quantity_and_ac_type_to_cols(
+            physical_quantity='power', ac_type=ac_type, **loader_kwargs)
+        results_obj = PowerDistribution.results_class()
+        results_obj.name += '_' + '_'.join(
+            sorted([col_ac_type for _, col_ac_type in loader_kwargs['cols']]))
+        sections = self._sections_for_stat(loader_kwargs)
+        results_obj, sections_to_compute, cached_stat_index = (
+            self._import_stat_from_cache(results_obj, sections, loader_kwargs,
+                                         ac_types=set()))
+        if sections_to_compute:
+            loader_kwargs['sections'] = sections_to_compute
+            computed_result = self._compute_stat([PowerDistribution],
+                                                 loader_kwargs)
+            computed_result.results.name = results_obj.name
+            self._save_stat_to_cache(results_obj, computed_result.results,
+                                     cached_stat_index)
+        return results_obj
+
+    def compute_stats(self, stats=None, **loader_kwargs):
+        """Computes several statistics in a single pass over the data.
+
+        Each chunk is loaded once and handed to a separate pipeline for
+        each statistic.  Results are read from and written to the same
+        cache as the individual statistic methods (e.g. `total_energy()`),
+        so calling those methods afterwards is a cache hit.
+
+        Parameters
+        ----------
+        stats : list of nilmtk.Node subclasses, optional
+            Defaults to [TotalEnergy, GoodSections, DropoutRate].
+            Each Node must have a `results_class` with a `name` and must
+            yield one chunk for every chunk it receives.  Clip is applied
+            (to a copy of each chunk) before TotalEnergy.
+        full_results : bool, default=False
+        **loader_kwargs : key word arguments for DataStore.load()
+
+        Returns
+        -------
+        dict
+            Keys are the `name` of each results class (e.g. 'total_energy').
+            Values are whatever the individual statistic method would return
+            (e.g. a pd.Series for 'total_energy').
+
+        Notes
+        -----
+        DropoutRate is calculated over every section loaded, which is
+        equivalent to `dropout_rate(ignore_gaps=False)`.  Use
+        `compute_stats([DropoutRate], sections=meter.good_sections())`
+        to ignore gaps.
+        """
+        if stats is None:
+            stats = [TotalEnergy, GoodSections, DropoutRate]
+        full_results = loader_kwargs.pop('full_results', False)
+        verbose = loader_kwargs.get('verbose')
+        if GoodSections in stats:
+            loader_kwargs.setdefault('n_look_ahead_rows', 10)
+        if 'ac_type' in loader_kwargs or 'physical_quantity' in loader_kwargs:
+            loader_kwargs = self._convert_physical_quantity_and_ac_type_to_cols(**loader_kwargs)
+        ac_types = _ac_types_in_cols(loader_kwargs.get('cols', []))
+        sections = self._sections_for_stat(loader_kwargs)
+
+        # Group together the stats which need to compute the same sections,
+        # so we do one pass over the data for each group (usually just one).
+        results_objs = []
+        stats_for_sections = OrderedDict()
+        for stat in stats:
+            results_obj, sections_to_compute, cached_stat_index = (
+                self._import_stat_from_cache(
+                    self._results_obj_for(stat), sections, loader_kwargs,
+                    ac_types))
+            if verbose and not results_obj._data.empty:
+                print("Using cached result for", results_obj.name)
+            results_objs.append(results_obj)
+            if sections_to_compute:
+                stats_for_sections.setdefault(
+                    tuple(sections_to_compute), []).append(
+                        (stat, results_obj, cached_stat_index))
+
+        for sections_to_compute, stats_to_compute in stats_for_sections.items():
+            loader_kwargs['sections'] = list(sections_to_compute)
+            computed_nodes = self._compute_stats_in_one_pass(
+                [stat for stat, _, _ in stats_to_compute], loader_kwargs)
+            for (stat, results_obj, cached_stat_index), computed_node in izip(
+                    stats_to_compute, computed_nodes):
+                self._save_stat_to_cache(results_obj, computed_node.results,
+                                         cached_stat_index)
+
+        return OrderedDict(
+            [(results_obj.name,
+              _results_to_return(results_obj, full_results, ac_types))
+             for results_obj in results_objs])
+
+    def _results_obj_for(self, stat):
+        if stat is GoodSections:
+            return stat.results_class(self.device['max_sample_period'])
+        return stat.results_class()
+
     def _get_stat_from_cache_or_compute(self, nodes, results_obj, loader_kwargs):
         """General function for computing statistics and/or loading them from 
         cache.
@@ -666,78 +806,160 @@ class ElecMeter(Hashable, Electric):
         verbose = loader_kwargs.get('verbose')
         if 'ac_type' in loader_kwargs or 'physical_quantity' in loader_kwargs:
             loader_kwargs = self._convert_physical_quantity_and_ac_type_to_cols(**loader_kwargs)
-        cols = loader_kwargs.get('cols', [])
-        ac_types = set([m[1] for m in cols if m[1]])
-        results_obj_copy = deepcopy(results_obj)
+        ac_types = _ac_types_in_cols(loader_kwargs.get('cols', []))
+        sections = self._sections_for_stat(loader_kwargs)
 
-        # Prepare `sections` list
+        # Retrieve usable stats from cache
+        results_obj, sections_to_compute, cached_stat_index = (
+            self._import_stat_from_cache(results_obj, sections, loader_kwargs,
+                                         ac_types))
+
+        if verbose and not results_obj._data.empty:
+            print("Using cached result.")
+
+        # If we get to here then we have to compute some stats
+        if sections_to_compute:
+            loader_kwargs['sections'] = sections_to_compute
+            computed_result = self._compute_stat(nodes, loader_kwargs)
+            self._save_stat_to_cache(results_obj, computed_result.results,
+                                     cached_stat_index)
+
+        return _results_to_return(results_obj, full_results, ac_types)
+
+    def _sections_for_stat(self, loader_kwargs):
+        """Returns the non-empty sections requested in `loader_kwargs`
+        or, if none are requested, the meter's entire timeframe."""
         sections = loader_kwargs.get('sections')
         if sections is None:
             tf = self.get_timeframe()
             tf.include_end = True
             sections = [tf]
         sections = TimeFrameGroup(sections)
-        sections = [s for s in sections if not s.empty]
+        return [s for s in sections if not s.empty]
+
+    def _import_stat_from_cache(self, results_obj, sections, loader_kwargs,
+                                ac_types):
+        """Imports the rows for `sections` from the cache into `results_obj`.
+
+        Returns
+        -------
+        results_obj : nilmtk.Results subclass instance
+            `results_obj` or, if the cached results do not have every AC
+            type in `ac_types`, an empty copy of `results_obj`.
+        sections_to_compute : list of TimeFrames
+        cached_stat_index : CachedStatIndex or None
+            None if the cache was not used.
+        """
+        # Some `import_from_cache` implementations `append` to
+        # `results_obj` so take a deep copy while it is still empty.
+        results_obj_copy = deepcopy(results_obj)
+        if loader_kwargs.get('preprocessing') is not None:
+            return results_obj, sections, None
 
-        # Retrieve usable stats from cache
         key_for_cached_stat = self.key_for_cached_stat(results_obj.name)
-        if loader_kwargs.get('preprocessing') is None:
-            cached_stat = self.get_cached_stat(key_for_cached_stat)
-            results_obj.import_from_cache(cached_stat, sections)
-        
-            def find_sections_to_compute():
-                # Get sections_to_compute
-                results_obj_timeframes = results_obj.timeframes()
-                sections_to_compute = set(sections) - set(results_obj_timeframes)
-                sections_to_compute = list(sections_to_compute)
-                sections_to_compute.sort()
-                return sections_to_compute
-            try:
-                ac_type_keys = results_obj.simple().keys()
-            except:
-                sections_to_compute = find_sections_to_compute()
+        cached_stat_index = self._get_cached_stat_index(key_for_cached_stat)
+
+        # A section is cached if there is a row for the whole section
+        # or a chain of rows covering it (see `append`).
+        sections_to_import = set()
+        uncached_sections = set()
+        for section in sections:
+            if cached_stat_index.contains(section):
+                sections_to_import.add(section)
+                continue
+            tiles = cached_stat_index.tiling(section)
+            if tiles:
+                sections_to_import.update(tiles)
             else:
-                if ac_types.issubset(ac_type_keys):
-                    sections_to_compute = find_sections_to_compute()
-                else:
-                    sections_to_compute = sections
-                    results_obj = results_obj_copy
+                uncached_sections.add(section)
+        sections_to_import = sorted(sections_to_import)
+        results_obj.import_from_cache(
+            cached_stat_index.rows_for_sections(sections_to_import),
+            sections_to_import)
+
+        def find_sections_to_compute():
+            # Get sections_to_compute
+            sections_to_compute = list(uncached_sections)
+            sections_to_compute.sort()
+            return sections_to_compute
+        try:
+            ac_type_keys = results_obj.simple().keys()
+        except:
+            sections_to_compute = find_sections_to_compute()
         else:
-            sections_to_compute = sections
+            if ac_types.issubset(ac_type_keys):
+                sections_to_compute = find_sections_to_compute()
+            else:
+                sections_to_compute = sections
+                results_obj = results_obj_copy
+        return results_obj, sections_to_compute, cached_stat_index
+
+    def _save_stat_to_cache(self, results_obj, computed_results,
+                            cached_stat_index):
+        """Merges `computed_results` into `results_obj` and appends
+        `computed_results` to the cache."""
+        key_for_cached_stat = self.key_for_cached_stat(results_obj.name)
 
-        if verbose and not results_obj._data.empty:
-            print("Using cached result.")
+        # Merge cached results with newly computed
+        results_obj.update(computed_results)
 
-        # If we get to here then we have to compute some stats
-        if sections_to_compute:
-            loader_kwargs['sections'] = sections_to_compute
-            computed_result = self._compute_stat(nodes, loader_kwargs)
+        # Save to disk newly computed stats
+        stat_for_store = computed_results.export_to_cache()
+        try:
+            self.store.append(key_for_cached_stat, stat_for_store)
+        except ValueError:
+            # the old table probably had different columns
+            self.store.remove(key_for_cached_stat)
+            stat_for_store = results_obj.export_to_cache()
+            self.store.put(key_for_cached_stat, stat_for_store)
+            cached_stat_index = CachedStatIndex(stat_for_store)
+        else:
+            if cached_stat_index is not None:
+                cached_stat_index.extend(stat_for_store)
 
-            # Merge cached results with newly computed
-            results_obj.update(computed_result.results)
+        # Writing to the store drops the in-memory index so put
+        # the (now up-to-date) index back.
+        if cached_stat_index is not None:
+            key = '/' + key_for_cached_stat.strip('/')
+            self.store.cached_stat_indexes[key] = cached_stat_index
 
-            # Save to disk newly computed stats
-            stat_for_store = computed_result.results.export_to_cache()
-            try:
-                self.store.append(key_for_cached_stat, stat_for_store)
-            except ValueError:
-                # the old table probably had different columns
-                self.store.remove(key_for_cached_stat)
-                self.store.put(key_for_cached_stat, results_obj.export_to_cache())
-                
-        if full_results:
-            return results_obj
-        else:
-            res = results_obj.simple()
-            if ac_types:
-                try:
-                    ac_type_keys = res.keys()
-                except:
-                    return res
-                else:
-                    return pd.Series(res[ac_types], index=ac_types)
-            else:
-                return res
+    def _compute_stats_in_one_pass(self, stats, loader_kwargs):
+        """Loads each chunk once and feeds it to a separate pipeline for
+        each Node class in `stats`.
+
+        Returns
+        -------
+        list of Node objects (one per class in `stats`), each of which
+        has processed every chunk.
+        """
+        source_node = self.get_source_node(**loader_kwargs)
+        stat_nodes = []
+        branches = []
+        for stat in stats:
+            feeder = _ChunkFeeder(self)
+            last_node = feeder
+            for preprocessing_node in STAT_PREPROCESSING.get(stat, []):
+                last_node = preprocessing_node(last_node)
+            stat_node = stat(last_node)
+            stat_nodes.append(stat_node)
+            # Preprocessing may modify chunks in place so give
+            # those branches their own copy of each chunk.
+            branches.append((feeder, stat_node.process(),
+                             last_node is not feeder))
+
+        for chunk in source_node.generator:
+            for feeder, generator, needs_copy in branches:
+                feeder.chunks.append(copy_chunk(chunk) if needs_copy
+                                     else chunk)
+                next(generator)
+
+        # Let each node finish
+        for feeder, generator, _ in branches:
+            feeder.finished = True
+            for _ in generator:
+                pass
+
+        return stat_nodes
 
     def _compute_stat(self, nodes, loader_kwargs):
         """
@@ -807,6 +1029,357 @@ class ElecMeter(Hashable, Electric):
             else:
                 print("Removed", key_for_cache)
 
+    def _get_cached_stat_index(self, key_for_stat):
+        """Returns a CachedStatIndex for `key_for_stat`.  The cached
+        statistic is only read from the DataStore the first time."""
+        if self.store is None:
+            return CachedStatIndex(pd.DataFrame())
+        key = '/' + key_for_stat.strip('/')
+        try:
+            return self.store.cached_stat_indexes[key]
+        except KeyError:
+            pass
+        cached_stat_index = CachedStatIndex(self.get_cached_stat(key_for_stat))
+        self.store.cached_stat_indexes[key] = cached_stat_index
+        return cached_stat_index
+
+    def append(self, data, update_stats=True):
+        """Appends `data` to this meter's table in the DataStore and, if
+        `update_stats` is True, brings cached statistics up to date.
+
+        Only the appended data (plus the last sample before `data`, so the
+        gap between the old and new data is accounted for) is loaded.
+        `total_energy`, `good_sections` and `dropout_rate` are computed
+        for the new data and appended to the cache, but only for those
+        statistics which have already been cached.  The cached rows for
+        the new data start where the cached rows for the old data end so
+        the cache can serve the meter's whole timeframe by chaining rows
+        together (see `CachedStatIndex.tiling`).  Rollups are extended
+        if they have been built.
+
+        If `data` does not start after the existing data then the cache
+        is cleared instead, because the cached statistics are no longer
+        correct.
+
+        Parameters
+        ----------
+        data : pd.DataFrame
+            Must have the same columns as the data already stored.
+        update_stats : bool, default=True
+        """
+        self._check_store()
+        if data.empty:
+            return
+        try:
+            old_end = self.get_timeframe().end
+        except (KeyError, IndexError):
+            old_end = None
+        self.store.append(self.key, data)
+        if not update_stats or old_end is None:
+            return
+        if data.index[0] <= old_end:
+            self.clear_cache()
+            return
+
+        new_section = TimeFrame(old_end, data.index[-1])
+        new_section.include_end = True
+        stats = [stat for stat in [TotalEnergy, GoodSections, DropoutRate]
+                 if len(self._get_cached_stat_index(self.key_for_cached_stat(
+                     stat.results_class.name)))]
+        if stats:
+            self.compute_stats(stats, sections=[new_section])
+        if DropoutRate in stats:
+            # `dropout_rate()` ignores gaps by default so it caches
+            # rows for good sections.
+            self.dropout_rate(sections=[new_section])
+
+        rollup_periods = [period for period in ROLLUP_PERIODS
+                          if not self.get_cached_stat(
+                              self._rollup_keys(period)[1]).empty]
+        if rollup_periods:
+            self.build_rollups(periods=rollup_periods)
+
+    def build_rollups(self, periods=ROLLUP_PERIODS, verbose=False):
+        """Builds rollups of this meter's data, or brings existing rollups
+        up to date with data appended since they were last built.
+
+        A rollup summarises each `period`-second bucket of data with the
+        count, mean, min, max and energy of each measurement (see
+        `nilmtk.rollups`).  Complete buckets are appended to the DataStore
+        at `key_for_cached_stat('rollup_<period>')`.  The latest bucket
+        may still grow, so it is stored separately (at
+        'rollup_<period>_tail') and re-computed by the next call.  Hence
+        only data from the start of the earliest tail bucket is loaded.
+
+        `load(sample_period=...)` uses rollups (when they exist) to avoid
+        resampling the raw data.  Rollups are removed by `clear_cache()`.
+
+        Parameters
+        ----------
+        periods : list of ints, seconds
+            Each period must be a multiple of the previous period.
+        verbose : bool
+        """
+        self._check_store()
+        periods = sorted(periods)
+
+        # Find where each rollup level needs to resume from
+        complete_ends = {}
+        resume_from = []
+        for period in periods:
+            rollup_key, tail_key = self._rollup_keys(period)
+            complete_end = self._rollup_end(rollup_key, period)
+            complete_ends[period] = complete_end
+            tail = self.get_cached_stat(tail_key)
+            resume_from.append(complete_end if tail.empty else tail.index[0])
+        start = None if None in resume_from else min(resume_from)
+        if verbose:
+            print("Building rollups for", self.identifier, "from", start)
+
+        max_sample_period = self.device['max_sample_period']
+        limits = dict([
+            ((m.get('physical_quantity'), m.get('type')),
+             (m.get('lower_limit'), m.get('upper_limit')))
+            for m in self.device.get('measurements', [])])
+
+        # The last bucket at each level is carried over to the next chunk
+        # because the next chunk might contain more data for that bucket.
+        carried = dict([(period, None) for period in periods])
+        with self.store.write_session() as session:
+            for chunk in self.load(sections=[TimeFrame(start=start)],
+                                   n_look_ahead_rows=1, use_rollups=False):
+                if chunk.empty:
+                    continue
+                rollup = aggregate_samples(chunk, periods[0],
+                                           max_sample_period, limits)
+                for period in periods:
+                    rollup = _concat_rollups(carried[period], rollup)
+                    if rollup is None:
+                        # No new buckets for this level or coarser levels
+                        break
+                    rollup = combine(rollup, period)
+                    carried[period] = rollup.iloc[-1:]
+                    rollup = rollup.iloc[:-1]
+                    complete_end = complete_ends[period]
+                    if complete_end is not None:
+                        rollup = rollup[rollup.index >= complete_end]
+                    if not rollup.empty:
+                        rollup_key, _ = self._rollup_keys(period)
+                        session.append(rollup_key, rollup)
+
+            # Write the tail of each level
+            tail = None
+            for period in periods:
+                tail = _concat_rollups(carried[period], tail)
+                if tail is None:
+                    continue
+                tail = combine(tail, period)
+                _, tail_key = self._rollup_keys(period)
+                session.put(tail_key, tail)
+
+    def get_rollup(self, period, timeframe=None):
+        """Returns the rollup for `period` (including the tail bucket) or
+        an empty DataFrame if rollups have not been built.
+
+        Parameters
+        ----------
+        period : int, seconds
+        timeframe : nilmtk.TimeFrame, optional
+            Only return buckets starting within `timeframe`.
+
+        See Also
+        --------
+        build_rollups
+        """
+        rollup_key, tail_key = self._rollup_keys(period)
+        frames = []
+        try:
+            sections = None if timeframe is None else [timeframe]
+            frames.extend(self.store.load(rollup_key, sections=sections))
+        except KeyError:
+            # Not all DataStores can load a slice of a table which
+            # isn't meter data.
+            frames.append(self.get_cached_stat(rollup_key))
+        frames.append(self.get_cached_stat(tail_key))
+        frames = [frame for frame in frames if not frame.empty]
+        if not frames:
+            return pd.DataFrame()
+        rollup = pd.concat(frames)
+        if timeframe is not None:
+            rollup = timeframe.slice(rollup)
+        return rollup
+
+    def _rollup_keys(self, period):
+        name = 'rollup_{:d}'.format(period)
+        return (self.key_for_cached_stat(name),
+                self.key_for_cached_stat(name + '_tail'))
+
+    def _rollup_end(self, rollup_key, period):
+        """Returns the end of the last bucket stored at `rollup_key` or
+        None if there are no buckets."""
+        try:
+            last_bucket = self.store.get_timeframe(rollup_key).end
+        except KeyError:
+            rollup = self.get_cached_stat(rollup_key)
+            if rollup.empty:
+                return None
+            last_bucket = rollup.index[-1]
+        return last_bucket + timedelta(seconds=period)
+
+    def _rollup_period_for(self, sample_period):
+        """Returns (period, end) for the coarsest rollup which can be
+        resampled to `sample_period`, where `end` is the end of the last
+        bucket in the rollup.  Returns (None, None) if no rollup fits."""
+        candidates = [(period, self._rollup_tail_end(period))
+                      for period in reversed(ROLLUP_PERIODS)
+                      if period <= sample_period and
+                      sample_period % period == 0]
+        candidates = [(period, end) for period, end in candidates
+                      if end is not None]
+        if not candidates:
+            return None, None
+        timeframe = self.get_timeframe()
+        for period, end in candidates:
+            # Resample bins are aligned to local time so the UTC offset
+            # must be a whole number of buckets.
+            offsets = [timestamp.utcoffset() for timestamp in
+                       (timeframe.start, timeframe.end)
+                       if timestamp is not None and timestamp.tz is not None]
+            if any([offset.total_seconds() % period for offset in offsets]):
+                continue
+            return period, end
+        return None, None
+
+    def _rollup_tail_end(self, period):
+        """Returns the end of the last bucket in the rollup for `period`
+        or None if there is no rollup.  The answer is remembered in
+        `self.store.rollup_ends` until the rollup's tail is modified."""
+        _, tail_key = self._rollup_keys(period)
+        key = '/' + tail_key.strip('/')
+        try:
+            return self.store.rollup_ends[key]
+        except KeyError:
+            pass
+        tail = self.get_cached_stat(tail_key)
+        end = None if tail.empty else tail.index[-1] + timedelta(seconds=period)
+        self.store.rollup_ends[key] = end
+        return end
+
+    def _load_from_rollups(self, kwargs):
+        """Returns a generator of chunks which uses rollups to serve
+        `load(**kwargs)`, or None if `kwargs` cannot be served from
+        rollups.  Only requests for a `sample_period` which exactly
+        divides a day, with `how` in ROLLUP_HOWS, can be served."""
+        sample_period = kwargs.get('sample_period')
+        resample_kwargs = kwargs.get('resample_kwargs') or {}
+        how = resample_kwargs.get('how', 'mean')
+        unsupported_resample_kwargs = (
+            set(resample_kwargs) - set(['how', 'fill_method', 'limit', 'rule']))
+        if (self.store is None or sample_period is None or
+                how not in ROLLUP_HOWS or kwargs.get('preprocessing') or
+                kwargs.get('n_look_ahead_rows') or unsupported_resample_kwargs):
+            return None
+        sample_period = int(round(sample_period))
+        if sample_period < ROLLUP_PERIODS[0] or SECS_PER_DAY % sample_period:
+            return None
+        period, rollup_end = self._rollup_period_for(sample_period)
+        if period is None:
+            return None
+        return self._generate_from_rollups(kwargs, period, rollup_end,
+                                           sample_period, how)
+
+    def _generate_from_rollups(self, kwargs, period, rollup_end,
+                               sample_period, how):
+        """Yields one chunk per section resampled from the rollup for
+        `period`.  Any part of a section which does not cover whole
+        resample bins of rollup data is loaded from the raw data."""
+        cols = self._convert_physical_quantity_and_ac_type_to_cols(
+            **deepcopy(kwargs))['cols']
+        resample_kwargs = kwargs.get('resample_kwargs') or {}
+        fill_method = resample_kwargs.get('fill_method', 'ffill')
+        limit = resample_kwargs.get('limit', int(np.ceil(
+            self.device['max_sample_period'] / sample_period)))
+
+        def load_raw(start, end, include_end=False):
+            section = TimeFrame(start, end)
+            section.include_end = include_end
+            raw_kwargs = dict(kwargs, sections=[section], use_rollups=False)
+            return self.load(**raw_kwargs)
+
+        meter_timeframe = self.get_timeframe()
+        tz = meter_timeframe.start.tz
+        sections = kwargs.get('sections')
+        sections = [TimeFrame()] if sections is None else sections
+        for section in TimeFrameGroup(sections):
+            if section.empty:
+                continue
+            start = meter_timeframe.start
+            if section.start is not None:
+                start = max(start, tz_localize_naive(section.start, tz))
+            end = meter_timeframe.end
+            include_end = True
+            if section.end is not None:
+                section_end = tz_localize_naive(section.end, tz)
+                if section_end <= end:
+                    end = section_end
+                    include_end = section.include_end
+            if start > end:
+                continue
+
+            # Find whole resample bins covered by the rollup
+            rollup_start = ceil_to_period(start, sample_period)
+            rollup_stop = floor_to_period(min(end, rollup_end), sample_period)
+            if rollup_start >= rollup_stop:
+                for chunk in load_raw(start, end, include_end):
+                    yield chunk
+                continue
+
+            if start < rollup_start:
+                for chunk in load_raw(start, rollup_start):
+                    yield chunk
+
+            rollup_timeframe = TimeFrame(rollup_start, rollup_stop)
+            rollup = self.get_rollup(period, rollup_timeframe)
+            if rollup.empty:
+                chunk = pd.DataFrame()
+            else:
+                chunk = resample_rollup(rollup, cols, sample_period, how)
+                bins = pd.date_range(rollup_start, rollup_stop,
+                                     freq='{:d}S'.format(sample_period),
+                                     closed='left')
+                chunk = chunk.reindex(bins)
+                if fill_method:
+                    chunk = chunk.fillna(method=fill_method, limit=limit)
+            chunk.timeframe = rollup_timeframe
+            yield chunk
+
+            if rollup_stop < end or include_end:
+                for chunk in load_raw(rollup_stop, end, include_end):
+                    yield chunk
+
+    def _total_energy_from_rollups(self, **load_kwargs):
+        """Returns total energy (as `total_energy()` does) from the daily
+        rollup, or None if that isn't possible."""
+        if set(load_kwargs) - set(['verbose']) or self.store is None:
+            return None
+        period = ROLLUP_PERIODS[-1]
+        _, tail_key = self._rollup_keys(period)
+        tail = self.get_cached_stat(tail_key)
+        if tail.empty:
+            return None
+        # Rollups are stale if data has been appended since they were built
+        if self.get_timeframe().end >= tail.index[-1] + timedelta(seconds=period):
+            return None
+        energy = get_stat(self.get_rollup(period), 'energy').sum()
+        # `total_energy` prefers 'cumulative energy' and 'energy' over 'power'.
+        energy_for_ac_type = {}
+        for (physical_quantity, ac_type), value in energy.iteritems():
+            if physical_quantity == 'power':
+                energy_for_ac_type.setdefault(ac_type, value)
+            elif physical_quantity in ['energy', 'cumulative energy']:
+                return None
+        return pd.Series(energy_for_ac_type)
+
     def get_cached_stat(self, key_for_stat):
         """
         Parameters
@@ -864,3 +1437,58 @@ class ElecMeter(Hashable, Electric):
     #     cleaning steps have been executed and some summary results (e.g. the number of
     #     implausible values removed)"""
     #     raise NotImplementedError
+
+
+# Preprocessing applied before each stat by `ElecMeter.compute_stats`
+# (matching the nodes used by e.g. `ElecMeter.total_energy`).
+STAT_PREPROCESSING = {TotalEnergy: [Clip]}
+
+
+class _ChunkFeeder(Node):
+    """Source Node for one branch of `ElecMeter.compute_stats`.
+    Yields each chunk put into `chunks`."""
+
+    def reset(self):
+        self.chunks = deque()
+        self.finished = False
+
+    def process(self):
+        while True:
+            if self.chunks:
+                yield self.chunks.popleft()
+            elif self.finished:
+                return
+            else:
+                raise RuntimeError(
+                    "Nodes used by `compute_stats` must yield one chunk for"
+                    " every chunk they receive.")
+
+
+def _ac_types_in_cols(cols):
+    return set([m[1] for m in cols if m[1]])
+
+
+def _results_to_return(results_obj, full_results, ac_types):
+    """Returns `results_obj` if `full_results` is True, otherwise
+    `results_obj.simple()` (restricted to `ac_types`, if any)."""
+    if full_results:
+        return results_obj
+    else:
+        res = results_obj.simple()
+        if ac_types:
+            try:
+                ac_type_keys = res.keys()
+            except:
+                return res
+            else:
+                return pd.Series(res[ac_types], index=ac_types)
+        else:
+            return res
+
+
+def _concat_rollups(first, second):
+    rollups = [rollup for rollup in (first, second)
+               if rollup is not None and not rollup.empty]
+    if not rollups:
+        return None
+    return pd.concat(rollups)
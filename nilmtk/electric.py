@@ -4,16 +4,10 @@ import numpy as np
 from collections import Counter
 from itertools import izip
 from warnings import warn
-import scipy.spatial as ss
-from scipy import fft
-from pandas.tools.plotting import lag_plot, autocorrelation_plot
-from scipy.special import digamma,gamma
 from math import log,pi
 import numpy.random as nr
-import matplotlib.pyplot as plt
 import numpy as np
 from datetime import timedelta
-import gc
 import pytz
 
 from .timeframe import TimeFrame
@@ -21,9 +15,12 @@ from .measurement import select_best_ac_type
 from .utils import (offset_alias_to_seconds, convert_to_timestamp,
                     flatten_2d_list, append_or_extend_list,
                     timedelta64_to_secs, safe_resample)
-from .plots import plot_series
 from .preprocessing import Apply
-from nilmtk.stats.histogram import histogram_from_generator
+from .rollups import ROLLUP_PERIODS
+from .consts import SECS_PER_DAY
+from nilmtk.stats.powerdistribution import get_power_distribution
+from nilmtk.stats.comoments import CoMoments
+from nilmtk.stats.powerdistributionresults import PowerDistributionResults
 from nilmtk.appliance import DEFAULT_ON_POWER_THRESHOLD
 
 MAX_SIZE_ENTROPY = 10000
@@ -195,6 +192,7 @@ class Electric(object):
         ax = power_series.plot(ax=ax, **plot_kwargs)
         ax.set_ylabel('Power ({})'.format(unit))
         if plot_legend:
+            import matplotlib.pyplot as plt
             plt.legend()
 
         return ax
@@ -203,6 +201,13 @@ class Electric(object):
         # Calculate the resolution for the x axis
         duration = timeframe.timedelta.total_seconds()
         secs_per_pixel = int(round(duration / width))
+        if secs_per_pixel >= ROLLUP_PERIODS[0]:
+            # Round down to a whole number of minutes which exactly divides
+            # a day, so the data can be loaded from rollups (if built).
+            secs_per_pixel = max([
+                period for period in xrange(ROLLUP_PERIODS[0], SECS_PER_DAY+1,
+                                            ROLLUP_PERIODS[0])
+                if SECS_PER_DAY % period == 0 and period <= secs_per_pixel])
         kwargs.update({'sample_period': secs_per_pixel, 'resample': True})
         return kwargs
 
@@ -220,9 +225,34 @@ class Electric(object):
         else:
             return proportion_of_energy
 
-    def vampire_power(self, **load_kwargs):
+    def vampire_power(self, quantile=0, **load_kwargs):
+        """Returns the `quantile` of power.  The default (0) is the
+        minimum power.  A low quantile (e.g. 0.01) is less sensitive
+        to outliers.  Uses `power_distribution()`."""
         # TODO: this might be a naive approach to calculating vampire power.
-        return self.power_series_all_data(**load_kwargs).min()
+        return self.power_distribution(**load_kwargs).quantile(quantile)
+
+    def power_distribution(self, **load_kwargs):
+        """Returns the distribution of `power_series()`.  ElecMeter
+        caches the distribution.
+
+        Parameters
+        ----------
+        **load_kwargs : key word arguments for `power_series()`
+
+        Returns
+        -------
+        nilmtk.stats.powerdistributionresults.PowerDistributionResults
+        """
+        results = PowerDistributionResults()
+        for chunk in self.power_series(**load_kwargs):
+            if len(chunk) > 0:
+                timeframe = getattr(chunk, 'timeframe', None)
+                if timeframe is None:
+                    timeframe = TimeFrame(chunk.index[0], chunk.index[-1])
+                results.append(timeframe, get_power_distribution(
+                    chunk, results.bin_width))
+        return results
 
     def uptime(self, **load_kwargs):
         """
@@ -262,8 +292,15 @@ class Electric(object):
             return np.NaN
         uptime_secs = td.total_seconds()
         periods = uptime_secs / offset_alias_to_seconds(offset_alias)
-        energy = self.total_energy(**load_kwargs)
+        energy = self._total_energy_from_rollups(**load_kwargs)
+        if energy is None:
+            energy = self.total_energy(**load_kwargs)
         return energy / periods
+
+    def _total_energy_from_rollups(self, **load_kwargs):
+        """Returns total energy calculated from rollups, or None if
+        rollups are not available.  See `ElecMeter.build_rollups`."""
+        return None
         
     def proportion_of_energy(self, other, **loader_kwargs):
         """Compute the proportion of energy of self compared to `other`.
@@ -312,9 +349,10 @@ class Electric(object):
     def correlation(self, other, **load_kwargs):
         """
         Finds the correlation between the two ElecMeters. Both the ElecMeters 
-        should be perfectly aligned
-        Adapted from: 
-        http://www.johndcook.com/blog/2008/11/05/how-to-calculate-pearson-correlation-accurately/
+        should be perfectly aligned.  Makes a single pass over the data
+        from both meters, accumulating co-moments chunk by chunk (see
+        `nilmtk.stats.comoments.CoMoments`).  Only timestamps where both
+        meters have data are used.
 
         Parameters
         ----------
@@ -322,58 +360,17 @@ class Electric(object):
 
         Returns
         -------
-        float : [-1, 1]
+        float : [-1, 1] or NaN if there are fewer than two samples.
         """
         sample_period = max(self.sample_period(), other.sample_period())
         load_kwargs.setdefault('sample_period', sample_period)
 
-        def sum_and_count(electric):
-            n = 0
-            cumulator = 0.0
-            for power in electric.power_series(**load_kwargs):
-                n += len(power.index)
-                cumulator += power.sum()
-            return n, cumulator
-
-        x_n, x_sum = sum_and_count(self)
-        if x_n <= 1:
-            return np.NaN
-
-        y_n, y_sum = sum_and_count(other)
-        if y_n <= 1:
-            return np.NaN
-
-        # we're using Python 3's division (which returns a float)
-        x_bar = x_sum / x_n 
-        y_bar = y_sum / y_n
-
-        # Second pass is used to find x_s and y_s (std.devs)
-        def stdev(electric, mean, n):
-            s_square_sum = 0.0
-            for power in electric.power_series(**load_kwargs):
-                s_square_sum += ((power - mean) * (power - mean)).sum()
-            s_square = s_square_sum / (n - 1)
-            return np.sqrt(s_square)
-
-        x_s = stdev(self, x_bar, x_n)
-        y_s = stdev(other, y_bar, y_n)
-
-        numerator = 0.0
+        co_moments = CoMoments(2)
         for (x_power, y_power) in izip(self.power_series(**load_kwargs), 
                                        other.power_series(**load_kwargs)):
-            xi_minus_xbar = x_power - x_bar
-            del x_power
-            gc.collect()
-            yi_minus_ybar = y_power - y_bar
-            del y_power
-            gc.collect()
-            numerator += (xi_minus_xbar * yi_minus_ybar).sum()
-            del xi_minus_xbar
-            del yi_minus_ybar
-            gc.collect()
-        denominator = (x_n - 1) * x_s * y_s
-        corr = numerator / denominator
-        return corr
+            aligned = pd.concat([x_power, y_power], axis=1)
+            co_moments.update(aligned.values)
+        return co_moments.correlation()[0, 1]
 
     def plot_lag(self, lag=1, ax=None):
         """
@@ -384,6 +381,8 @@ class Electric(object):
         -------
         matplotlib.axis
         """
+        import matplotlib.pyplot as plt
+        from pandas.tools.plotting import lag_plot
         if ax is None:
             ax = plt.gca()
         for power in self.power_series():
@@ -402,6 +401,8 @@ class Electric(object):
         -------
         matplotlib.axis
         """ 
+        import matplotlib.pyplot as plt
+        from scipy import fft
         if ax is None:
             ax = plt.gca()
         Fs = 1.0/self.sample_period()
@@ -431,6 +432,8 @@ class Electric(object):
         -------
         matplotlib.axis 
         """
+        import matplotlib.pyplot as plt
+        from pandas.tools.plotting import autocorrelation_plot
         if ax is None:
             ax = plt.gca()
         for power in self.power_series():
@@ -453,21 +456,21 @@ class Electric(object):
         -------
         ax
         """
+        import matplotlib.pyplot as plt
         if ax is None:
             ax = plt.gca()
         if load_kwargs is None:
             load_kwargs = {}
         if plot_kwargs is None:
             plot_kwargs = {}
-        generator = self.power_series(**load_kwargs)
 
         # set range
         if range is None or range[0] is None:
             maximum = None if range is None else range[1]
             range = (self.on_power_threshold(), maximum)
 
-        hist, bins = histogram_from_generator(generator, range=range, 
-                                              **hist_kwargs)
+        hist, bins = self.power_distribution(**load_kwargs).histogram(
+            range=range, **hist_kwargs)
 
         # Plot
         plot_kwargs.setdefault('linewidth', 0.1)
@@ -507,6 +510,9 @@ class Electric(object):
         x should be a list of vectors, e.g. x = [[1.3],[3.7],[5.1],[2.4]]
         if x is a one-dimensional scalar and we have four samples
         """
+        import scipy.spatial as ss
+        from scipy.special import digamma
+
         def kdtree_entropy(z):
             assert k <= len(z)-1, "Set k smaller than num. samples - 1"
             d = len(z[0])
@@ -544,6 +550,9 @@ class Electric(object):
         ----------
         other : ElecMeter or MeterGroup
         """
+        import scipy.spatial as ss
+        from scipy.special import digamma
+
         def kdtree_mi(x, y, k, base):
             intens = 1e-10 #small noise to break degeneracy, see doc.
             x = [list(p + intens*nr.rand(len(x[0]))) for p in x]
@@ -711,6 +720,7 @@ class Electric(object):
 
     def plot_activity_histogram(self, ax=None, period='D', bin_duration='H',
                                 plot_kwargs=None, **kwargs):
+        import matplotlib.pyplot as plt
         if ax is None:
             ax = plt.gca()
         hist = self.activity_histogram(bin_duration=bin_duration,
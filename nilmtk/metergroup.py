@@ -1,26 +1,28 @@
 from __future__ import print_function, division
-import networkx as nx
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.ticker import FuncFormatter
 from datetime import timedelta
 from warnings import warn
-from sys import stdout
-from collections import Counter
+from collections import Counter, OrderedDict
 from copy import copy, deepcopy
+from itertools import izip
 import gc
+import threading
+from functools import partial
+import multiprocessing as mp
+from multiprocessing.pool import ThreadPool
 from collections import namedtuple
 
 # NILMTK imports
 from .elecmeter import ElecMeter, ElecMeterID
 from .appliance import Appliance
 from .datastore.datastore import join_key
-from .utils import (tree_root, nodes_adjacent_to_root, simplest_type_for,
-                    flatten_2d_list, convert_to_timestamp, normalise_timestamp,
-                    print_on_line, convert_to_list, append_or_extend_list,
-                    most_common, capitalise_first_letter)
-from .plots import plot_series
+from .datastore.writesession import WriteSession
+from .datastore.prefetch import SERIAL_READ_LOCK
+from .utils import (simplest_type_for, flatten_2d_list, convert_to_timestamp,
+                    normalise_timestamp, print_on_line, convert_to_list,
+                    append_or_extend_list, most_common,
+                    capitalise_first_letter)
 from .measurement import (select_best_ac_type, AC_TYPES, LEVEL_NAMES,
                           PHYSICAL_QUANTITIES_TO_AVERAGE)
 from nilmtk.exceptions import MeasurementError
@@ -28,7 +30,14 @@ from .electric import Electric
 from .timeframe import TimeFrame, split_timeframes
 from .preprocessing import Apply
 from .datastore import MAX_MEM_ALLOWANCE_IN_BYTES
+from .node import Node
+from .meterlist import MeterList
+from .wiringtopology import WiringTopology
+from .stats import TotalEnergy, GoodSections
+from .stats.cachedstatindex import CachedStatIndex
+from .stats.comoments import CoMoments
 from nilmtk.timeframegroup import TimeFrameGroup
+import nilmtk
 
 # MeterGroupID.meters is a tuple of ElecMeterIDs.  Order doesn't matter.
 # (we can't use a set because sets aren't hashable so we can't use 
@@ -43,15 +52,25 @@ class MeterGroup(Electric):
 
     Attributes
     ----------
-    meters : list of ElecMeters or nested MeterGroups
+    meters : MeterList of ElecMeters or nested MeterGroups
+        Any list assigned to `meters` is converted to a MeterList.
     disabled_meters : list of ElecMeters or nested MeterGroups
     name : only set by functions like 'groupby' and 'select_top_k'
     """
 
     def __init__(self, meters=None, disabled_meters=None):
-        self.meters = convert_to_list(meters)
+        self.meters = meters
         self.disabled_meters = convert_to_list(disabled_meters)
         self.name = ""
+        self._wiring_topology = None
+
+    @property
+    def meters(self):
+        return self._meters
+
+    @meters.setter
+    def meters(self, meters):
+        self._meters = MeterList(convert_to_list(meters))
 
     def import_metadata(self, store, elec_meters, appliances, building_id):
         """
@@ -125,6 +144,9 @@ class MeterGroup(Electric):
             self.meters.remove(meter)
             self.disabled_meters.append(meter)
 
+        # Appliances have been attached to meters
+        self.meters.reindex()
+
     def union(self, other):
         """
         Returns
@@ -206,7 +228,7 @@ class MeterGroup(Electric):
                             group.dataset() == key.dataset):
                         return group
                 # Else try to find an ElecMeter with instance=(1,2)
-                for meter in self.meters:
+                for meter in self._candidates('identifier', key):
                     if meter.identifier == key:
                         return meter
             elif key.instance == 0:
@@ -214,21 +236,23 @@ class MeterGroup(Electric):
                     building=key.building, dataset=key.dataset)
                 return metergroup_of_building.mains()
             else:
-                for meter in self.meters:
+                for meter in self._candidates('identifier', key):
                     if meter.identifier == key:
                         return meter
             raise KeyError(key)
         elif isinstance(key, MeterGroupID):
             key_meters = set(key.meters)
-            for group in self.nested_metergroups():
-                if (set(group.identifier.meters) == key_meters):
+            for group in self._candidates('identifier', frozenset(key_meters)):
+                if (isinstance(group, MeterGroup) and
+                        set(group.identifier.meters) == key_meters):
                     return group
             raise KeyError(key)
         # find MeterGroup from list of ElecMeterIDs
         elif isinstance(key, list):
             if not all([isinstance(item, tuple) for item in key]):
                 raise TypeError("requires a list of ElecMeterID objects.")
-            for meter in self.meters:  # TODO: write unit tests for this
+            # TODO: write unit tests for this
+            for meter in self._candidates('identifier', frozenset(key)):
                 # list of ElecMeterIDs.  Return existing MeterGroup
                 if isinstance(meter, MeterGroup):
                     metergroup = meter
@@ -249,7 +273,8 @@ class MeterGroup(Electric):
                 raise TypeError()
         elif isinstance(key, dict):
             meters = []
-            for meter in self.meters:
+            for meter in self._candidates('appliance_type', key.get('type'),
+                                          'type' in key):
                 if meter.matches_appliances(key):
                     meters.append(meter)
             if len(meters) == 1:
@@ -261,7 +286,7 @@ class MeterGroup(Electric):
                 raise KeyError(key)
         elif isinstance(key, int) and not isinstance(key, bool):
             meters_found = []
-            for meter in self.meters:
+            for meter in self._candidates('instance', key):
                 if isinstance(meter.instance(), int):
                     if meter.instance() == key:
                         meters_found.append(meter)
@@ -285,6 +310,16 @@ class MeterGroup(Electric):
         else:
             raise TypeError()
 
+    def _candidates(self, index_name, key, use_index=True):
+        """Returns the meters which may match `key` in `self.meters`'
+        index `index_name` (see `MeterList`), or all meters if the index
+        cannot be used."""
+        if use_index:
+            candidates = self.meters.lookup(index_name, key)
+            if candidates is not None:
+                return candidates
+        return self.meters
+
     def matches(self, key):
         for meter in self.meters:
             if meter.matches(key):
@@ -343,11 +378,22 @@ class MeterGroup(Electric):
         selected_meters = []
         func = kwargs.pop('func', 'matches')
 
+        def candidates(_kwargs):
+            # Only check meters with the right identifier attributes.
+            if func == 'matches':
+                for index_name in ['instance', 'building', 'dataset']:
+                    if index_name in _kwargs:
+                        return self._candidates(index_name,
+                                                _kwargs[index_name])
+            elif func == 'matches_appliances' and 'type' in _kwargs:
+                return self._candidates('appliance_type', _kwargs['type'])
+            return self.meters
+
         def get(_kwargs):
             exception_raised_every_time = True
             exception = None
             no_match = True
-            for meter in self.meters:
+            for meter in candidates(_kwargs):
                 try:
                     match = getattr(meter, func)(_kwargs)
                 except KeyError as e:
@@ -563,27 +609,25 @@ class MeterGroup(Electric):
 
     def wiring_graph(self):
         """Returns a networkx.DiGraph of connections between meters."""
-        wiring_graph = nx.DiGraph()
-
-        def _build_wiring_graph(meters):
-            for meter in meters:
-                if isinstance(meter, MeterGroup):
-                    metergroup = meter
-                    _build_wiring_graph(metergroup.meters)
-                else:
-                    upstream_meter = meter.upstream_meter(raise_warning=False)
-                    # Need to ensure we use the same object
-                    # if upstream meter already exists.
-                    if upstream_meter is not None:
-                        for node in wiring_graph.nodes():
-                            if upstream_meter == node:
-                                upstream_meter = node
-                                break
-                        wiring_graph.add_edge(upstream_meter, meter)
-        _build_wiring_graph(self.meters)
-        return wiring_graph
+        return self.wiring_topology().graph()
+
+    def wiring_topology(self):
+        """Returns the WiringTopology of `self.meters`.  The topology is
+        built the first time it is needed and is then cached until
+        `self.meters` changes.  Call `self.meters.reindex()` after changing
+        the wiring metadata (e.g. 'submeter_of' or 'site_meter') of any
+        meter."""
+        cached = self._wiring_topology
+        if (cached is None or cached[0] is not self.meters or
+                cached[1] != self.meters.version):
+            topology = WiringTopology(self.meters)
+            cached = (self.meters, self.meters.version, topology)
+            self._wiring_topology = cached
+        return cached[2]
 
     def draw_wiring_graph(self, show_meter_labels=True):
+        import matplotlib.pyplot as plt
+        import networkx as nx
         graph = self.wiring_graph()
         meter_labels = {meter: meter.instance() for meter in graph.nodes()}
         pos = nx.graphviz_layout(graph, prog='dot')
@@ -647,6 +691,25 @@ class MeterGroup(Electric):
             `cols` can't be used if `ac_type` and/or `physical_quantity` are set.
         preprocessing : list of Node subclass instances
             e.g. [Clip()]
+        n_workers : int, optional, defaults to 1
+            If > 1 then load, resample and align the meters for each chunk
+            concurrently on a pool of `n_workers` threads, each with its 
+            own handle on the DataStore.  Only used if every meter is an
+            ElecMeter.  The result is identical to `n_workers=1`.
+        stream : bool, optional, defaults to False
+            If True then open a single `load` generator per meter for the
+            whole request and advance all the generators together, one
+            aligned chunk at a time, so each meter's data is read (and
+            resampled) exactly once from start to end.  Otherwise each
+            chunk is loaded with a new call to each meter's `load`.
+            Cannot be used with `n_workers` > 1.  The result is the same.
+        batched : bool, optional, defaults to False
+            If True, and every meter is an ElecMeter in the same DataStore,
+            then read all the meters' data for each chunk with a single
+            call to `DataStore.load_many`.  This bypasses `ElecMeter.load`
+            so the chunk cache and prefetching are not used.  Ignored if 
+            `stream` is True or `n_workers` > 1, or if any meter can
+            serve the request from rollups (see `ElecMeter.build_rollups`).
 
         Returns
         ---------
@@ -659,6 +722,11 @@ class MeterGroup(Electric):
         sample_period = kwargs.setdefault('sample_period', self.sample_period())
         sections = kwargs.pop('sections', [self.get_timeframe()])
         chunksize = kwargs.pop('chunksize', MAX_MEM_ALLOWANCE_IN_BYTES)
+        n_workers = kwargs.pop('n_workers', 1)
+        stream = kwargs.pop('stream', False)
+        batched = kwargs.pop('batched', False)
+        if stream and n_workers > 1:
+            raise ValueError("Cannot use `stream` with `n_workers` > 1.")
         duration_threshold = sample_period * chunksize
         columns = pd.MultiIndex.from_tuples(
             self._convert_physical_quantity_and_ac_type_to_cols(**kwargs)['cols'],
@@ -673,16 +741,121 @@ class MeterGroup(Electric):
             yield pd.DataFrame(columns=columns)
             return
 
+        sections = list(split_timeframes(sections, duration_threshold))
+
+        # Stream each meter through one generator if requested.
+        # Otherwise load meters on a pool of threads if requested and
+        # possible.  Otherwise, if requested and all meters share a 
+        # DataStore, then read all the meters for each section in one batch.
+        loader_pool = None
+        streams = None
+        if stream:
+            streams = [_AlignedMeterStream(meter, sections, kwargs)
+                       for meter in self.meters]
+        elif n_workers > 1 and self._can_load_in_parallel():
+            loader_pool = MeterLoaderPool(n_workers)
+        batched = (batched and streams is None and loader_pool is None and
+                   self._can_load_batched(kwargs))
+
         # Loop through each section to load
-        for section in split_timeframes(sections, duration_threshold):
-            kwargs['sections'] = [section]
-            start = normalise_timestamp(section.start, freq)
-            tz = None if start.tz is None else start.tz.zone
-            index = pd.date_range(
-                start.tz_localize(None), section.end.tz_localize(None), tz=tz,
-                closed='left', freq=freq)
-            chunk = combine_chunks_from_generators(
-                index, columns, self.meters, kwargs)
+        try:
+            for section in sections:
+                kwargs['sections'] = [section]
+                start = normalise_timestamp(section.start, freq)
+                tz = None if start.tz is None else start.tz.zone
+                index = pd.date_range(
+                    start.tz_localize(None), section.end.tz_localize(None),
+                    tz=tz, closed='left', freq=freq)
+                if streams is not None:
+                    chunks = (meter_stream.chunk_for(section)
+                              for meter_stream in streams)
+                elif loader_pool is not None:
+                    chunks = loader_pool.first_chunk_from_each_meter(
+                        self.meters, kwargs, index, columns)
+                elif batched:
+                    chunks = self._first_chunk_from_each_meter_batched(kwargs)
+                else:
+                    chunks = first_chunk_from_each_meter(self.meters, kwargs)
+                chunk = combine_chunks(index, columns, chunks)
+                yield chunk
+        finally:
+            if loader_pool is not None:
+                loader_pool.close()
+            for meter_stream in streams or []:
+                meter_stream.close()
+
+    def _can_load_in_parallel(self):
+        """Returns True if every meter is an ElecMeter with a DataStore
+        (so `MeterLoaderPool` can load it)."""
+        return all([isinstance(meter, ElecMeter) and meter.store is not None
+                    for meter in self.meters])
+
+    def _can_load_batched(self, kwargs):
+        """Returns True if every meter is an ElecMeter in the same
+        DataStore, no meter can serve `kwargs` from rollups, and `kwargs`
+        can all be handled by `_first_chunk_from_each_meter_batched`."""
+        if len(self.meters) < 2:
+            return False
+        if set(kwargs) - BATCHED_LOAD_KWARGS:
+            return False
+        stores = set()
+        for meter in self.meters:
+            if not isinstance(meter, ElecMeter) or meter.store is None:
+                return False
+            stores.add(id(meter.store))
+        if len(stores) != 1:
+            return False
+        # Rollups are only used by `ElecMeter.load`, which is cheaper
+        # than reading the raw data in a batch.
+        for meter in self.meters:
+            if meter._load_from_rollups(deepcopy(kwargs)) is not None:
+                return False
+        return True
+
+    def _first_chunk_from_each_meter_batched(self, kwargs):
+        """Same as `first_chunk_from_each_meter` but reads every meter's
+        data for `kwargs['sections']` with a single call to
+        `DataStore.load_many`."""
+        store = self.meters[0].store
+        meter_cols = []
+        meter_preprocessing = []
+        key_cols = OrderedDict()
+        for meter in self.meters:
+            meter_kwargs = meter._prep_load_kwargs(**deepcopy(kwargs))
+            meter_preprocessing.append(meter_kwargs.pop('preprocessing', []))
+            cols = meter._convert_physical_quantity_and_ac_type_to_cols(
+                **meter_kwargs)['cols']
+            meter_cols.append(cols)
+            cols_for_key = key_cols.setdefault(meter.key, [])
+            cols_for_key.extend([col for col in cols 
+                                 if col not in cols_for_key])
+
+        # `load_many` may split the section into several batches.
+        frames_for_keys = OrderedDict((key, []) for key in key_cols)
+        for batch in store.load_many(key_cols.keys(), cols=key_cols,
+                                     sections=kwargs['sections']):
+            for key, frame in batch.iteritems():
+                if not frame.empty:
+                    frames_for_keys[key].append(frame)
+        timeframe = store.window.intersection(kwargs['sections'][0])
+
+        for meter, cols, preprocessing in zip(
+                self.meters, meter_cols, meter_preprocessing):
+            print_on_line("\rLoading data for meter", meter.identifier, "    ")
+            frames = frames_for_keys[meter.key]
+            chunk = pd.concat(frames) if frames else pd.DataFrame()
+            chunk.timeframe = timeframe
+            if not chunk.empty and len(key_cols[meter.key]) > len(cols):
+                chunk = chunk[[('' if pq is None else pq, '' if ac is None else ac)
+                               for pq, ac in cols]]
+                chunk.timeframe = timeframe
+            meter.metadata['device'] = meter.device
+            last_node = Node(meter, generator=iter([chunk]))
+            generator = meter._connect_preprocessing(last_node, preprocessing)
+            try:
+                chunk = generator.next()
+            except StopIteration:
+                continue
             yield chunk
 
     def _convert_physical_quantity_and_ac_type_to_cols(self, **kwargs):
@@ -789,7 +962,7 @@ class MeterGroup(Electric):
 
     def meters_directly_downstream_of_mains(self):
         """Returns new MeterGroup."""
-        meters = nodes_adjacent_to_root(self.wiring_graph())
+        meters = self.wiring_topology().nodes_adjacent_to_root()
         assert isinstance(meters, list)
         return MeterGroup(meters)
 
@@ -799,6 +972,22 @@ class MeterGroup(Electric):
                      if not meter.is_site_meter()]
         return MeterGroup(submeters)
 
+    def sum_of_submeters_per_meter(self, values):
+        """Sums `values` over the meters directly downstream of each
+        meter in the wiring hierarchy (see `WiringTopology.sum_of_children`).
+
+        Parameters
+        ----------
+        values : pd.Series or dict
+            Maps meter identifiers to numbers (e.g. the output of
+            `energy_per_meter().loc['active']`).
+
+        Returns
+        -------
+        pd.Series indexed by the identifier of each upstream meter.
+        """
+        return self.wiring_topology().sum_of_children(values)
+
     def is_site_meter(self):
         """Returns True if any meters are site meters"""
         return any([meter.is_site_meter() for meter in self.meters])
@@ -814,6 +1003,8 @@ class MeterGroup(Electric):
         Parameters
         ----------
         full_results : bool, default=False
+        n_jobs : int, default=1
+            Number of processes to use (see `map_meters`).
         **loader_kwargs : key word arguments for DataStore.load()
 
         Returns
@@ -823,9 +1014,10 @@ class MeterGroup(Electric):
         """
         self._check_kwargs_for_full_results_and_sections(load_kwargs)
         full_results = load_kwargs.pop('full_results', False)
+        n_jobs = load_kwargs.pop('n_jobs', 1)
 
         meter_energies = self._collect_stats_on_all_meters(
-            load_kwargs, 'total_energy', full_results)
+            load_kwargs, 'total_energy', full_results, n_jobs)
 
         if meter_energies:
             total_energy_results = meter_energies[0]
@@ -836,7 +1028,13 @@ class MeterGroup(Electric):
                     total_energy_results += meter_energy
             return total_energy_results
 
-    def _collect_stats_on_all_meters(self, load_kwargs, func, full_results):
+    def _collect_stats_on_all_meters(self, load_kwargs, func, full_results,
+                                     n_jobs=1):
+        if n_jobs > 1:
+            return map_meters(self.meters, func,
+                              dict(load_kwargs, full_results=full_results),
+                              n_jobs=n_jobs, verbose=True)
+
         collected_stats = []
         for meter in self.meters:
             print_on_line("\rCalculating", func, "for", meter.identifier, "...   ")
@@ -858,6 +1056,8 @@ class MeterGroup(Electric):
         Parameters
         ----------
         full_results : bool, default=False
+        n_jobs : int, default=1
+            Number of processes to use (see `map_meters`).
         **loader_kwargs : key word arguments for DataStore.load()
 
         Returns
@@ -868,9 +1068,10 @@ class MeterGroup(Electric):
         """
         self._check_kwargs_for_full_results_and_sections(load_kwargs)
         full_results = load_kwargs.pop('full_results', False)
+        n_jobs = load_kwargs.pop('n_jobs', 1)
 
         dropout_rates = self._collect_stats_on_all_meters(
-            load_kwargs, 'dropout_rate', full_results)
+            load_kwargs, 'dropout_rate', full_results, n_jobs)
 
         if full_results and dropout_rates:
             dropout_rate_results = dropout_rates[0]
@@ -919,17 +1120,100 @@ class MeterGroup(Electric):
             any other key word arguments to pass to `self.store.load()` including:
         ac_type : string, defaults to 'best'
         physical_quantity: string, defaults to 'power'
+        preallocate : bool, defaults to False
+            If True then work out the aligned index from `get_timeframe()`
+            (or `sections`, if given) and `sample_period` up front and
+            write each meter's data straight into a preallocated float32
+            array, one meter at a time.  This needs far less memory than
+            concatenating chunks.  Every meter gets a column, even if it
+            has no data.
+        memmap_filename : string, optional
+            If set then the preallocated array is a `numpy.memmap` backed
+            by this file (which is overwritten) so the result need not fit
+            in memory.  Implies `preallocate=True`.
 
         Returns
         -------
         DataFrame
             Each column is a meter.
         """
+        memmap_filename = kwargs.pop('memmap_filename', None)
+        if kwargs.pop('preallocate', False) or memmap_filename is not None:
+            return self._preallocated_dataframe_of_meters(memmap_filename,
+                                                          **kwargs)
+        segments = list(self._aligned_chunks(**kwargs))
+        if segments:
+            return pd.concat(segments)
+        else:
+            return pd.DataFrame(columns=self.identifier.meters)
+
+    def _preallocated_dataframe_of_meters(self, memmap_filename=None,
+                                          **kwargs):
+        kwargs.setdefault('sample_period', self.sample_period())
+        kwargs.setdefault('ac_type', 'best')
+        kwargs.setdefault('physical_quantity', 'power')
+        index = self._aligned_index(kwargs['sample_period'],
+                                    kwargs.get('sections'))
+        if len(index) == 0:
+            return pd.DataFrame(columns=self.identifier.meters)
+        identifiers, generators = self._meter_generators(**kwargs)
+        shape = (len(index), len(identifiers))
+
+        # Use Fortran order so each meter's column is contiguous.
+        if memmap_filename is None:
+            values = np.empty(shape, dtype=np.float32, order='F')
+        else:
+            values = np.memmap(memmap_filename, dtype=np.float32, mode='w+',
+                               shape=shape, order='F')
+        values.fill(np.NaN)
+
+        for meter_i, (meter_id, generator) in enumerate(
+                zip(identifiers, generators)):
+            print_on_line("\rLoading data for meter", meter_id, "    ")
+            for chunk in generator:
+                if chunk.empty:
+                    continue
+                summed = chunk.sum(axis=1)
+                rows = index.get_indexer(summed.index)
+                in_index = rows >= 0
+                values[rows[in_index], meter_i] = summed.values[in_index]
+                del chunk, summed, rows, in_index
+            del generator
+            gc.collect()
+
+        if memmap_filename is not None:
+            values.flush()
+        return pd.DataFrame(values, index=index, columns=identifiers,
+                            copy=False)
+
+    def _aligned_index(self, sample_period, sections=None):
+        """Returns the DatetimeIndex of every resampled timestamp
+        between the start and end of `sections` (or of all meters)."""
+        timeframe = self.get_timeframe()
+        if sections:
+            starts = [section.start for section in sections]
+            ends = [section.end for section in sections]
+            span = TimeFrame(None if None in starts else min(starts),
+                             None if None in ends else max(ends))
+            timeframe = timeframe.intersection(span)
+        if not timeframe:
+            return pd.DatetimeIndex([])
+        freq = '{:d}S'.format(int(round(sample_period)))
+        start = normalise_timestamp(timeframe.start, freq)
+        tz = None if start.tz is None else start.tz.zone
+        return pd.date_range(start.tz_localize(None),
+                             timeframe.end.tz_localize(None),
+                             tz=tz, freq=freq)
+
+    def _aligned_chunks(self, **kwargs):
+        """Loads every meter in step and yields one DataFrame per chunk.
+        Each column is a meter (identified by `meter.identifier`) and
+        holds that meter's data summed across columns.  Takes the same
+        arguments as `dataframe_of_meters`."""
         kwargs.setdefault('sample_period', self.sample_period())
         kwargs.setdefault('ac_type', 'best')
         kwargs.setdefault('physical_quantity', 'power')
         identifiers, generators = self._meter_generators(**kwargs)
-        segments = []
         while True:
             chunks = []
             ids = []
@@ -946,14 +1230,39 @@ class MeterGroup(Electric):
             if chunks:
                 df = pd.concat(chunks, axis=1)
                 df.columns = ids
-                segments.append(df)
+                yield df
             else:
                 break
 
-        if segments:
-            return pd.concat(segments)
-        else:
-            return pd.DataFrame(columns=self.identifier.meters)
+    def correlation_matrix(self, **kwargs):
+        """Finds the correlation between every pair of meters in a
+        single pass over the data from all meters.  Co-moments are
+        accumulated chunk by chunk (see `nilmtk.stats.comoments.CoMoments`).
+
+        Parameters
+        ----------
+        **kwargs : 
+            Same as for `dataframe_of_meters`.  By default every meter
+            is resampled to the largest sample period of all meters.
+
+        Returns
+        -------
+        pd.DataFrame
+            Index and columns are meter identifiers.
+        """
+        identifiers = [meter.identifier for meter in self.meters]
+        positions = dict([(identifier, i)
+                          for i, identifier in enumerate(identifiers)])
+        co_moments = CoMoments(len(identifiers))
+        for chunk in self._aligned_chunks(**kwargs):
+            # Not every meter has data for every chunk.
+            values = np.empty((len(chunk), len(identifiers)))
+            values.fill(np.NaN)
+            for i, identifier in enumerate(chunk.columns):
+                values[:, positions[tuple(identifier)]] = chunk.iloc[:, i].values
+            co_moments.update(values)
+        return pd.DataFrame(co_moments.correlation(), index=identifiers,
+                            columns=identifiers)
 
     def entropy_per_meter(self):
         """Finds the entropy of each meter in this MeterGroup.
@@ -964,13 +1273,15 @@ class MeterGroup(Electric):
         """
         return self.call_method_on_all_meters('entropy')
 
-    def call_method_on_all_meters(self, method):
+    def call_method_on_all_meters(self, method, n_jobs=1):
         """Calls `method` on each element in `self.meters`.
 
         Parameters
         ----------
         method : str
             Name of a stats method in `ElecMeter`.  e.g. 'correlation'.
+        n_jobs : int, default=1
+            Number of processes to use (see `map_meters`).
 
         Returns
         -------
@@ -978,9 +1289,9 @@ class MeterGroup(Electric):
         """
         meter_identifiers = list(self.identifier.meters)
         result = pd.Series(index=meter_identifiers)
-        for meter in self.meters:
-            id_meter = meter.identifier
-            result[id_meter] = getattr(meter, method)()
+        values = map_meters(self.meters, method, n_jobs=n_jobs)
+        for meter, value in izip(self.meters, values):
+            result[meter.identifier] = value
         return result
 
     def pairwise(self, method):
@@ -1031,8 +1342,12 @@ class MeterGroup(Electric):
         Returns
         -------
         pd.DataFrame of correlation between pair of ElecMeters.
+
+        See Also
+        --------
+        correlation_matrix
         """
-        return self.pairwise('correlation')
+        return self.correlation_matrix()
 
     def proportion_of_energy_submetered(self, **loader_kwargs):
         """
@@ -1087,7 +1402,7 @@ class MeterGroup(Electric):
         return list(set(flatten_2d_list(all_physical_quants)))
 
     def energy_per_meter(self, per_period=None, mains=None, 
-                         use_meter_labels=False, **load_kwargs):
+                         use_meter_labels=False, n_jobs=1, **load_kwargs):
         """Returns pd.DataFrame where columns is meter.identifier and 
         each value is total energy.  Index is AC types.
 
@@ -1110,6 +1425,8 @@ class MeterGroup(Electric):
             If not None then will return a Series including a 'remainder'
             row which will be `mains.total_energy() - energy_per_meter.sum()`
             and an attempt will be made to use the correct AC_TYPE.
+        n_jobs : int, default=1
+            Number of processes to use (see `map_meters`).
 
         Returns
         -------
@@ -1117,17 +1434,17 @@ class MeterGroup(Electric):
         """
         meter_identifiers = list(self.identifier.meters)
         energy_per_meter = pd.DataFrame(columns=meter_identifiers, index=AC_TYPES)
-        n_meters = len(self.meters)
         load_kwargs.setdefault('ac_type', 'best')
-        for i, meter in enumerate(self.meters):
-            print('\r{:d}/{:d} {}'.format(i+1, n_meters, meter), end='')
-            stdout.flush()
-            if per_period is None:
-                meter_energy = meter.total_energy(**load_kwargs)
-            else:
-                load_kwargs.setdefault('use_uptime', False)
-                meter_energy = meter.average_energy_per_period(
-                    offset_alias=per_period, **load_kwargs)
+        if per_period is None:
+            method = 'total_energy'
+            kwargs = load_kwargs
+        else:
+            load_kwargs.setdefault('use_uptime', False)
+            method = 'average_energy_per_period'
+            kwargs = dict(load_kwargs, offset_alias=per_period)
+        meter_energies = map_meters(self.meters, method, kwargs,
+                                    n_jobs=n_jobs, verbose=True)
+        for meter, meter_energy in izip(self.meters, meter_energies):
             energy_per_meter[meter.identifier] = meter_energy
 
         energy_per_meters = energy_per_meter.dropna(how='all')
@@ -1179,14 +1496,11 @@ class MeterGroup(Electric):
         total_energy = energy_per_meter.sum()
         return energy_per_meter / total_energy
 
-    def proportion_of_upstream_total_per_meter(self, **load_kwargs):
+    def proportion_of_upstream_total_per_meter(self, n_jobs=1, **load_kwargs):
         prop_per_meter = pd.Series(index=self.identifier.meters)
-        n_meters = len(self.meters)
-        for i, meter in enumerate(self.meters):
-            proportion = meter.proportion_of_upstream(**load_kwargs)
-            print('\r{:d}/{:d} {} = {:.3f}'
-                  .format(i+1, n_meters, meter, proportion), end='')
-            stdout.flush()
+        proportions = map_meters(self.meters, 'proportion_of_upstream',
+                                 load_kwargs, n_jobs=n_jobs, verbose=True)
+        for meter, proportion in izip(self.meters, proportions):
             prop_per_meter[meter.identifier] = proportion
         prop_per_meter.sort(ascending=False)
         return prop_per_meter
@@ -1380,10 +1694,13 @@ class MeterGroup(Electric):
             else:
                 ax = meter.plot(ax=ax, plot_legend=False, **kwargs)
         if plot_legend:
+            import matplotlib.pyplot as plt
             plt.legend()
         return ax
 
     def _plot_sankey(self):
+        import matplotlib.pyplot as plt
+        import networkx as nx
         graph = self.wiring_graph()
         meter_labels = {meter: meter.instance() for meter in graph.nodes()}
         pos = nx.graphviz_layout(graph, prog='dot')
@@ -1446,6 +1763,7 @@ class MeterGroup(Electric):
         return ax, df
 
     def plot_when_on(self, **load_kwargs):
+        import matplotlib.pyplot as plt
         meter_identifiers = list(self.identifier.meters)
         fig, ax = plt.subplots()
         for i, meter in enumerate(self.meters):
@@ -1470,6 +1788,8 @@ class MeterGroup(Electric):
             if None then no labels will be produced.
         include_disabled_meters : bool
         """
+        import matplotlib.pyplot as plt
+        from matplotlib.ticker import FuncFormatter
         if ax is None:
             ax = plt.gca()
 
@@ -1611,6 +1931,12 @@ class MeterGroup(Electric):
         """Clear cache on all meters in this MeterGroup."""
         for meter in self.meters:
             meter.clear_cache()
+
+    def build_rollups(self, **kwargs):
+        """Build rollups on all meters in this MeterGroup.
+        See `ElecMeter.build_rollups`."""
+        for meter in self.meters:
+            meter.build_rollups(**kwargs)
         
     def correlation_of_sum_of_submeters_with_mains(self, **load_kwargs):
         print("Running MeterGroup.correlation_of_sum_of_submeters_with_mains...")
@@ -1621,21 +1947,32 @@ class MeterGroup(Electric):
         """Returns a list of self.meters + self.disabled_meters."""
         return self.meters + self.disabled_meters
 
-    def describe(self, compute_expensive_stats=True, **kwargs):
-        """Returns pd.Series describing this MeterGroup."""
+    def describe(self, compute_expensive_stats=True, n_jobs=1, **kwargs):
+        """Returns pd.Series describing this MeterGroup.
+
+        Per-meter statistics are computed in `n_jobs` processes
+        (see `map_meters`).
+        """
         series = pd.Series()
 
         all_meters = self.all_meters()
         series['total_n_meters'] = len(all_meters)
         site_meters = [m for m in all_meters if m.is_site_meter()]
         series['total_n_site_meters'] = len(site_meters)
+
+        # Compute good sections and total energy in a single pass over
+        # each meter so the calls below can use the cache.
+        compute_stats_for_each_meter(
+            all_meters if compute_expensive_stats else [self.mains()],
+            [GoodSections, TotalEnergy], kwargs, n_jobs=n_jobs)
+
         if compute_expensive_stats:
             series['correlation_of_sum_of_submeters_with_mains'] = (
                 self.correlation_of_sum_of_submeters_with_mains(**kwargs))
             series['proportion_of_energy_submetered'] = (
                 self.proportion_of_energy_submetered(**kwargs))
             dropout_rates = self._collect_stats_on_all_meters(
-                kwargs, 'dropout_rate', False)
+                kwargs, 'dropout_rate', False, n_jobs)
             dropout_rates = np.array(dropout_rates)
             series['dropout_rates_ignoring_gaps'] = (
                 "min={}, mean={}, max={}".format(
@@ -1699,12 +2036,408 @@ def iterate_through_submeters_of_two_metergroups(master, slave):
     return zipped
 
 
-def combine_chunks_from_generators(index, columns, meters, kwargs):
+def compute_stats_for_each_meter(meters, stats, kwargs, n_jobs=1):
+    """Calls `compute_stats(stats, **kwargs)` on each ElecMeter in
+    `meters` (including ElecMeters inside any MeterGroups), using
+    `n_jobs` processes (see `map_meters`)."""
+    meters = [meter for meter in _elecmeters_in(meters)
+              if meter.store is not None]
+    kwargs = dict(kwargs, stats=stats)
+    map_meters(meters, 'compute_stats', kwargs, n_jobs=n_jobs)
+
+
+def map_meters(meters, method, kwargs=None, n_jobs=1, verbose=False):
+    """Returns a list of `getattr(meter, method)(**kwargs)` for each
+    meter in `meters`.
+
+    If `n_jobs` > 1 then meters are processed by a pool of `n_jobs`
+    worker processes.  Each worker reads through its own
+    `read_only_copy()` of each DataStore.  Workers do not write to
+    DataStores: writes (i.e. to the statistics cache) are sent back to
+    this process which makes them in the order in which results arrive.
+    Rows which another worker has already written to the statistics
+    cache (e.g. for an upstream meter shared by several meters) are
+    skipped.  Worker processes are forked so this is only supported on
+    platforms which can fork.
+
+    Parameters
+    ----------
+    meters : list of ElecMeters and/or MeterGroups
+    method : str
+        Name of a method of each meter, e.g. 'total_energy'.
+    kwargs : dict, optional
+        Key word arguments for `method`.  Must be picklable.
+    n_jobs : int, optional, defaults to 1
+    verbose : bool, optional, defaults to False
+        If True then print progress for each meter.
+
+    Returns
+    -------
+    list, in the same order as `meters`.
+    """
+    global _worker_state
+    kwargs = {} if kwargs is None else kwargs
+    n_jobs = min(n_jobs, len(meters))
+    if n_jobs <= 1:
+        results = []
+        for meter in meters:
+            if verbose:
+                print_on_line("\rCalculating", method, "for",
+                              meter.identifier, "...   ")
+            results.append(getattr(meter, method)(**kwargs))
+        return results
+
+    # Worker processes inherit `_worker_state` when they are forked.
+    all_meters = _elecmeters_in(meters + nilmtk.global_meter_group.meters)
+    stores = []
+    for meter in all_meters:
+        if meter.store is not None and not any(
+                [meter.store is store for store in stores]):
+            stores.append(meter.store)
+    _worker_state = (meters, stores)
+    pool = mp.Pool(n_jobs, initializer=_init_worker)
+    try:
+        results = []
+        tasks = [(i, method, kwargs) for i in range(len(meters))]
+        for meter, (result, writes) in izip(
+                meters, pool.imap(_call_method_in_worker, tasks)):
+            if verbose:
+                print_on_line("\rCalculated", method, "for",
+                              meter.identifier, "...   ")
+            _make_writes(stores, writes)
+            results.append(result)
+    finally:
+        pool.terminate()
+        pool.join()
+        _worker_state = None
+    return results
+
+
+_worker_state = None
+
+
+def _elecmeters_in(meters):
+    """Returns a flat list of the ElecMeters in `meters`, including
+    ElecMeters inside any MeterGroups."""
+    elecmeters = []
+    for meter in meters:
+        if isinstance(meter, MeterGroup):
+            elecmeters.extend(_elecmeters_in(meter.all_meters()))
+        else:
+            elecmeters.append(meter)
+    return elecmeters
+
+
+def _init_worker():
+    """Runs in each worker process started by `map_meters`.  Points every
+    meter at a `_RecordingStore` wrapping a read-only copy of its
+    DataStore."""
+    global _worker_state
+    meters, stores = _worker_state
+    recording_stores = [_RecordingStore(store.read_only_copy())
+                        for store in stores]
+    all_meters = _elecmeters_in(meters + nilmtk.global_meter_group.meters)
+    for meter in all_meters:
+        for store, recording_store in izip(stores, recording_stores):
+            if meter.store is store:
+                meter.store = recording_store
+                break
+    _worker_state = (meters, recording_stores)
+
+
+def _call_method_in_worker(task):
+    """Returns (result, writes) where `writes` is a list of
+    (store_i, operation, key, value) tuples."""
+    i, method, kwargs = task
+    meters, recording_stores = _worker_state
+    result = getattr(meters[i], method)(**kwargs)
+    writes = []
+    for store_i, recording_store in enumerate(recording_stores):
+        writes.extend([(store_i,) + write
+                       for write in recording_store.writes])
+        del recording_store.writes[:]
+    return result, writes
+
+
+def _make_writes(stores, writes):
+    """Makes the writes recorded by a worker in `map_meters`."""
+    for store_i, operation, key, value in writes:
+        store = stores[store_i]
+        if operation == 'remove':
+            try:
+                store.remove(key)
+            except KeyError:
+                pass
+        elif operation == 'put':
+            store.put(key, value)
+        else:
+            cached_stat_index = _get_cached_stat_index(store, key)
+            value = _rows_not_already_cached(cached_stat_index, value)
+            if value.empty:
+                continue
+            try:
+                store.append(key, value)
+            except ValueError:
+                # the old table probably had different columns
+                store.remove(key)
+                store.put(key, value)
+                cached_stat_index = CachedStatIndex(value)
+            else:
+                cached_stat_index.extend(value)
+            # Writing to the store drops the in-memory index so put
+            # the (now up-to-date) index back.
+            store.cached_stat_indexes['/' + key.strip('/')] = cached_stat_index
+
+
+def _get_cached_stat_index(store, key):
+    """Returns the CachedStatIndex for the cached statistic at `key` in
+    `store` (see `ElecMeter._get_cached_stat_index`).  The cached 
+    statistic is only read from `store` the first time."""
+    key = '/' + key.strip('/')
+    try:
+        return store.cached_stat_indexes[key]
+    except KeyError:
+        pass
+    try:
+        cached = store[key]
+    except KeyError:
+        cached = None
+    if cached is None:
+        cached = pd.DataFrame()
+    cached_stat_index = CachedStatIndex(cached)
+    store.cached_stat_indexes[key] = cached_stat_index
+    return cached_stat_index
+
+
+def _rows_not_already_cached(cached_stat_index, value):
+    """Returns the rows of `value` (a cached statistic) whose
+    timeframe is not already in `cached_stat_index`."""
+    if 'end' not in value.columns:
+        return value
+    is_new = [not cached_stat_index.contains(TimeFrame(start, end))
+              for start, end in izip(value.index, value['end'])]
+    return value[np.array(is_new, dtype=bool)]
+
+
+class _RecordingStore(object):
+    """Wraps a DataStore in a worker process started by `map_meters`.
+    Reads go to the wrapped DataStore.  `append`, `put` and `remove`
+    (including those made through a `write_session`) are recorded in
+    `writes` for the parent process to make.  Cached statistics written
+    by the worker are still available to the worker through
+    `cached_stat_indexes`."""
+
+    def __init__(self, store):
+        self.store = store
+        self.writes = []
+
+    def __getattr__(self, name):
+        return getattr(self.store, name)
+
+    def __getitem__(self, key):
+        return self.store[key]
+
+    def append(self, key, value):
+        self.writes.append(('append', key, value))
+
+    def put(self, key, value):
+        self.writes.append(('put', key, value))
+
+    def remove(self, key):
+        self.writes.append(('remove', key, None))
+
+    def write_session(self, dtype=None, **kwargs):
+        """Returns a plain WriteSession whose writes are recorded.
+        Other `kwargs` (e.g. compression settings) are ignored because
+        the parent process makes the writes."""
+        return WriteSession(self, dtype=dtype)
+
+
+def first_chunk_from_each_meter(meters, kwargs):
+    """Returns a generator of the first chunk from `meter.load(**kwargs)`
+    for each meter in `meters`."""
+    for meter in meters:
+        print_on_line("\rLoading data for meter", meter.identifier, "    ")
+        kwargs_copy = deepcopy(kwargs)
+        generator = meter.load(**kwargs_copy)
+        try:
+            chunk_from_next_meter = generator.next()
+        except StopIteration:
+            continue
+
+        del generator
+        del kwargs_copy
+        gc.collect()
+        yield chunk_from_next_meter
+
+
+class _AlignedMeterStream(object):
+    """Reads one meter's data for a list of consecutive sections through
+    a single `meter.load` generator.  `chunk_for` must be called once
+    for each section, in order.
+    """
+
+    def __init__(self, meter, sections, kwargs):
+        self.meter = meter
+        kwargs_copy = deepcopy(kwargs)
+        kwargs_copy['sections'] = sections
+        self._generator = meter.load(**kwargs_copy)
+        self._next_chunk = None
+
+    def chunk_for(self, section):
+        """Returns the meter's data for `section` as a single DataFrame
+        (empty if the meter has no data for `section`)."""
+        print_on_line("\rLoading data for meter", self.meter.identifier, "    ")
+        chunks = []
+        while True:
+            chunk = self._next_chunk
+            self._next_chunk = None
+            if chunk is None:
+                chunk = next(self._generator, None)
+                if chunk is None:
+                    break
+            if _chunk_start(chunk) >= section.end:
+                # Chunk belongs to a later section
+                self._next_chunk = chunk
+                break
+            chunks.append(chunk)
+
+        chunks = [chunk for chunk in chunks if not chunk.empty]
+        if not chunks:
+            return pd.DataFrame()
+        elif len(chunks) == 1:
+            return chunks[0]
+
+        timeframe = chunks[0].timeframe
+        for chunk in chunks[1:]:
+            timeframe = timeframe.union(chunk.timeframe)
+        combined = pd.concat(chunks)
+        # Resampling each chunk separately can repeat a timestamp at the
+        # boundary between chunks.
+        combined = combined[~combined.index.duplicated()]
+        combined.timeframe = timeframe
+        return combined
+
+    def close(self):
+        close = getattr(self._generator, 'close', None)
+        if close is not None:
+            close()
+        self._next_chunk = None
+
+
+def _chunk_start(chunk):
+    timeframe = getattr(chunk, 'timeframe', None)
+    if timeframe is not None and timeframe.start is not None:
+        return timeframe.start
+    elif not chunk.empty:
+        return chunk.index[0]
+    else:
+        return pd.NaT
+
+
+def align_columns(chunk, index, columns):
+    """Returns a list with, for each column in `columns`, a numpy
+    array of `chunk[column]` reindexed to `index` (or None if `chunk`
+    does not have that column)."""
+    aligned_columns = []
+    for column_name in columns:
+        try:
+            column = chunk[column_name]
+        except KeyError:
+            aligned_columns.append(None)
+        else:
+            aligned_columns.append(column.reindex(index, copy=False).values)
+    return aligned_columns
+
+
+class MeterLoaderPool(object):
+    """Loads, preprocesses and aligns the first chunk from each ElecMeter
+    on a pool of threads.  Each thread reads through its own
+    `read_only_copy()` of each meter's DataStore.  Reads from DataStores
+    which do not support concurrent reads (e.g. HDF5) are serialised
+    but preprocessing (e.g. resampling) and alignment still run
+    concurrently.
+    """
+
+    def __init__(self, n_workers):
+        self._pool = ThreadPool(n_workers)
+        self._local = threading.local()
+        self._store_copies = []
+        self._store_copies_lock = threading.Lock()
+        # Shared with `DataStore.load(prefetch=...)` so pool threads and
+        # prefetch threads do not read from HDF5 at the same time.
+        self._read_lock = SERIAL_READ_LOCK
+
+    def first_chunk_from_each_meter(self, meters, kwargs, index, columns):
+        """Same as module function `first_chunk_from_each_meter` except 
+        that each chunk also has an `aligned_columns` attribute (see 
+        `align_columns`).  Chunks are returned in the order of `meters`."""
+        func = partial(self._load_first_chunk, kwargs=kwargs, index=index,
+                       columns=columns)
+        for meter, chunk in self._pool.imap(func, meters):
+            print_on_line("\rLoaded data for meter", meter.identifier, "    ")
+            if chunk is not None:
+                yield chunk
+
+    def close(self):
+        self._pool.close()
+        self._pool.join()
+        for store in self._store_copies:
+            store.close()
+        del self._store_copies[:]
+
+    def _load_first_chunk(self, meter, kwargs, index, columns):
+        kwargs = meter._prep_load_kwargs(**deepcopy(kwargs))
+        preprocessing = kwargs.pop('preprocessing', [])
+        kwargs = meter._convert_physical_quantity_and_ac_type_to_cols(
+            **kwargs)
+        store = self._store_for_this_thread(meter.store)
+        if store.supports_concurrent_reads:
+            chunk = next(store.load(key=meter.key, **kwargs), None)
+        else:
+            with self._read_lock:
+                chunk = next(store.load(key=meter.key, **kwargs), None)
+        if chunk is None:
+            return meter, None
+
+        meter.metadata['device'] = meter.device
+        last_node = Node(meter, generator=iter([chunk]))
+        generator = meter._connect_preprocessing(last_node, preprocessing)
+        chunk = next(generator, None)
+        if chunk is not None:
+            chunk.aligned_columns = align_columns(chunk, index, columns)
+        return meter, chunk
+
+    def _store_for_this_thread(self, store):
+        store_copies = self._local.__dict__.setdefault('store_copies', {})
+        try:
+            return store_copies[id(store)]
+        except KeyError:
+            pass
+        store_copy = store.read_only_copy()
+        store_copies[id(store)] = store_copy
+        with self._store_copies_lock:
+            self._store_copies.append(store_copy)
+        return store_copy
+
+
+def combine_chunks(index, columns, chunks):
     """Combines chunks into a single DataFrame.
 
     Adds or averages columns, depending on whether each column is in
     PHYSICAL_QUANTITIES_TO_AVERAGE.
 
+    Parameters
+    ----------
+    index : pd.DatetimeIndex
+        Every chunk is aligned to `index`.
+    columns : pd.MultiIndex
+    chunks : iterable of DataFrames, one per meter.
+        If a chunk has an `aligned_columns` attribute (see
+        `align_columns`) then those arrays are used instead of
+        aligning the chunk to `index`.  Chunks are summed in order so
+        the result does not depend on how the chunks were loaded.
+
     Returns
     -------
     DataFrame
@@ -1728,20 +2461,8 @@ def combine_chunks_from_generators(index, columns, meters, kwargs):
     columns_to_average_counter = pd.DataFrame(dtype=np.uint16)
     timeframe = None
 
-    # Go through each generator to try sum values together
-    for meter in meters:
-        print_on_line("\rLoading data for meter", meter.identifier, "    ")
-        kwargs_copy = deepcopy(kwargs)
-        generator = meter.load(**kwargs_copy)
-        try:
-            chunk_from_next_meter = generator.next()
-        except StopIteration:
-            continue
-
-        del generator
-        del kwargs_copy
-        gc.collect()
-
+    # Go through each chunk to try sum values together
+    for chunk_from_next_meter in chunks:
         if chunk_from_next_meter.empty or not chunk_from_next_meter.timeframe:
             continue
 
@@ -1751,14 +2472,21 @@ def combine_chunks_from_generators(index, columns, meters, kwargs):
             timeframe = timeframe.union(chunk_from_next_meter.timeframe)
 
         # Add (in-place)
+        aligned_columns = getattr(chunk_from_next_meter, 'aligned_columns',
+                                  None)
         for i, column_name in enumerate(columns):
-            try:
-                column = chunk_from_next_meter[column_name]
-            except KeyError:
-                continue
+            if aligned_columns is None:
+                try:
+                    column = chunk_from_next_meter[column_name]
+                except KeyError:
+                    continue
 
-            aligned = column.reindex(index, copy=False).values
-            del column
+                aligned = column.reindex(index, copy=False).values
+                del column
+            else:
+                aligned = aligned_columns[i]
+                if aligned is None:
+                    continue
             cumulator_col = cumulator_arr[:,i]
             where_both_are_nan = np.isnan(cumulator_col) & np.isnan(aligned)
             np.nansum([cumulator_col, aligned], axis=0, out=cumulator_col, 
@@ -1766,7 +2494,10 @@ def combine_chunks_from_generators(index, columns, meters, kwargs):
             cumulator_col[where_both_are_nan] = np.NaN
             del aligned
             del where_both_are_nan
-            gc.collect()
+            if aligned_columns is None:
+                gc.collect()
+
+        del aligned_columns
 
         # Update columns_to_average_counter - this is necessary so we do not
         # add up columns like 'voltage' which should be averaged.
@@ -1799,4 +2530,22 @@ def combine_chunks_from_generators(index, columns, meters, kwargs):
     return cumulator
 
 
+def combine_chunks_from_generators(index, columns, meters, kwargs):
+    """Combines the first chunk from `meter.load(**kwargs)` for each
+    meter in `meters` into a single DataFrame.  See `combine_chunks`.
+
+    Returns
+    -------
+    DataFrame
+    """
+    return combine_chunks(index, columns,
+                          first_chunk_from_each_meter(meters, kwargs))
+
+
 meter_sorting_key = lambda meter: meter.instance()
+
+# Key word arguments to `MeterGroup.load` which can be handled when
+# loading all meters from one DataStore in a batch.
+BATCHED_LOAD_KWARGS = set(['sample_period', 'resample', 'resample_kwargs',
+                           'physical_quantity', 'ac_type', 'cols',
+                           'preprocessing', 'sections', 'verbose'])
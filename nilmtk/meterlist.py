@@ -0,0 +1,214 @@
+from __future__ import print_function, division
+from .appliance import Appliance
+
+# Key in each index for meters which cannot be indexed (e.g. because
+# they have no identifier).
+_UNINDEXED = object()
+
+
+class MeterList(list):
+    """A list of ElecMeters and/or MeterGroups (as used for
+    `MeterGroup.meters`) which maintains hash indexes of its meters so
+    that `MeterGroup.__getitem__`, `MeterGroup.select` and
+    `ElecMeter.upstream_meter` do not need to scan every meter.
+
+    Each index maps a key to a list of the meters (in list order) which
+    may have that key.  Indexes are built the first time they are used
+    and are then updated when meters are appended to the list.  Any
+    other change to the list drops the indexes, which are rebuilt when
+    next used.  Appending a meter drops the `appliance_type` index
+    because appliances are usually attached to meters after the meters
+    have been added to a MeterGroup.
+
+    The indexes assume that the identifier and the appliances of each
+    meter do not change while the meter is in the list.  Call `reindex()`
+    after changing them (e.g. after attaching more appliances to meters).
+
+    `version` is incremented whenever the list changes (or `reindex()`
+    is called) so that anything computed from the list (e.g.
+    `MeterGroup.wiring_topology()`) can tell when it is out of date.
+
+    Indexes
+    -------
+    identifier : meter.identifier.  MeterGroups are indexed by the
+        frozenset of the identifiers of their meters.
+    instance, building, dataset : of each ElecMeter (and, for a
+        MeterGroup, of each ElecMeter within the MeterGroup).
+    appliance_type : type (and synonyms) of each appliance on the meter.
+    """
+
+    def __init__(self, meters=()):
+        super(MeterList, self).__init__(meters)
+        self._indexes = {}
+        self.version = 0
+
+    def __reduce__(self):
+        return (self.__class__, (list(self),))
+
+    def lookup(self, index_name, key):
+        """Returns a list of the meters (in list order) which may have
+        `key` in index `index_name`.  Callers must check that each meter
+        really does match.  Returns None if `key` cannot be looked up
+        (e.g. because it is not hashable), in which case callers should
+        check every meter.
+        """
+        try:
+            hash(key)
+        except TypeError:
+            return
+        index = self._index(index_name)
+        if _UNINDEXED in index:
+            return
+        return index.get(key, [])
+
+    def reindex(self):
+        """Drops all indexes.  They will be rebuilt when next used."""
+        self._indexes = {}
+        self.version += 1
+
+    def _index(self, index_name):
+        try:
+            return self._indexes[index_name]
+        except KeyError:
+            index = {}
+            for meter in self:
+                _add_to_index(index, meter, index_name)
+            self._indexes[index_name] = index
+            return index
+
+    # Methods which modify the list
+    def append(self, meter):
+        super(MeterList, self).append(meter)
+        self.version += 1
+        self._indexes.pop('appliance_type', None)
+        for index_name, index in self._indexes.iteritems():
+            _add_to_index(index, meter, index_name)
+
+    def extend(self, meters):
+        for meter in meters:
+            self.append(meter)
+
+    def __iadd__(self, meters):
+        self.extend(meters)
+        return self
+
+    def insert(self, i, meter):
+        super(MeterList, self).insert(i, meter)
+        self.reindex()
+
+    def remove(self, meter):
+        super(MeterList, self).remove(meter)
+        self.reindex()
+
+    def pop(self, *args):
+        meter = super(MeterList, self).pop(*args)
+        self.reindex()
+        return meter
+
+    def sort(self, *args, **kwargs):
+        super(MeterList, self).sort(*args, **kwargs)
+        self.reindex()
+
+    def reverse(self):
+        super(MeterList, self).reverse()
+        self.reindex()
+
+    def __setitem__(self, i, value):
+        super(MeterList, self).__setitem__(i, value)
+        self.reindex()
+
+    def __delitem__(self, i):
+        super(MeterList, self).__delitem__(i)
+        self.reindex()
+
+    def __setslice__(self, i, j, values):
+        super(MeterList, self).__setslice__(i, j, values)
+        self.reindex()
+
+    def __delslice__(self, i, j):
+        super(MeterList, self).__delslice__(i, j)
+        self.reindex()
+
+    def __imul__(self, n):
+        super(MeterList, self).__imul__(n)
+        self.reindex()
+        return self
+
+    def __contains__(self, meter):
+        key = _identifier_key(meter)
+        candidates = None if key is None else self.lookup('identifier', key)
+        if candidates is None:
+            return super(MeterList, self).__contains__(meter)
+        return any(candidate == meter for candidate in candidates)
+
+
+def _add_to_index(index, meter, index_name):
+    keys = _index_keys(meter, index_name)
+    if keys is None:
+        keys = [_UNINDEXED]
+    for key in keys:
+        meters = index.setdefault(key, [])
+        if not meters or meters[-1] is not meter:
+            meters.append(meter)
+
+
+def _index_keys(meter, index_name):
+    """Returns a list of the keys for `meter` in index `index_name`, or
+    None if `meter` cannot be indexed."""
+    if index_name == 'identifier':
+        key = _identifier_key(meter)
+        return None if key is None else [key]
+    elif index_name == 'appliance_type':
+        keys = []
+        for appliance in meter.appliances:
+            appliance_type = appliance.identifier.type
+            keys.append(appliance_type)
+            keys.extend(Appliance.appliance_types.get(appliance_type, {})
+                        .get('synonyms', []))
+        return keys
+    else:
+        identifiers = _elecmeter_identifiers(meter)
+        if identifiers is None:
+            return
+        keys = []
+        for identifier in identifiers:
+            value = getattr(identifier, index_name)
+            if isinstance(value, (tuple, list)):
+                # e.g. instance=(1, 2).  Index each element too.
+                keys.extend(value)
+            try:
+                hash(value)
+            except TypeError:
+                continue
+            keys.append(value)
+        return keys
+
+
+def _identifier_key(meter):
+    """Returns the identifier of an ElecMeter or the frozenset of the
+    identifiers of the meters in a MeterGroup (or None)."""
+    nested_meters = getattr(meter, 'meters', None)
+    if nested_meters is not None:
+        identifiers = [nested_meter.identifier
+                       for nested_meter in nested_meters]
+        if None in identifiers:
+            return
+        return frozenset(identifiers)
+    return getattr(meter, 'identifier', None)
+
+
+def _elecmeter_identifiers(meter):
+    """Returns the identifiers of every ElecMeter in `meter` (which may
+    be an ElecMeter or a MeterGroup), or None if any ElecMeter has no
+    identifier."""
+    nested_meters = getattr(meter, 'meters', None)
+    if nested_meters is None:
+        identifier = getattr(meter, 'identifier', None)
+        return None if identifier is None else [identifier]
+    identifiers = []
+    for nested_meter in nested_meters:
+        nested_identifiers = _elecmeter_identifiers(nested_meter)
+        if nested_identifiers is None:
+            return
+        identifiers.extend(nested_identifiers)
+    return identifiers
@@ -1,7 +1,11 @@
 import abc
+import numpy as np
 import pandas as pd
 import copy
-from .timeframe import TimeFrame
+from bisect import bisect_right
+from collections import OrderedDict
+from numbers import Number
+from .timeframe import TimeFrame, convert_nat_to_none
 from nilmtk.utils import get_tz, tz_localize_naive
 
 class Results(object):
@@ -14,6 +18,12 @@ class Results(object):
     timestamp for which the results are valid.  Other columns are accumulators 
     for the results.
 
+    Rows passed to `append` are accumulated column-by-column in Python
+    lists and only turned into a DataFrame when `_data` is next read
+    (e.g. by `combined()`, `per_period()` or `export_to_cache()`).  The
+    start and end of every row are also kept in sorted lists so that
+    `append` can check for overlap with a binary search.
+
     Attributes
     ----------
     _data : DataFrame
@@ -30,6 +40,24 @@ class Results(object):
     def __init__(self):
         self._data = pd.DataFrame(columns=['end'])
 
+    @property
+    def _data(self):
+        if self._pending_index:
+            self._data_frame = self._materialise()
+            self._pending_index = []
+            self._pending_columns = OrderedDict()
+        return self._data_frame
+
+    @_data.setter
+    def _data(self, data):
+        self._data_frame = data
+        self._pending_index = []
+        self._pending_columns = OrderedDict()
+        # Sorted starts and ends (in UTC nanoseconds) of every row.
+        # Built lazily from `_data_frame` by `_intervals`.
+        self._interval_starts = None
+        self._interval_ends = None
+
     def combined(self):
         """Return all results from each chunk combined.  Either return single
         float for all periods or a dict where necessary, e.g. if
@@ -56,6 +84,11 @@ class Results(object):
         ----------
         timeframe : nilmtk.TimeFrame
         new_results : dict
+            Each value is stored as-is in the cell for its key.
+
+        Raises
+        ------
+        ValueError if `timeframe` overlaps a timeframe already appended.
         """
         if not isinstance(timeframe, TimeFrame):
             raise TypeError("`timeframe` must be of type 'nilmtk.TimeFrame',"
@@ -64,30 +97,39 @@ class Results(object):
             raise TypeError("`new_results` must of a dict, not '{}' type."
                             .format(type(new_results)))
         
-        # check that there is no overlap
-        for index, series in self._data.iterrows():
-            tf = TimeFrame(index, series['end'])
-            tf.check_for_overlap(timeframe)
-
-        row = pd.DataFrame(index=[timeframe.start],
-                           columns=['end'] + new_results.keys())
-        row['end'] = timeframe.end
-        for key, val in new_results.iteritems():
-            row[key] = val
-        self._data = self._data.append(row, verify_integrity=True)
-        self._data.sort_index(inplace=True)
+        if not timeframe.empty:
+            self._insert_interval(timeframe)
+
+        n_rows = len(self._pending_index)
+        self._pending_index.append(timeframe.start)
+        row = OrderedDict([('end', timeframe.end)])
+        row.update(new_results)
+        for key in set(self._pending_columns) - set(row):
+            self._pending_columns[key].append(np.nan)
+        for key, val in row.iteritems():
+            column = self._pending_columns.get(key)
+            if column is None:
+                column = self._pending_columns[key] = [np.nan] * n_rows
+            column.append(val)
 
     def check_for_overlap(self):
-        # TODO this could be made much faster
-        n = len(self._data)
-        index = self._data.index
-        for i in range(n):
-            row1 = self._data.iloc[i]
-            tf1 = TimeFrame(index[i], row1['end'])
-            for j in range(i+1, n):
-                row2 = self._data.iloc[j]
-                tf2 = TimeFrame(index[j], row2['end'])
-                tf1.check_for_overlap(tf2)
+        """Raises ValueError if any two rows overlap.  Sorts the rows by
+        start and then compares each start with the latest end of all
+        the rows before it."""
+        starts, ends = _interval_arrays(self._data)
+        if len(starts) < 2:
+            return
+        order = np.lexsort((ends, starts))
+        starts = starts[order]
+        ends = ends[order]
+        latest_end_so_far = np.maximum.accumulate(ends)
+        overlapping = np.flatnonzero(starts[1:] < latest_end_so_far[:-1])
+        if len(overlapping) > 0:
+            i = overlapping[0] + 1
+            tf = self._timeframe_for_row(order[i])
+            for j in range(i):
+                if ends[j] > starts[i]:
+                    self._timeframe_for_row(order[j]).check_for_overlap(tf)
 
     def update(self, new_result):
         """Add results from a new chunk.
@@ -105,8 +147,9 @@ class Results(object):
         if new_result._data.empty:
             return
 
-        self._data = self._data.append(new_result._data)
-        self._data.sort_index(inplace=True)
+        data = self._data.append(new_result._data)
+        data.sort_index(inplace=True)
+        self._data = data
         self.check_for_overlap()
 
     def unify(self, other):
@@ -194,6 +237,67 @@ class Results(object):
         return [TimeFrame(self._data.index[i], self._data.iloc[i]['end'])
                 for i in range(len(self._data))]
 
+    def _timeframe_for_row(self, i):
+        return TimeFrame(self._data.index[i], self._data.iloc[i]['end'])
+
+    def _intervals(self):
+        """Returns the sorted lists of the start and end (in UTC
+        nanoseconds) of every row."""
+        if self._interval_starts is None:
+            starts, ends = _interval_arrays(self._data)
+            order = np.argsort(starts, kind='mergesort')
+            self._interval_starts = starts[order].tolist()
+            self._interval_ends = ends[order].tolist()
+        return self._interval_starts, self._interval_ends
+
+    def _insert_interval(self, timeframe):
+        """Adds `timeframe` to the sorted intervals.  Rows never overlap
+        so sorting by start also sorts by end, hence `timeframe` can only
+        overlap the rows immediately before and after it."""
+        starts, ends = self._intervals()
+        start = _start_ns(timeframe.start)
+        end = _end_ns(timeframe.end)
+        i = bisect_right(starts, start)
+        if ((i > 0 and ends[i-1] > start) or
+                (i < len(starts) and starts[i] < end)):
+            neighbours = [TimeFrame(_timestamp_or_none(starts[j], timeframe),
+                                    _timestamp_or_none(ends[j], timeframe))
+                          for j in [i-1, i] if 0 <= j < len(starts)]
+            raise ValueError("Periods overlap: " + str(timeframe) + " " +
+                             " ".join([str(tf) for tf in neighbours]))
+        starts.insert(i, start)
+        ends.insert(i, end)
+
+    def _materialise(self):
+        """Returns `_data_frame` with the pending rows added."""
+        columns = OrderedDict()
+        for key, values in self._pending_columns.iteritems():
+            columns[key] = _column_array(values)
+        new_rows = pd.DataFrame(columns, columns=columns.keys(),
+                                index=self._pending_index)
+        if self._data_frame.empty and list(self._data_frame.columns) == ['end']:
+            data = new_rows
+        else:
+            data = self._data_frame.append(new_rows)
+        if not data.index.is_monotonic:
+            data.sort_index(inplace=True)
+        return data
+
+    def __copy__(self):
+        """Returns a copy which does not share any mutable state with
+        `self`, so appending to one does not change the other."""
+        new = self.__class__.__new__(self.__class__)
+        new.__dict__.update(self.__dict__)
+        new._data_frame = self._data_frame.copy()
+        new._pending_index = list(self._pending_index)
+        new._pending_columns = OrderedDict(
+            (key, list(values))
+            for key, values in self._pending_columns.iteritems())
+        if self._interval_starts is not None:
+            new._interval_starts = list(self._interval_starts)
+            new._interval_ends = list(self._interval_ends)
+        return new
+
     def _columns_with_end_removed(self):
         cols = set(self._data.columns)
         if len(cols) > 0:
@@ -203,3 +307,53 @@ class Results(object):
 
     def __repr__(self):
         return str(self._data)
+
+
+# Starts and ends of None are infinitely far away.  The smallest
+# int64 is NaT so use the next one along.
+_MIN_NS = np.iinfo(np.int64).min + 1
+_MAX_NS = np.iinfo(np.int64).max
+
+
+def _start_ns(start):
+    return _MIN_NS if start is None else pd.Timestamp(start).value
+
+
+def _end_ns(end):
+    return _MAX_NS if end is None else pd.Timestamp(end).value
+
+
+def _timestamp_or_none(ns, like):
+    """Returns None or a Timestamp with the same timezone as the
+    start or end of TimeFrame `like`."""
+    if ns in (_MIN_NS, _MAX_NS):
+        return None
+    timestamp = pd.Timestamp(ns, tz='UTC')
+    tz = getattr(like.start or like.end, 'tz', None)
+    return timestamp.tz_localize(None) if tz is None else timestamp.tz_convert(tz)
+
+
+def _interval_arrays(data):
+    """Returns the start and end of each row of `data` as int64 arrays
+    of UTC nanoseconds."""
+    if isinstance(data.index, pd.DatetimeIndex):
+        starts = data.index.asi8.copy()
+        starts[starts == pd.NaT.value] = _MIN_NS
+    else:
+        starts = np.array([_start_ns(convert_nat_to_none(start))
+                           for start in data.index], dtype=np.int64)
+    ends = np.array([_end_ns(convert_nat_to_none(end))
+                     for end in data['end']] if 'end' in data else [],
+                    dtype=np.int64)
+    return starts, ends
+
+
+def _column_array(values):
+    """Returns a numeric array if every value is a number, otherwise an
+    object array holding each value as-is (so a list stays in one cell)."""
+    if all([isinstance(value, Number) for value in values]):
+        return np.array(values)
+    array = np.empty(len(values), dtype=object)
+    for i, value in enumerate(values):
+        array[i] = value
+    return array
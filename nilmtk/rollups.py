@@ -0,0 +1,186 @@
+"""Functions for building and using rollups: summaries of a meter's data
+over fixed-length buckets of time (e.g. every minute or every hour).
+
+A rollup is a DataFrame with one row per bucket.  The index is the start
+of each bucket.  Buckets are aligned to multiples of the bucket period
+since the Unix epoch (in UTC).  Columns are a three-level MultiIndex:
+(physical_quantity, type, stat) where `stat` is one of ROLLUP_STATS:
+
+    count : number of samples in the bucket
+    mean, min, max : of the samples in the bucket
+    energy : kWh (or equivalent) for power and energy measurements,
+        NaN for all other measurements.
+
+See `ElecMeter.build_rollups`.
+"""
+from __future__ import print_function, division
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from .consts import JOULES_PER_KWH
+from .measurement import LEVEL_NAMES
+from .utils import safe_resample
+
+
+# Bucket periods in seconds: 1 minute, 15 minutes, 1 hour and 1 day.
+ROLLUP_PERIODS = (60, 900, 3600, 86400)
+ROLLUP_STATS = ['count', 'mean', 'min', 'max', 'energy']
+
+# Values of `resample_kwargs['how']` which can be served from rollups.
+ROLLUP_HOWS = ['mean', 'min', 'max']
+
+
+def aggregate_samples(chunk, period, max_sample_period, limits=None):
+    """Returns a rollup of `chunk` with buckets of `period` seconds.
+
+    Parameters
+    ----------
+    chunk : pd.DataFrame
+        Raw meter data.  If `chunk.look_ahead` is set then it is used to
+        find the duration of the last sample in `chunk`.
+    period : int, seconds
+    max_sample_period : number, seconds
+        Used when calculating energy from power.
+    limits : dict, optional
+        Maps each column to a (lower, upper) tuple.  Power is clipped to
+        these limits before calculating energy (as `TotalEnergy` does).
+
+    Returns
+    -------
+    pd.DataFrame (see module docstring).
+    """
+    buckets = _bucket_index(chunk.index, period)
+    energy = _energy_per_sample(chunk, max_sample_period, limits or {})
+    grouped = chunk.groupby(buckets)
+    return _rollup_from_stats(
+        count=grouped.count(), total=grouped.sum(), minimum=grouped.min(),
+        maximum=grouped.max(), energy=energy.groupby(buckets).sum())
+
+
+def combine(rollup, period):
+    """Returns `rollup` aggregated into buckets of `period` seconds.
+    `period` must be a multiple of the period of `rollup`.  Rows of
+    `rollup` which share a bucket are merged."""
+    buckets = _bucket_index(rollup.index, period)
+    count = get_stat(rollup, 'count')
+    total = (get_stat(rollup, 'mean') * count).fillna(0)
+    return _rollup_from_stats(
+        count=count.groupby(buckets).sum(),
+        total=total.groupby(buckets).sum(),
+        minimum=get_stat(rollup, 'min').groupby(buckets).min(),
+        maximum=get_stat(rollup, 'max').groupby(buckets).max(),
+        energy=get_stat(rollup, 'energy').groupby(buckets).sum())
+
+
+def get_stat(rollup, stat):
+    """Returns a DataFrame of `stat` with columns (physical_quantity, type)."""
+    return rollup.xs(stat, axis=1, level='stat')
+
+
+def resample_rollup(rollup, cols, sample_period, how='mean'):
+    """Resamples `rollup` to `sample_period` seconds, as if the raw data had
+    been resampled with `pd.DataFrame.resample(how=how)`.
+
+    Parameters
+    ----------
+    rollup : pd.DataFrame
+        Period must exactly divide `sample_period`.
+    cols : list of (physical_quantity, type) tuples
+    sample_period : int, seconds
+    how : {'mean', 'min', 'max'}
+
+    Returns
+    -------
+    pd.DataFrame with columns `cols`.
+    """
+    rule = '{:d}S'.format(sample_period)
+    columns = []
+    for col in cols:
+        if how == 'mean':
+            count = rollup[col + ('count',)]
+            total = (rollup[col + ('mean',)] * count).fillna(0)
+            column = (safe_resample(total, rule=rule, how='sum') /
+                      safe_resample(count, rule=rule, how='sum'))
+        else:
+            column = safe_resample(rollup[col + (how,)], rule=rule, how=how)
+        columns.append(column)
+    data = pd.concat(columns, axis=1)
+    data.columns = pd.MultiIndex.from_tuples(cols, names=LEVEL_NAMES)
+    return data
+
+
+def floor_to_period(timestamp, period):
+    """Rounds `timestamp` down to a multiple of `period` seconds of
+    local (wall clock) time, which is where `resample` puts its bins
+    when `period` exactly divides a day."""
+    return _round_to_period(timestamp, period, np.floor)
+
+
+def ceil_to_period(timestamp, period):
+    """Rounds `timestamp` up.  See `floor_to_period`."""
+    return _round_to_period(timestamp, period, np.ceil)
+
+
+def _round_to_period(timestamp, period, round_func):
+    tz = timestamp.tz
+    wall_clock = pd.Timestamp(timestamp.replace(tzinfo=None))
+    period_ns = int(period * 1E9)
+    rounded = pd.Timestamp(
+        int(round_func(wall_clock.value / period_ns)) * period_ns)
+    return rounded if tz is None else rounded.tz_localize(tz)
+
+
+def _bucket_index(index, period):
+    """Returns a DatetimeIndex of the start of the bucket for each
+    timestamp in `index`."""
+    period_ns = int(period * 1E9)
+    index_ns = index.asi8
+    buckets = pd.DatetimeIndex(index_ns - (index_ns % period_ns))
+    if index.tz is not None:
+        buckets = buckets.tz_localize('UTC').tz_convert(index.tz)
+    return buckets
+
+
+def _energy_per_sample(chunk, max_sample_period, limits):
+    """Returns a DataFrame the same shape as `chunk` of the energy (in kWh)
+    for each sample.  Each power sample lasts until the next sample in the
+    same column, up to `max_sample_period` seconds."""
+    look_ahead = getattr(chunk, 'look_ahead', None)
+    energy = OrderedDict()
+    for col in chunk.columns:
+        physical_quantity = col[0]
+        values = np.empty(len(chunk))
+        values.fill(np.nan)
+        series = chunk[col]
+        valid = series.notnull().values
+        if physical_quantity == 'energy':
+            values[valid] = series.values[valid]
+        elif physical_quantity == 'power' and valid.any():
+            timestamps = chunk.index.asi8[valid]
+            next_timestamp = timestamps[-1]
+            if look_ahead is not None and col in look_ahead:
+                next_valid = look_ahead[col].dropna()
+                if not next_valid.empty:
+                    next_timestamp = next_valid.index.asi8[0]
+            durations = np.diff(np.append(timestamps, next_timestamp)) / 1E9
+            durations = durations.clip(0, max_sample_period)
+            power = series.values[valid]
+            lower, upper = limits.get(col, (None, None))
+            if lower is not None and upper is not None:
+                power = power.clip(lower, upper)
+            values[valid] = power * durations / JOULES_PER_KWH
+        energy[col] = values
+    return pd.DataFrame(energy, index=chunk.index, columns=chunk.columns)
+
+
+def _rollup_from_stats(count, total, minimum, maximum, energy):
+    stats = OrderedDict([
+        ('count', count.astype(np.float64)),
+        ('mean', total / count),
+        ('min', minimum),
+        ('max', maximum),
+        ('energy', energy)])
+    rollup = pd.concat(stats.values(), axis=1, keys=stats.keys())
+    rollup = rollup.reorder_levels([1, 2, 0], axis=1)
+    rollup.columns.names = LEVEL_NAMES + ['stat']
+    return rollup
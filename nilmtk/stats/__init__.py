@@ -1,3 +1,4 @@
 from .totalenergy import TotalEnergy
 from .goodsections import GoodSections
 from .dropoutrate import DropoutRate
+from .powerdistribution import PowerDistribution
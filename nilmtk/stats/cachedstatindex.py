@@ -0,0 +1,129 @@
+from __future__ import print_function, division
+import numpy as np
+import pandas as pd
+from nilmtk.timeframe import TimeFrame
+
+
+class CachedStatIndex(object):
+    """In-memory index over the rows of a cached statistic (as stored by
+    `ElecMeter._get_stat_from_cache_or_compute`).
+
+    Each cached row is valid for the timeframe starting at the row's
+    index and ending at the row's 'end' column.  Rows are indexed by
+    (start, end) so finding the rows for k sections out of n cached rows
+    takes O(k log n) instead of a scan of the whole table.
+
+    Attributes
+    ----------
+    data : pd.DataFrame
+        The cached statistic, exactly as stored in the DataStore.
+    """
+
+    def __init__(self, cached_stat):
+        self.data = cached_stat
+        self._build()
+
+    def __len__(self):
+        return len(self.data)
+
+    def extend(self, new_rows):
+        """Adds `new_rows` (which have just been appended to the cached
+        statistic in the DataStore) to the index."""
+        if new_rows is None or new_rows.empty:
+            return
+        if self.data.empty:
+            self.data = new_rows
+        else:
+            self.data = self.data.append(new_rows)
+        self._build()
+
+    def contains(self, section):
+        """Returns True if there is at least one cached row for `section`."""
+        lo, hi = self._row_range(section)
+        return hi > lo
+
+    def tiling(self, section):
+        """Returns a list of the timeframes of cached rows which, chained
+        together end-to-start, exactly cover `section`.  Returns None if
+        there is no such chain.
+
+        `ElecMeter.append` caches rows for newly appended data which start
+        where the rows for the old data end, so this is how the cache
+        serves the meter's whole (extended) timeframe.
+        """
+        if not section or section.start is None or section.end is None:
+            return None
+        end_ns = section.end.value
+        current_ns = section.start.value
+        positions = []
+        while current_ns < end_ns:
+            lo = self._starts.searchsorted(current_ns, side='left')
+            hi = self._starts.searchsorted(current_ns, side='right')
+            # The longest row starting at `current_ns` which fits in `section`
+            i = lo + self._ends[lo:hi].searchsorted(end_ns, side='right') - 1
+            if i < lo or self._ends[i] <= current_ns:
+                return None
+            positions.append(i)
+            current_ns = self._ends[i]
+        tz = section.start.tz
+        return [TimeFrame(_from_ns(self._starts[i], tz),
+                          _from_ns(self._ends[i], tz))
+                for i in positions]
+
+    def rows_for_sections(self, sections):
+        """Returns a DataFrame of the cached rows for `sections`.
+
+        Parameters
+        ----------
+        sections : list of nilmtk.TimeFrames
+        """
+        positions = []
+        for section in sections:
+            lo, hi = self._row_range(section)
+            positions.extend(self._order[lo:hi])
+        positions.sort()
+        return self.data.iloc[positions]
+
+    def _row_range(self, section):
+        """Returns the range of positions in the sorted arrays of rows
+        whose start and end equal `section.start` and `section.end`."""
+        if not section or section.start is None or section.end is None:
+            return 0, 0
+        start_ns = section.start.value
+        end_ns = section.end.value
+        lo = self._starts.searchsorted(start_ns, side='left')
+        hi = self._starts.searchsorted(start_ns, side='right')
+        ends = self._ends[lo:hi]
+        return (lo + ends.searchsorted(end_ns, side='left'),
+                lo + ends.searchsorted(end_ns, side='right'))
+
+    def _build(self):
+        if self.data.empty or 'end' not in self.data.columns:
+            self._starts = np.empty(0, dtype=np.int64)
+            self._ends = np.empty(0, dtype=np.int64)
+            self._order = np.empty(0, dtype=np.int64)
+            return
+
+        starts = _to_ns(self.data.index)
+        ends = _to_ns(self.data['end'])
+        self._order = np.lexsort((ends, starts))
+        self._starts = starts[self._order]
+        self._ends = ends[self._order]
+
+
+def _from_ns(ns, tz):
+    if tz is None:
+        return pd.Timestamp(int(ns))
+    return pd.Timestamp(int(ns), tz='UTC').tz_convert(tz)
+
+
+def _to_ns(timestamps):
+    """Returns UTC nanoseconds as an int64 array.  Naive timestamps are
+    assumed to be UTC (see `nilmtk.utils.tz_localize_naive`)."""
+    if isinstance(timestamps, pd.DatetimeIndex):
+        return timestamps.asi8
+    values = np.asarray(timestamps)
+    if values.dtype.kind == 'M':
+        return values.astype('datetime64[ns]').view(np.int64)
+    return np.array([pd.Timestamp(timestamp).value for timestamp in values],
+                    dtype=np.int64)
@@ -0,0 +1,90 @@
+from __future__ import print_function, division
+import numpy as np
+
+
+class CoMoments(object):
+    """Pairwise means, variances and covariances of `n_columns` variables,
+    accumulated one chunk at a time.
+
+    For each pair of columns (i, j) only the rows where both columns are
+    not NaN are used (pairwise-complete observations).  The moments of
+    each chunk are computed about the chunk's column means and then
+    merged into the running totals with the pairwise update of Chan,
+    Golub & LeVeque (a generalisation of Welford's algorithm) so the
+    result is numerically stable and does not depend on chunk size.
+
+    Attributes
+    ----------
+    n : (n_columns, n_columns) array
+        Number of rows where both column i and column j are not NaN.
+    mean : (n_columns, n_columns) array
+        Mean of column i over the rows counted in n[i, j].
+    m2 : (n_columns, n_columns) array
+        Sum of squared deviations of column i from mean[i, j].
+    c : (n_columns, n_columns) array
+        Sum of the products of the deviations of columns i and j.
+    """
+
+    def __init__(self, n_columns):
+        shape = (n_columns, n_columns)
+        self.n = np.zeros(shape)
+        self.mean = np.zeros(shape)
+        self.m2 = np.zeros(shape)
+        self.c = np.zeros(shape)
+
+    def update(self, values):
+        """Adds a chunk of data.
+
+        Parameters
+        ----------
+        values : 2D array-like, shape (n_rows, n_columns)
+            NaNs are treated as missing.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) == 0:
+            return
+        valid = ~np.isnan(values)
+        weights = valid.astype(np.float64)
+        n = weights.T.dot(weights)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            # Shift each column by its mean to avoid cancellation.
+            shift = np.nansum(values, axis=0) / valid.sum(axis=0)
+            shifted = np.where(valid, values - shift, 0.0)
+            mean = shifted.T.dot(weights) / n
+            mean[n == 0] = 0.0
+            m2 = (shifted ** 2).T.dot(weights) - n * mean ** 2
+            c = shifted.T.dot(shifted) - n * mean * mean.T
+        mean += np.where(np.isnan(shift), 0.0, shift)[:, np.newaxis]
+        self._merge(n, mean, m2, c)
+
+    def merge(self, other):
+        """Adds the moments accumulated by `other` (e.g. from another
+        file of data for the same columns)."""
+        self._merge(other.n, other.mean, other.m2, other.c)
+
+    def correlation(self):
+        """Returns the (n_columns, n_columns) array of Pearson correlation
+        coefficients.  NaN where there are fewer than two rows or a
+        column is constant."""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            corr = self.c / np.sqrt(self.m2 * self.m2.T)
+        corr[self.n < 2] = np.NaN
+        return corr
+
+    def covariance(self):
+        """Returns the (n_columns, n_columns) array of sample covariances."""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            cov = self.c / (self.n - 1)
+        cov[self.n < 2] = np.NaN
+        return cov
+
+    def _merge(self, n_b, mean_b, m2_b, c_b):
+        n_a = self.n
+        n = n_a + n_b
+        with np.errstate(invalid='ignore', divide='ignore'):
+            weight = np.where(n > 0, n_a * n_b / n, 0.0)
+            delta = mean_b - self.mean
+            self.mean = np.where(n > 0, self.mean + delta * n_b / n, 0.0)
+        self.m2 = self.m2 + m2_b + delta ** 2 * weight
+        self.c = self.c + c_b + delta * delta.T * weight
+        self.n = n
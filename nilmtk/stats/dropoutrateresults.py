@@ -1,4 +1,3 @@
-import matplotlib.pyplot as plt
 from ..results import Results
 from ..consts import SECS_PER_DAY
 
@@ -39,6 +38,7 @@ class DropoutRateResults(Results):
         return {'statistics': {'dropout_rate': self.combined()}}
 
     def plot(self, ax=None):
+        import matplotlib.pyplot as plt
         if ax is None:
             ax = plt.gca()
         ax.xaxis.axis_date()
@@ -1,7 +1,6 @@
 from __future__ import print_function, division
 import pandas as pd
 from datetime import timedelta
-import matplotlib.pyplot as plt
 from ..results import Results
 from nilmtk.timeframe import TimeFrame, convert_none_to_nat, convert_nat_to_none
 from nilmtk.utils import get_tz, tz_localize_naive
@@ -32,13 +31,16 @@ class GoodSectionsResults(Results):
         timeframe : nilmtk.TimeFrame
         new_results : {'sections': list of TimeFrame objects}
         """
-        new_results['sections'] = [TimeFrameGroup(new_results['sections'][0])]
+        new_results['sections'] = TimeFrameGroup(new_results['sections'][0])
         super(GoodSectionsResults, self).append(timeframe, new_results)
 
     def combined(self):
         """Merges together any good sections which span multiple segments,
         as long as those segments are adjacent 
         (previous.end - max_sample_period <= next.start <= previous.end).
+        Sections in adjacent segments which touch (because the segments
+        share a sample, as the segments cached by `ElecMeter.append` do)
+        are also merged.
 
         Returns
         -------
@@ -62,6 +64,10 @@ class GoodSectionsResults(Results):
                     assert sections[-1].end is None
                     sections[-1].end = row_sections[0].end
                     row_sections.pop(0)
+                elif (rows_are_adjacent and sections and row_sections and
+                      sections[-1].end == row_sections[0].start):
+                    sections[-1].end = row_sections[0].end
+                    row_sections.pop(0)
                 else:
                     # row_sections[0] and sections[-1] were not in adjacent chunks
                     # so check if they are both open-ended and close them...
@@ -105,6 +111,7 @@ class GoodSectionsResults(Results):
         
     def import_from_cache(self, cached_stat, sections):
         # we (deliberately) use duplicate indices to cache GoodSectionResults
+        sections = set(sections)
         grouped_by_index = cached_stat.groupby(level=0)
         tz = get_tz(cached_stat)
         for tf_start, df_grouped_by_index in grouped_by_index:
@@ -0,0 +1,54 @@
+from __future__ import print_function, division
+import numpy as np
+import pandas as pd
+from .powerdistributionresults import PowerDistributionResults
+from ..node import Node
+
+
+class PowerDistribution(Node):
+    """Builds a sparse histogram of the power in each chunk (see
+    `PowerDistributionResults`).  If a chunk has more than one column
+    then the columns are summed (as `Electric.load_series` does)."""
+
+    postconditions = {'statistics': {'power_distribution': {}}}
+    results_class = PowerDistributionResults
+
+    def process(self):
+        bin_width = self.results.bin_width
+        for chunk in self.upstream.process():
+            self.results.append(chunk.timeframe,
+                                get_power_distribution(chunk, bin_width))
+            yield chunk
+
+
+def get_power_distribution(data, bin_width):
+    """
+    Parameters
+    ----------
+    data : pd.DataFrame or pd.Series
+    bin_width : number, watts
+
+    Returns
+    -------
+    dict with keys 'histogram', 'min' and 'max'
+        (see `PowerDistributionResults`).
+    """
+    if isinstance(data, pd.DataFrame):
+        if data.empty:
+            data = pd.Series()
+        elif len(data.columns) == 1:
+            data = data.iloc[:, 0]
+        else:
+            data = data.sum(axis=1)
+    values = data.dropna().values
+    if len(values) == 0:
+        return {'histogram': pd.Series(dtype=np.int64),
+                'min': np.NaN, 'max': np.NaN}
+
+    # Sort the bin of each sample so we can count runs of equal bins.
+    bins = np.sort(np.floor(values / bin_width))
+    run_starts = np.flatnonzero(
+        np.concatenate([[True], bins[1:] != bins[:-1]]))
+    counts = np.diff(np.append(run_starts, len(bins)))
+    histogram = pd.Series(counts, index=bins[run_starts] * bin_width)
+    return {'histogram': histogram, 'min': values.min(), 'max': values.max()}
@@ -0,0 +1,193 @@
+from __future__ import print_function, division
+import numpy as np
+import pandas as pd
+from ..results import Results
+from nilmtk.timeframe import TimeFrame
+from nilmtk.utils import get_tz, tz_localize_naive
+
+# Width of each histogram bin in watts
+DEFAULT_BIN_WIDTH = 1
+
+
+class PowerDistributionResults(Results):
+    """The distribution of power values, stored as a sparse histogram.
+
+    Each sample is counted in the bin [k * bin_width, (k+1) * bin_width)
+    which contains it.  Only non-empty bins are stored.  Histograms from
+    different chunks (or meters) are merged by adding the counts in each
+    bin, so quantiles (accurate to within `bin_width`) and histograms
+    (with any bins which are multiples of `bin_width`) can be found for
+    any combination of chunks without re-loading the data.
+
+    Attributes
+    ----------
+    bin_width : number, watts
+    _data : pd.DataFrame
+        index is start date for the whole chunk
+        `end` is end date for the whole chunk
+        `histogram` is a pd.Series of the number of samples in each
+            non-empty bin, indexed by the left edge of each bin
+        `min` and `max` are the exact minimum and maximum power
+    """
+
+    name = "power_distribution"
+
+    def __init__(self, bin_width=DEFAULT_BIN_WIDTH):
+        self.bin_width = bin_width
+        super(PowerDistributionResults, self).__init__()
+
+    def combined(self):
+        """Merges the histograms from every chunk.
+
+        Returns
+        -------
+        pd.Series of the number of samples in each non-empty bin,
+        indexed by the left edge of each bin (sorted).
+        """
+        if 'histogram' not in self._data.columns:
+            return pd.Series(dtype=np.int64)
+        histograms = [histogram for histogram in self._data['histogram']
+                      if len(histogram)]
+        if not histograms:
+            return pd.Series(dtype=np.int64)
+        return pd.concat(histograms).groupby(level=0).sum()
+
+    def minimum(self):
+        return self._data['min'].min() if 'min' in self._data.columns else np.NaN
+
+    def maximum(self):
+        return self._data['max'].max() if 'max' in self._data.columns else np.NaN
+
+    def quantile(self, q):
+        """Estimates quantiles by interpolating within the bin which
+        contains each quantile.
+
+        Parameters
+        ----------
+        q : float or list of floats in the range [0, 1]
+            e.g. 0.01 for the 1st percentile.
+
+        Returns
+        -------
+        float if `q` is a float, else a pd.Series indexed by `q`.
+        NaN if there are no samples.
+        """
+        quantiles = np.atleast_1d(q).astype(np.float64)
+        if ((quantiles < 0) | (quantiles > 1)).any():
+            raise ValueError("quantiles must be in the range [0, 1]")
+        histogram = self.combined()
+        if histogram.empty:
+            values = np.empty(len(quantiles))
+            values.fill(np.NaN)
+        else:
+            counts = histogram.values
+            cumulative = counts.cumsum()
+            targets = quantiles * cumulative[-1]
+            i = cumulative.searchsorted(targets, side='left')
+            i = i.clip(0, len(counts) - 1)
+            n_before = np.where(i > 0, cumulative[i - 1], 0)
+            fraction = (targets - n_before) / counts[i]
+            values = histogram.index.values[i] + fraction * self.bin_width
+            values = values.clip(self.minimum(), self.maximum())
+        if np.isscalar(q):
+            return values[0]
+        return pd.Series(values, index=quantiles)
+
+    def histogram(self, bins=None, range=None, **kwargs):
+        """Returns the same objects as `np.histogram` (and takes the
+        same arguments as `nilmtk.stats.histogram.histogram_from_generator`)
+        but uses the merged sparse histogram instead of the raw data.
+        Counts are exact if the bin edges are multiples of `bin_width`.
+
+        Parameters
+        ----------
+        bins : None or int or sequence
+            if None then uses int(range[1]-range[0])
+        range : None or (min, max)
+            Either element can be None, in which case the minimum or
+            maximum power is used.
+        """
+        histogram = self.combined()
+        lower, upper = (None, None) if range is None else range
+        if lower is None:
+            lower = self.minimum()
+        if upper is None:
+            upper = self.maximum()
+        if bins is None:
+            bins = max(int(upper - lower), 1)
+        hist, bin_edges = np.histogram(histogram.index.values, bins=bins,
+                                       range=(lower, upper),
+                                       weights=histogram.values, **kwargs)
+        if not ('density' in kwargs or 'normed' in kwargs):
+            hist = hist.astype(np.int64)
+        return hist, bin_edges
+
+    def unify(self, other):
+        """Pools the samples from `other` (from another meter, for the
+        same timeframes).  Note that this is the distribution of the
+        samples from both meters, not the distribution of their sum."""
+        super(PowerDistributionResults, self).unify(other)
+        other_data = other._data
+        histograms = np.empty(len(self._data), dtype=object)
+        for i, (start, histogram) in enumerate(
+                self._data['histogram'].iteritems()):
+            histograms[i] = histogram.add(other_data['histogram'].loc[start],
+                                          fill_value=0)
+        self._data['histogram'] = histograms
+        self._data['min'] = np.fmin(self._data['min'],
+                                    other_data['min'].loc[self._data.index])
+        self._data['max'] = np.fmax(self._data['max'],
+                                    other_data['max'].loc[self._data.index])
+
+    def to_dict(self):
+        quantiles = self.quantile([0.01, 0.5, 0.99])
+        return {'statistics': {'power_distribution': {
+            'p1': quantiles.iloc[0], 'p50': quantiles.iloc[1],
+            'p99': quantiles.iloc[2]}}}
+
+    def import_from_cache(self, cached_stat, sections):
+        # we (deliberately) use duplicate indices to cache
+        # PowerDistributionResults: one row per non-empty bin.
+        sections = set(sections)
+        grouped_by_index = cached_stat.groupby(level=0)
+        tz = get_tz(cached_stat)
+        for tf_start, df_grouped_by_index in grouped_by_index:
+            grouped_by_end = df_grouped_by_index.groupby('end')
+            for tf_end, bins_df in grouped_by_end:
+                end = tz_localize_naive(tf_end, tz)
+                timeframe = TimeFrame(tf_start, end)
+                if timeframe in sections:
+                    non_empty = bins_df[bins_df['count'] > 0]
+                    histogram = pd.Series(
+                        non_empty['count'].values.astype(np.int64),
+                        index=non_empty['bin'].values)
+                    self.append(timeframe, {'histogram': histogram,
+                                            'min': bins_df['min'].iloc[0],
+                                            'max': bins_df['max'].iloc[0]})
+
+    def export_to_cache(self):
+        """
+        Returns
+        -------
+        DataFrame with columns 'end', 'bin', 'count', 'min' and 'max'.
+            Instead of storing a Series on each row, we store one bin
+            per row (and a row with a count of zero for chunks with no
+            samples).  This is because pd.HDFStore cannot save a
+            DataFrame with a column of Series if using 'table' format.
+        """
+        frames = []
+        for i in range(len(self._data)):
+            row = self._data.iloc[i]
+            histogram = row['histogram']
+            if len(histogram):
+                bins, counts = histogram.index.values, histogram.values
+            else:
+                bins, counts = [np.NaN], [0]
+            frames.append(pd.DataFrame(
+                {'end': row['end'], 'bin': bins, 'count': counts,
+                 'min': row['min'], 'max': row['max']},
+                index=[self._data.index[i]] * len(counts),
+                columns=['end', 'bin', 'count', 'min', 'max']))
+        if not frames:
+            return pd.DataFrame(columns=['end', 'bin', 'count', 'min', 'max'])
+        return pd.concat(frames).convert_objects()
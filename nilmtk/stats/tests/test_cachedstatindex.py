@@ -0,0 +1,43 @@
+#!/usr/bin/python
+from __future__ import print_function, division
+import unittest
+import pandas as pd
+from ..cachedstatindex import CachedStatIndex
+from ..totalenergyresults import TotalEnergyResults
+from ... import TimeFrame
+
+class TestCachedStatIndex(unittest.TestCase):
+
+    def setUp(self):
+        results = TotalEnergyResults()
+        self.timeframes = [
+            TimeFrame('2012-01-01', '2012-01-02', tz='Europe/London'),
+            TimeFrame('2012-01-02', '2012-01-03', tz='Europe/London'),
+            TimeFrame('2012-01-03', '2012-01-04', tz='Europe/London')]
+        for i, timeframe in enumerate(self.timeframes):
+            results.append(timeframe, {'active': i})
+        self.cached_stat = results.export_to_cache()
+
+    def test_rows_for_sections(self):
+        index = CachedStatIndex(self.cached_stat)
+        self.assertEqual(len(index), 3)
+        rows = index.rows_for_sections(self.timeframes[1:])
+        self.assertEqual(list(rows['active']), [1, 2])
+        self.assertTrue(index.contains(self.timeframes[0]))
+
+        # Same start, different end
+        section = TimeFrame('2012-01-01', '2012-01-03', tz='Europe/London')
+        self.assertFalse(index.contains(section))
+        self.assertTrue(index.rows_for_sections([section]).empty)
+
+    def test_extend(self):
+        index = CachedStatIndex(pd.DataFrame())
+        self.assertFalse(index.contains(self.timeframes[0]))
+        index.extend(self.cached_stat.iloc[:2])
+        index.extend(self.cached_stat.iloc[2:])
+        self.assertEqual(len(index), 3)
+        for timeframe in self.timeframes:
+            self.assertTrue(index.contains(timeframe))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+#!/usr/bin/python
+from __future__ import print_function, division
+import unittest
+import numpy as np
+import pandas as pd
+from ..comoments import CoMoments
+
+
+class TestCoMoments(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        x = rng.normal(1000, 50, size=1000)
+        values = np.column_stack([x, 2*x + rng.normal(0, 20, size=1000),
+                                  rng.normal(0, 1, size=1000)])
+        values[rng.uniform(size=values.shape) < 0.1] = np.NaN
+        self.df = pd.DataFrame(values)
+
+    def test_chunked_matches_pandas(self):
+        for chunksize in [1000, 97, 1]:
+            co_moments = CoMoments(3)
+            for start in range(0, len(self.df), chunksize):
+                co_moments.update(self.df.values[start:start+chunksize])
+            np.testing.assert_array_almost_equal(co_moments.correlation(),
+                                                 self.df.corr().values)
+            np.testing.assert_array_almost_equal(co_moments.covariance(),
+                                                 self.df.cov().values)
+
+    def test_merge(self):
+        first, second = CoMoments(3), CoMoments(3)
+        first.update(self.df.values[:300])
+        second.update(self.df.values[300:])
+        first.merge(second)
+        np.testing.assert_array_almost_equal(first.correlation(),
+                                             self.df.corr().values)
+
+    def test_too_few_rows(self):
+        co_moments = CoMoments(2)
+        co_moments.update([[1.0, 2.0]])
+        self.assertTrue(np.isnan(co_moments.correlation()[0, 1]))
+
+
+if __name__ == '__main__':
+    unittest.main()
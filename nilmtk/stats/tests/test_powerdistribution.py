@@ -0,0 +1,73 @@
+#!/usr/bin/python
+from __future__ import print_function, division
+import unittest
+from os.path import join
+import numpy as np
+import pandas as pd
+from ..powerdistribution import get_power_distribution
+from ..powerdistributionresults import PowerDistributionResults
+from ... import TimeFrame, ElecMeter, HDFDataStore
+from ...elecmeter import ElecMeterID
+from ...tests.testingtools import data_dir
+
+METER_ID = ElecMeterID(instance=1, building=1, dataset='REDD')
+
+
+class TestPowerDistribution(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        filename = join(data_dir(), 'energy.h5')
+        cls.datastore = HDFDataStore(filename)
+        ElecMeter.load_meter_devices(cls.datastore)
+        cls.meter_meta = cls.datastore.load_metadata('building1')['elec_meters'][METER_ID.instance]
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.datastore.close()
+
+    def test_merge_chunks(self):
+        rng = np.random.RandomState(42)
+        values = rng.uniform(0, 500, size=2000)
+        index = pd.date_range('2014-01-01', periods=len(values), freq='6S')
+        results = PowerDistributionResults()
+        for chunk_i in range(4):
+            chunk = pd.Series(values[chunk_i*500:(chunk_i+1)*500],
+                              index=index[chunk_i*500:(chunk_i+1)*500])
+            results.append(TimeFrame(chunk.index[0], chunk.index[-1]),
+                           get_power_distribution(chunk, results.bin_width))
+
+        self.assertEqual(results.combined().sum(), len(values))
+        self.assertEqual(results.quantile(0), values.min())
+        self.assertEqual(results.quantile(1), values.max())
+        for q in [0.01, 0.5, 0.99]:
+            self.assertLess(abs(results.quantile(q) - np.percentile(values, q*100)),
+                            results.bin_width * 2)
+        hist, bins = results.histogram(bins=50, range=(0, 500))
+        expected_hist, expected_bins = np.histogram(values, bins=50,
+                                                    range=(0, 500))
+        np.testing.assert_array_equal(hist, expected_hist)
+
+        # Round trip through the cache format
+        cached = PowerDistributionResults()
+        cached.import_from_cache(results.export_to_cache(),
+                                 results.timeframes())
+        np.testing.assert_array_equal(cached.combined().values,
+                                      results.combined().values)
+        self.assertEqual(cached.quantile(0.5), results.quantile(0.5))
+
+    def test_elecmeter(self):
+        meter = ElecMeter(store=self.datastore, metadata=self.meter_meta,
+                          meter_id=METER_ID)
+        meter.clear_cache()
+        power = meter.power_series_all_data()
+        self.assertEqual(meter.vampire_power(), power.min())
+        # Second time uses the cache
+        distribution = meter.power_distribution()
+        self.assertEqual(distribution.combined().sum(), power.count())
+        self.assertEqual(distribution.quantile(1), power.max())
+        meter.clear_cache()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,8 @@
 #!/usr/bin/python
 from __future__ import print_function, division
 import unittest
+from copy import copy
+import pandas as pd
 from ..totalenergyresults import TotalEnergyResults
 from ... import TimeFrame
 
@@ -14,6 +16,21 @@ class TestEnergyResults(unittest.TestCase):
         self.assertEqual(er._data.index[0], tf.start)
         self.assertEqual(er._data['end'][tf.start], tf.end)
     
+    def test_copy(self):
+        er = TotalEnergyResults()
+        tf = TimeFrame('2012-01-01','2012-01-02')
+        er_copy = copy(er)
+        er.append(tf, {'active':20})
+        self.assertTrue(er_copy._data.empty)
+        er_copy.append(tf, {'active':30})
+        self.assertEqual(er.combined()['active'], 20)
+        self.assertEqual(er_copy.combined()['active'], 30)
+        tf2 = TimeFrame('2012-01-02','2012-01-03')
+        er_copy2 = copy(er)
+        er_copy2.append(tf2, {'active':10})
+        self.assertEqual(er.timeframes(), [tf])
+        self.assertEqual(er_copy2.combined()['active'], 30)
+
     def test_combined(self):
         er = TotalEnergyResults()
         tf = TimeFrame('2012-01-01','2012-01-02')
@@ -48,5 +65,31 @@ class TestEnergyResults(unittest.TestCase):
         with self.assertRaises(ValueError):
             er.append(tf7, {'active':20})
 
+    def test_append_out_of_order_and_update(self):
+        er = TotalEnergyResults()
+        days = pd.date_range('2012-01-01', periods=11, freq='D')
+        for i in [5, 2, 8, 0, 3, 9, 1, 7, 4]:
+            er.append(TimeFrame(days[i], days[i+1]), {'active': i})
+        self.assertTrue(er._data.index.is_monotonic)
+        self.assertEqual(list(er._data['active']), [0, 1, 2, 3, 4, 5, 7, 8, 9])
+        self.assertEqual(er.combined()['active'], 39)
+
+        # Appending after the DataFrame has been built still checks overlap
+        with self.assertRaises(ValueError):
+            er.append(TimeFrame(days[7], days[9]), {'active': 20})
+        er.append(TimeFrame(days[6], days[7]), {'active': 6})
+        self.assertEqual(len(er._data), 10)
+
+        other = TotalEnergyResults()
+        other.append(TimeFrame('2012-01-11', '2012-01-12'), {'active': 10})
+        er.update(other)
+        self.assertEqual(er.combined()['active'], 55)
+
+        overlapping = TotalEnergyResults()
+        overlapping.append(TimeFrame('2012-01-11 12:00', '2012-01-13'),
+                           {'active': 1})
+        with self.assertRaises(ValueError):
+            er.update(overlapping)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,36 @@
+#!/usr/bin/python
+from __future__ import print_function, division
+import unittest
+from os.path import join
+from nilmtk.tests.testingtools import data_dir
+from nilmtk import DataSet, ElecMeter, MeterGroup
+
+
+class TestDataSet(unittest.TestCase):
+
+    def test_buildings_are_loaded_lazily(self):
+        filename = join(data_dir(), 'energy.h5')
+        ds = DataSet(filename)
+        self.assertEqual(ds.buildings.loaded(), [])
+        self.assertEqual(ds.buildings.keys(), [1])
+        self.assertEqual(ds.buildings.loaded(), [])
+        elec = ds.buildings[1].elec
+        self.assertIsInstance(elec, MeterGroup)
+        self.assertIsInstance(elec[1], ElecMeter)
+        self.assertEqual(ds.buildings.loaded(), [1])
+        self.assertIs(ds.buildings[1].elec, elec)
+        with self.assertRaises(KeyError):
+            ds.buildings[2]
+        ds.store.close()
+
+    def test_select_buildings(self):
+        filename = join(data_dir(), 'energy.h5')
+        ds = DataSet(filename, buildings=[1])
+        self.assertEqual(len(ds.buildings), 1)
+        self.assertEqual(ds.buildings[1].identifier.instance, 1)
+        self.assertEqual(len(ds.elecs()), 1)
+        ds.store.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,10 +2,19 @@
 from __future__ import print_function, division
 import unittest
 from os.path import join
+from tempfile import mkdtemp
+from shutil import rmtree, copytree
 import pandas as pd
+import numpy as np
 from datetime import timedelta
+from time import sleep
+import pickle
 from testingtools import data_dir
-from nilmtk.datastore import HDFDataStore, CSVDataStore
+from nilmtk.datastore import (HDFDataStore, CSVDataStore, ParquetDataStore,
+                              MmapDataStore)
+from nilmtk.datastore.datastore import convert_datastore
+from nilmtk.datastore.chunkcache import enable_chunk_cache, disable_chunk_cache
+from nilmtk.datastore.prefetch import ChunkPrefetcher
 from nilmtk import TimeFrame
 
 # class name can't begin with test
@@ -40,6 +49,26 @@ class SuperTestDataStore(object):
         self.assertEqual(df.look_ahead.index[0], timeframe.end)
         self.assertEqual(len(df.look_ahead), 10)
 
+    def test_load_many_chunksize(self):
+        self.datastore.window.clear()
+        keys = self.keys[:2]
+        cols = [('power', 'active')]
+        timeframe = TimeFrame('2012-01-01 00:00:00', '2012-01-01 00:01:00')
+        batches = list(self.datastore.load_many(keys, cols=cols,
+                                                sections=[timeframe],
+                                                chunksize=25))
+        self.assertEqual(len(batches), 3)
+        for batch in batches:
+            self.assertEqual(list(batch.keys()), keys)
+            for chunk in batch.values():
+                self.assertLessEqual(len(chunk), 25)
+        for key in keys:
+            loaded = pd.concat([batch[key] for batch in batches])
+            self.assertEqual(len(loaded), 60)
+            self.assertEqual(loaded.index[0], timeframe.start)
+            self.assertEqual(loaded.index[-1],
+                             timeframe.end - timedelta(seconds=1))
+
     def test_load_chunks(self):
         self.datastore.window.clear()
         chunks = self.datastore.load(key=self.keys[0])
@@ -89,12 +118,69 @@ class SuperTestDataStore(object):
                             chunk.index[-1] <= 
                             chunk.timeframe.end)        
 
+    def test_load_prefetch(self):
+        self.datastore.window.clear()
+        timeframes = [TimeFrame('2012-01-01 00:00:00', '2012-01-01 00:01:00'),
+                      TimeFrame('2012-01-01 00:10:00', '2012-01-01 00:11:00')]
+        kwargs = dict(key=self.keys[0], sections=timeframes, chunksize=20,
+                      n_look_ahead_rows=5)
+        expected_chunks = list(self.datastore.load(**kwargs))
+        self.datastore.io_wait_time = 0.0
+        chunks = list(self.datastore.load(prefetch=2, **kwargs))
+        self.assertEqual(len(chunks), len(expected_chunks))
+        for chunk, expected in zip(chunks, expected_chunks):
+            self.assertTrue(chunk.equals(expected))
+            self.assertEqual(chunk.timeframe, expected.timeframe)
+            self.assertTrue(chunk.look_ahead.equals(expected.look_ahead))
+
+    def test_load_prefetch_raises(self):
+        key = '/building99/elec/meter1'
+        with self.assertRaises(Exception) as plain:
+            list(self.datastore.load(key=key))
+        # The prefetch thread's exception reaches the consumer unchanged.
+        with self.assertRaises(type(plain.exception)):
+            list(self.datastore.load(key=key, prefetch=2))
+
     #--------- helper functions ---------------------#
 
     def _apply_mask(self):
         self.datastore.window = TimeFrame('2012-01-01 00:10:00',
                                         '2012-01-01 00:20:00')
 
+    def test_chunk_cache(self):
+        self.datastore.window.clear()
+        chunk_cache = enable_chunk_cache()
+        try:
+            key = self.keys[0]
+            expected = list(self.datastore.load(key=key, chunksize=3000))
+            self.assertEqual((chunk_cache.hits, chunk_cache.misses), (0, 1))
+            chunks = list(self.datastore.load(key=key, chunksize=3000))
+            self.assertEqual((chunk_cache.hits, chunk_cache.misses), (1, 1))
+            self.assertEqual(len(chunks), len(expected))
+            for chunk, expected_chunk in zip(chunks, expected):
+                self.assertTrue(chunk.equals(expected_chunk))
+                self.assertEqual(chunk.timeframe, expected_chunk.timeframe)
+
+            # Modifying a chunk must not modify the cache
+            chunks[0].iloc[0, 0] = -1
+            chunk = next(self.datastore.load(key=key, chunksize=3000))
+            self.assertEqual(chunk.iloc[0, 0], expected[0].iloc[0, 0])
+
+            self.datastore._on_key_modified('/building1')
+            self.assertEqual(len(chunk_cache), 0)
+            self.assertEqual(chunk_cache.n_bytes, 0)
+
+            # Least recently used entry is evicted first
+            for key in self.keys[:2]:
+                list(self.datastore.load(key=key))
+            enable_chunk_cache(max_bytes=chunk_cache.n_bytes - 1)
+            self.assertEqual(chunk_cache.evictions, 1)
+            list(self.datastore.load(key=self.keys[1]))
+            self.assertEqual(chunk_cache.hits, 3)
+        finally:
+            disable_chunk_cache()
+
+
 class TestHDFDataStore(unittest.TestCase, SuperTestDataStore):
 
     @classmethod
@@ -121,6 +207,168 @@ class TestHDFDataStore(unittest.TestCase, SuperTestDataStore):
             self.datastore.window.enabled = False
             self.assertEqual(self.datastore._nrows(key), self.NROWS)
 
+    def test_one_select_per_chunk(self):
+        # Benchmark: count the number of PyTables selects per chunk.
+        self.datastore.window.clear()
+        store = self.datastore.store
+        select = store.select
+        n_selects = [0]
+        def counting_select(*args, **kwargs):
+            n_selects[0] += 1
+            return select(*args, **kwargs)
+        store.select = counting_select
+        try:
+            timeframes = [
+                TimeFrame('2012-01-01 00:00:00', '2012-01-01 00:01:00'),
+                TimeFrame('2012-01-01 00:10:00', '2012-01-01 00:11:00')]
+            chunks = list(self.datastore.load(key=self.keys[0],
+                                              sections=timeframes,
+                                              chunksize=20,
+                                              n_look_ahead_rows=10))
+        finally:
+            del store.select
+        self.assertEqual(len(chunks), 6)
+        self.assertEqual(n_selects[0] / len(chunks), 1)
+        # Each 60 row section is split into 3 chunks.  Every chunk but
+        # the last in each section also includes the first row of the
+        # next chunk.
+        self.assertEqual([len(chunk) for chunk in chunks],
+                         [21, 21, 20, 21, 21, 20])
+        one_sec = timedelta(seconds=1)
+        for chunk in chunks:
+            self.assertEqual(len(chunk.look_ahead), 10)
+            self.assertEqual(chunk.look_ahead.index[0],
+                             chunk.index[-1] + one_sec)
+
+    def test_prefetch_serialises_reads(self):
+        # HDF5 is not thread-safe so two prefetching generators used
+        # together must never read at the same time.
+        self.datastore.window.clear()
+        keys = self.keys[:2]
+        expected = [list(self.datastore.load(key=key, chunksize=500))
+                    for key in keys]
+        store = self.datastore.store
+        select = store.select
+        in_flight = [0]
+        max_in_flight = [0]
+        def tracking_select(*args, **kwargs):
+            in_flight[0] += 1
+            max_in_flight[0] = max(max_in_flight[0], in_flight[0])
+            try:
+                sleep(0.001)
+                return select(*args, **kwargs)
+            finally:
+                in_flight[0] -= 1
+        store.select = tracking_select
+        try:
+            generators = [self.datastore.load(key=key, chunksize=500,
+                                              prefetch=2)
+                          for key in keys]
+            chunks = list(zip(*generators))
+        finally:
+            del store.select
+        self.assertEqual(max_in_flight[0], 1)
+        for i in range(len(keys)):
+            loaded = [pair[i] for pair in chunks]
+            self.assertEqual(len(loaded), len(expected[i]))
+            for chunk, expected_chunk in zip(loaded, expected[i]):
+                self.assertTrue(chunk.equals(expected_chunk))
+
+    def test_row_range(self):
+        self.datastore.window.clear()
+        key = self.keys[0]
+        timeframes = [TimeFrame('2012-01-01 00:00:00', '2012-01-01 00:00:05'),
+                      TimeFrame('2012-01-01 00:10:00', '2012-01-01 00:20:00'),
+                      TimeFrame('2011-01-01', '2012-01-01 00:00:01'),
+                      TimeFrame('2012-01-01 02:46:39', '2013-01-01'),
+                      TimeFrame('2013-01-01', '2014-01-01')]
+        expected = [(0, 5), (600, 1200), (0, 1), (9999, 10000), 
+                    (10000, 10000)]
+        sparse_index_step = self.datastore.sparse_index_step
+        try:
+            for step in [None, 7, 1024, 10**6]:
+                self.datastore.sparse_index_step = step
+                self.datastore._sparse_indexes.clear()
+                for timeframe, rows in zip(timeframes, expected):
+                    self.assertEqual(
+                        self.datastore._row_range(key, timeframe), rows)
+        finally:
+            self.datastore.sparse_index_step = sparse_index_step
+
+    def test_load_many(self):
+        self.datastore.window.clear()
+        sections = [TimeFrame('2012-01-01 00:00:00', '2012-01-01 00:01:00'),
+                    TimeFrame('2012-01-01 00:10:00', '2012-01-01 00:10:30')]
+        cols = [('power', 'active')]
+        batches = list(self.datastore.load_many(self.keys, cols=cols,
+                                                sections=sections,
+                                                chunksize=20))
+        self.assertEqual(len(batches), 5)
+        for batch in batches:
+            self.assertEqual(batch.keys(), self.keys)
+            timeframes = set([chunk.timeframe for chunk in batch.values()])
+            self.assertEqual(len(timeframes), 1)
+        for key in self.keys:
+            expected = pd.concat(list(self.datastore.load(
+                key=key, cols=cols, sections=sections)))
+            loaded = pd.concat([batch[key] for batch in batches])
+            self.assertTrue(loaded.equals(expected))
+
+    def test_write_session(self):
+        self.datastore.window.clear()
+        key = self.keys[0]
+        # `load` yields overlapping chunks so slice the data instead.
+        df = self.datastore[key]
+        chunks = [df.iloc[i:i+2500] for i in range(0, len(df), 2500)]
+        tmp_dir = mkdtemp()
+        output = HDFDataStore(join(tmp_dir, 'output.h5'), 'w')
+        try:
+            with output.write_session(dtype=np.float32, complib='zlib',
+                                      complevel=1) as session:
+                for chunk in chunks:
+                    session.append(key, chunk)
+                self.assertFalse(output.store.get_storer(key).is_indexed)
+            self.assertTrue(session.closed)
+            self.assertTrue(output.store.get_storer(key).is_indexed)
+            self.assertEqual(session.stats.loc[key, 'n_rows'], self.NROWS)
+            # n_bytes is the in-memory size of the (downcast) data.
+            self.assertEqual(
+                session.stats.loc[key, 'n_bytes'],
+                sum([chunk.astype(np.float32).values.nbytes +
+                     chunk.index.asi8.nbytes for chunk in chunks]))
+            loaded = output[key]
+            self.assertTrue((loaded.dtypes == np.float32).all())
+            self.assertEqual(len(loaded), self.NROWS)
+        finally:
+            output.close()
+            rmtree(tmp_dir)
+
+    def test_write_session_invalidates_chunk_cache(self):
+        key = self.keys[0]
+        df = self.datastore[key]
+        tmp_dir = mkdtemp()
+        output = HDFDataStore(join(tmp_dir, 'output.h5'), 'w')
+        chunk_cache = enable_chunk_cache()
+        try:
+            output.put(key, df.iloc[:100])
+            self.assertEqual(
+                [len(chunk) for chunk in output.load(key=key)], [100])
+            self.assertEqual(len(chunk_cache), 1)
+            with output.write_session() as session:
+                session.put(key, df.iloc[:200])
+            self.assertEqual(len(chunk_cache), 0)
+            self.assertEqual(
+                [len(chunk) for chunk in output.load(key=key)], [200])
+            with output.write_session() as session:
+                session.append(key, df.iloc[200:300])
+            self.assertEqual(len(chunk_cache), 0)
+            self.assertEqual(
+                [len(chunk) for chunk in output.load(key=key)], [300])
+        finally:
+            disable_chunk_cache()
+            output.close()
+            rmtree(tmp_dir)
+
     def test_estimate_memory_requirement(self):
         self._apply_mask()
         for key in self.keys:
@@ -142,6 +390,255 @@ class TestCSVDataStore(unittest.TestCase, SuperTestDataStore):
     @classmethod
     def tearDownClass(cls):
         cls.datastore.close()
+
+
+class TestIndexedCSVDataStore(unittest.TestCase, SuperTestDataStore):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.dirname = join(mkdtemp(), 'random_csv')
+        copytree(join(data_dir(), 'random_csv'), cls.dirname)
+        cls.datastore = CSVDataStore(cls.dirname, index_step=100)
+        cls.keys = ['/building1/elec/meter{:d}'.format(i) for i in range(1,6)]
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.datastore.close()
+        rmtree(cls.dirname)
+
+    def test_index(self):
+        key = self.keys[0]
+        file_path = self.datastore._key_to_abs_path(key)
+        index = self.datastore._get_index(file_path)
+        self.assertEqual(index.n_rows, self.NROWS)
+        self.assertEqual(len(index.offsets), self.NROWS / 100)
+        # Check each offset points at the start of the correct row.
+        with open(file_path, 'rb') as fh:
+            fh.seek(index.offsets[1])
+            line = fh.readline()
+        self.assertTrue(line.startswith(b'2012-01-01 00:01:40'))
+
+    def test_append(self):
+        self.datastore.window.clear()
+        key = '/building2/elec/meter1'
+        df = next(self.datastore.load(key=self.keys[0]))
+        self.datastore.append(key, df.iloc[:5000])
+        self.datastore.append(key, df.iloc[5000:])
+        self.assertEqual(self.datastore.get_timeframe(key), self.TIMEFRAME)
+        chunks = list(self.datastore.load(key=key))
+        self.assertEqual(len(chunks), 1)
+        self.assertEqual(len(chunks[0]), self.NROWS)
+        self.datastore.remove('/building2')
+
+    def test_load_header_only(self):
+        self.datastore.window.clear()
+        key = '/building2/elec/meter1'
+        df = next(self.datastore.load(key=self.keys[0]))
+        self.datastore.put(key, df.iloc[:0])
+        try:
+            file_path = self.datastore._key_to_abs_path(key)
+            self.assertEqual(len(self.datastore._get_index(file_path).rows), 0)
+            self.assertEqual(list(self.datastore.load(key=key)), [])
+            timeframes = [TimeFrame('2012-01-01 00:00:00',
+                                    '2012-01-01 00:01:00')]
+            self.assertEqual(
+                list(self.datastore.load(key=key, sections=timeframes)), [])
+        finally:
+            self.datastore.remove('/building2')
+
+
+class TestParquetDataStore(unittest.TestCase, SuperTestDataStore):
+
+    @classmethod
+    def setUpClass(cls):
+        try:
+            import pyarrow
+        except ImportError:
+            raise unittest.SkipTest("pyarrow not installed")
+        cls.dirname = mkdtemp()
+        hdf_datastore = HDFDataStore(join(data_dir(), 'random.h5'))
+        cls.datastore = ParquetDataStore(cls.dirname, row_group_size=1000)
+        convert_datastore(hdf_datastore, cls.datastore)
+        hdf_datastore.close()
+        cls.keys = ['/building1/elec/meter{:d}'.format(i) for i in range(1,6)]
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.datastore.close()
+        rmtree(cls.dirname)
+
+    def test_metadata(self):
+        hdf_datastore = HDFDataStore(join(data_dir(), 'random.h5'))
+        self.assertEqual(self.datastore.load_metadata('/building1'),
+                         hdf_datastore.load_metadata('/building1'))
+        hdf_datastore.close()
+        self.assertEqual(self.datastore.elements_below_key('/'),
+                         ['building1'])
+
+    def test_row_group_pruning(self):
+        self.datastore.window.clear()
+        read_row_group = self.datastore._read_row_group
+        row_groups_read = []
+        def counting_read_row_group(row_group, cols=None):
+            row_groups_read.append(row_group.i)
+            return read_row_group(row_group, cols)
+        self.datastore._read_row_group = counting_read_row_group
+        try:
+            timeframe = TimeFrame('2012-01-01 00:20:00', '2012-01-01 00:20:05')
+            chunks = list(self.datastore.load(key=self.keys[0],
+                                              sections=[timeframe],
+                                              n_look_ahead_rows=10))
+        finally:
+            del self.datastore._read_row_group
+        self.assertEqual(len(chunks), 1)
+        self.assertEqual(len(chunks[0]), 5)
+        self.assertEqual(len(chunks[0].look_ahead), 10)
+        # 10,000 rows in row groups of 1,000 rows: only row group 1
+        # (rows 1000-1999) covers 00:20:00.
+        self.assertEqual(row_groups_read, [1])
+
+    def test_append(self):
+        key = '/building1/elec/meter1'
+        df = self.datastore[key]
+        self.datastore.put('/building2/elec/meter1', df.iloc[:5000])
+        self.datastore.append('/building2/elec/meter1', df.iloc[5000:])
+        self.assertEqual(self.datastore.get_timeframe('/building2/elec/meter1'),
+                         self.TIMEFRAME)
+        self.assertTrue((self.datastore['/building2/elec/meter1'] == df)
+                        .all().all())
+        self.datastore.remove('/building2')
+
+
+
+class TestMmapDataStore(unittest.TestCase, SuperTestDataStore):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.dirname = mkdtemp()
+        hdf_datastore = HDFDataStore(join(data_dir(), 'random.h5'))
+        cls.datastore = MmapDataStore(cls.dirname)
+        convert_datastore(hdf_datastore, cls.datastore)
+        hdf_datastore.close()
+        cls.keys = ['/building1/elec/meter{:d}'.format(i) for i in range(1,6)]
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.datastore.close()
+        rmtree(cls.dirname)
+
+    def test_load_is_zero_copy(self):
+        self.datastore.window.clear()
+        index, values, header = self.datastore._mmap(self.keys[0])
+        chunk = next(self.datastore.load(key=self.keys[0]))
+        self.assertTrue(np.may_share_memory(chunk.values, values))
+
+    def test_modifying_chunk_does_not_modify_disk(self):
+        self.datastore.window.clear()
+        chunk = next(self.datastore.load(key=self.keys[0]))
+        original = chunk.iloc[0, 0]
+        chunk.iloc[0, 0] = -1
+        self.datastore._arrays.clear()
+        chunk = next(self.datastore.load(key=self.keys[0]))
+        self.assertEqual(chunk.iloc[0, 0], original)
+
+    def test_append(self):
+        df = self.datastore[self.keys[0]]
+        self.datastore.put('/building2/elec/meter1', df.iloc[:5000])
+        self.datastore.append('/building2/elec/meter1', df.iloc[5000:])
+        self.assertEqual(self.datastore.get_timeframe('/building2/elec/meter1'),
+                         self.TIMEFRAME)
+        self.assertTrue((self.datastore['/building2/elec/meter1'] == df)
+                        .all().all())
+        self.datastore.remove('/building2')
+
+    def test_convert_datastore_in_parallel_and_resume(self):
+        dirname = mkdtemp()
+        hdf_datastore = HDFDataStore(join(data_dir(), 'random.h5'))
+        try:
+            datastore = MmapDataStore(dirname)
+            stats = convert_datastore(hdf_datastore, datastore, n_jobs=2,
+                                      max_chunks_in_flight=2, verbose=False)
+            self.assertEqual(list(stats.index), self.keys)
+            self.assertTrue((stats['n_rows'] == self.NROWS).all())
+            for key in self.keys:
+                self.assertTrue(
+                    datastore[key].equals(self.datastore[key]))
+
+            # Nothing to do
+            stats = convert_datastore(hdf_datastore, datastore, resume=True,
+                                      verbose=False)
+            self.assertEqual(len(stats), 0)
+
+            # Partially converted meter is converted again
+            datastore.put(self.keys[0], self.datastore[self.keys[0]].iloc[:10])
+            stats = convert_datastore(hdf_datastore, datastore, resume=True,
+                                      verbose=False)
+            self.assertEqual(list(stats.index), self.keys[:1])
+            self.assertTrue(
+                datastore[self.keys[0]].equals(self.datastore[self.keys[0]]))
+
+            # Meter with a gap in the middle has the same timeframe but
+            # is converted again
+            df = self.datastore[self.keys[1]]
+            datastore.put(self.keys[1], df.drop(df.index[10:20]))
+            self.assertEqual(datastore.get_timeframe(self.keys[1]),
+                             self.datastore.get_timeframe(self.keys[1]))
+            stats = convert_datastore(hdf_datastore, datastore, resume=True,
+                                      verbose=False)
+            self.assertEqual(list(stats.index), self.keys[1:2])
+            self.assertTrue(datastore[self.keys[1]].equals(df))
+        finally:
+            hdf_datastore.close()
+            rmtree(dirname)
+
+    def test_read_only_copy_factory(self):
+        open_copy = pickle.loads(pickle.dumps(
+            self.datastore.read_only_copy_factory()))
+        copy = open_copy()
+        try:
+            self.assertIsInstance(copy, MmapDataStore)
+            self.assertEqual(copy.window, self.datastore.window)
+            for key in self.keys:
+                self.assertTrue(copy[key].equals(self.datastore[key]))
+        finally:
+            copy.close()
+
+
+class ProducerError(Exception):
+    pass
+
+
+class TestChunkPrefetcher(unittest.TestCase):
+
+    def test_chunks_then_error(self):
+        def generator():
+            for i in range(3):
+                yield pd.DataFrame({'a': [i]})
+            raise ProducerError('failed after 3 chunks')
+
+        prefetcher = ChunkPrefetcher(generator(), n_chunks=2)
+        for i in range(3):
+            self.assertEqual(next(prefetcher)['a'].iloc[0], i)
+        with self.assertRaises(ProducerError):
+            next(prefetcher)
+        self.assertEqual(prefetcher.n_chunks_yielded, 3)
+        with self.assertRaises(StopIteration):
+            next(prefetcher)
+
+    def test_wait_time(self):
+        DELAY = 0.05
+        def slow_generator():
+            for i in range(4):
+                sleep(DELAY)
+                yield pd.DataFrame({'a': [i]})
+
+        waits = []
+        prefetcher = ChunkPrefetcher(slow_generator(), on_wait=waits.append)
+        self.assertEqual(len(list(prefetcher)), 4)
+        # The consumer does no work so it waits for every chunk.
+        self.assertGreater(prefetcher.wait_time, DELAY * 4 * 0.5)
+        self.assertAlmostEqual(sum(waits), prefetcher.wait_time)
+
     
 if __name__ == '__main__':
     unittest.main()
@@ -2,11 +2,16 @@
 from __future__ import print_function, division
 import unittest
 from os.path import join
+from shutil import copyfile, rmtree
+from tempfile import mkdtemp
 import pandas as pd
+import numpy as np
 from datetime import timedelta
 from .testingtools import data_dir, WarningTestMixin
 from ..datastore import HDFDataStore
 from ..elecmeter import ElecMeter, ElecMeterID
+from ..stats import TotalEnergy
+from ..stats.totalenergyresults import TotalEnergyResults
 from ..stats.tests.test_totalenergy import check_energy_numbers
 
 METER_ID = ElecMeterID(instance=1, building=1, dataset='REDD')
@@ -51,7 +56,115 @@ class TestElecMeter(WarningTestMixin, unittest.TestCase):
         period_index = pd.period_range(start=meter.get_timeframe().start, 
                                        periods=5, freq='D')
         meter.total_energy(sections=period_index, full_results=True)
-        
+
+    def test_compute_stats(self):
+        meter = ElecMeter(store=self.datastore, metadata=self.meter_meta, 
+                          meter_id=METER_ID)
+        meter.clear_cache()
+        stats = meter.compute_stats()
+        self.assertEqual(list(stats.keys()),
+                         ['total_energy', 'good_sections', 'dropout_rate'])
+        check_energy_numbers(self, stats['total_energy'])
+
+        # Each stat method should now use the cache and agree
+        # with the single pass.
+        check_energy_numbers(self, meter.total_energy())
+        self.assertEqual(meter.good_sections(), stats['good_sections'])
+        self.assertEqual(meter.dropout_rate(ignore_gaps=False),
+                         stats['dropout_rate'])
+
+        # A second call only uses the cache
+        stats = meter.compute_stats([TotalEnergy], full_results=True)
+        self.assertIsInstance(stats['total_energy'], TotalEnergyResults)
+        meter.clear_cache()
+
+    def test_rollups(self):
+        meter = ElecMeter(store=self.datastore, metadata=self.meter_meta, 
+                          meter_id=METER_ID)
+        meter.clear_cache()
+        meter.build_rollups()
+        rollup = meter.get_rollup(60)
+        self.assertFalse(rollup.empty)
+        raw = meter.power_series_all_data()
+        self.assertEqual(rollup[raw.name + ('count',)].sum(), raw.count())
+
+        # Building again (with no new data) must not duplicate buckets
+        meter.build_rollups()
+        self.assertTrue(meter.get_rollup(60).index.equals(rollup.index))
+
+        for how in ['mean', 'max']:
+            kwargs = {'sample_period': 3600, 'resample_kwargs': {'how': how}}
+            from_rollups = pd.concat(list(meter.load(**kwargs)))
+            from_raw = pd.concat(list(meter.load(use_rollups=False, **kwargs)))
+            from_rollups, from_raw = from_rollups.align(from_raw)
+            np.testing.assert_array_almost_equal(
+                from_rollups.values, from_raw.values, decimal=3)
+        meter.clear_cache()
+
+    def test_rollup_availability_is_remembered(self):
+        meter = ElecMeter(store=self.datastore, metadata=self.meter_meta, 
+                          meter_id=METER_ID)
+        meter.clear_cache()
+        kwargs = {'sample_period': 3600}
+        self.assertIsNone(meter._load_from_rollups(kwargs))
+
+        # Without rollups, later loads do not touch the DataStore
+        n_queries = [0]
+        def counting(func):
+            def wrapper(*args, **kwargs):
+                n_queries[0] += 1
+                return func(*args, **kwargs)
+            return wrapper
+        meter.get_cached_stat = counting(meter.get_cached_stat)
+        self.datastore.get_timeframe = counting(self.datastore.get_timeframe)
+        try:
+            self.assertIsNone(meter._load_from_rollups(kwargs))
+            self.assertEqual(n_queries[0], 0)
+        finally:
+            del meter.get_cached_stat
+            del self.datastore.get_timeframe
+
+        # Building and clearing rollups invalidates the memo
+        meter.build_rollups()
+        self.assertIsNotNone(meter._load_from_rollups(kwargs))
+        meter.clear_cache()
+        self.assertIsNone(meter._load_from_rollups(kwargs))
+
+    def test_append(self):
+        dirname = mkdtemp()
+        filename = join(dirname, 'energy.h5')
+        copyfile(join(data_dir(), 'energy.h5'), filename)
+        datastore = HDFDataStore(filename)
+        try:
+            meter = ElecMeter(store=datastore, metadata=self.meter_meta, 
+                              meter_id=METER_ID)
+            data = datastore[meter.key]
+            split = len(data) // 2
+            datastore.put(meter.key, data.iloc[:split])
+            meter.clear_cache()
+            meter.total_energy()
+            meter.good_sections()
+            meter.dropout_rate()
+
+            meter.append(data.iloc[split:])
+            energy = meter.total_energy(full_results=True)
+            # One cached row for the old data and one for the new data
+            self.assertEqual(len(energy._data), 2)
+            good_sections = meter.good_sections()
+            dropout_rate = meter.dropout_rate()
+
+            # Compare against computing from scratch
+            meter.clear_cache()
+            np.testing.assert_array_almost_equal(
+                energy.simple().sort_index().values,
+                meter.total_energy().sort_index().values)
+            self.assertEqual(good_sections, meter.good_sections())
+            self.assertAlmostEqual(dropout_rate, meter.dropout_rate(),
+                                   places=3)
+        finally:
+            datastore.close()
+            rmtree(dirname)
+
     def test_upstream_meter(self):
         meter1 = ElecMeter(metadata={'site_meter': True}, meter_id=METER_ID)
         self.assertIsNone(meter1.upstream_meter())
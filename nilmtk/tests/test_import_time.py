@@ -0,0 +1,62 @@
+#!/usr/bin/python
+from __future__ import print_function, division
+import unittest
+import subprocess
+import sys
+import json
+from time import time
+
+# Seconds.  Generous, because `import nilmtk` still imports pandas, numpy
+# and PyTables; the point is to catch plotting and model libraries
+# creeping back into the import path.
+IMPORT_TIME_BUDGET = 10
+
+# Modules which `import nilmtk` must not import (unless pandas imports
+# them itself, e.g. some pandas versions import matplotlib if it is
+# installed).
+DEFERRED_MODULES = ['matplotlib', 'networkx', 'scipy', 'sklearn',
+                    'hmmlearn', 'IPython']
+
+SCRIPT = """
+import sys, json
+import {package}
+print(json.dumps([name for name in {modules}
+                  if name in sys.modules]))
+"""
+
+
+def import_in_subprocess(package):
+    """Imports `package` in a new Python process.
+
+    Returns
+    -------
+    (seconds, list of the DEFERRED_MODULES which were imported)
+    """
+    script = SCRIPT.format(package=package, modules=DEFERRED_MODULES)
+    t0 = time()
+    output = subprocess.check_output([sys.executable, '-c', script])
+    duration = time() - t0
+    return duration, json.loads(output.decode().strip().splitlines()[-1])
+
+
+class TestImportTime(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        duration, cls.imported_by_pandas = import_in_subprocess('pandas')
+
+    def assert_imports_quickly(self, package):
+        duration, imported = import_in_subprocess(package)
+        self.assertEqual(set(imported) - set(self.imported_by_pandas), set())
+        self.assertLess(duration, IMPORT_TIME_BUDGET,
+                        "`import {}` took {:.2f}s".format(package, duration))
+
+    def test_import_nilmtk(self):
+        self.assert_imports_quickly('nilmtk')
+
+    def test_import_disaggregate(self):
+        self.assert_imports_quickly('nilmtk.disaggregate')
+
+
+if __name__ == '__main__':
+    unittest.main()
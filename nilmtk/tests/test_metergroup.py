@@ -2,13 +2,30 @@
 from __future__ import print_function, division
 import unittest
 from os.path import join
+from shutil import rmtree
+from tempfile import mkdtemp
+from datetime import timedelta
+import numpy as np
+import pandas as pd
 from nilmtk.tests.testingtools import data_dir
 from nilmtk import (Appliance, MeterGroup, ElecMeter, HDFDataStore, 
                     global_meter_group, TimeFrame, DataSet)
 from nilmtk.utils import tree_root, nodes_adjacent_to_root
 from nilmtk.elecmeter import ElecMeterID
+from nilmtk.metergroup import (combine_chunks, combine_chunks_from_generators,
+                               first_chunk_from_each_meter, _RecordingStore,
+                               _make_writes)
 from nilmtk.building import BuildingID
 
+
+class _CountingHDFDataStore(HDFDataStore):
+    n_reads = 0
+
+    def __getitem__(self, key):
+        self.n_reads += 1
+        return super(_CountingHDFDataStore, self).__getitem__(key)
+
+
 class TestMeterGroup(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
@@ -65,6 +82,44 @@ class TestMeterGroup(unittest.TestCase):
         self.assertEqual(mg.meters_directly_downstream_of_mains().meters, [meter2])
         self.assertEqual(wiring_graph.nodes(), [meter2, meter3, meter1])
 
+        topology = mg.wiring_topology()
+        self.assertIs(mg.wiring_topology(), topology)
+        self.assertEqual(topology.levels(), [[meter1], [meter2], [meter3]])
+        self.assertEqual(topology.upstream_meter(meter3), meter2)
+        self.assertEqual(topology.downstream_meters(meter2), [meter3])
+        sums = mg.sum_of_submeters_per_meter(
+            {meter2.identifier: 10, meter3.identifier: 4})
+        self.assertEqual(sums[meter1.identifier], 10)
+        self.assertEqual(sums[meter2.identifier], 4)
+
+        # The topology is rebuilt when meters change
+        mg.meters.remove(meter3)
+        self.assertIsNot(mg.wiring_topology(), topology)
+        self.assertEqual(mg.submeters().meters, [meter2])
+
+    def test_wiring_submeter_of_mains(self):
+        # 'submeter_of: 0' means downstream of mains (as in REDD's metadata)
+        meter1 = ElecMeter(metadata={'site_meter': True},
+                           meter_id=ElecMeterID(1,1,'WIRING'))
+        meter2 = ElecMeter(metadata={'submeter_of': 0},
+                           meter_id=ElecMeterID(2,1,'WIRING'))
+        meter3 = ElecMeter(metadata={'submeter_of': 2},
+                           meter_id=ElecMeterID(3,1,'WIRING'))
+        mg = MeterGroup([meter1, meter2, meter3])
+        self.assertIs(mg.mains(), meter1)
+        self.assertEqual(mg.submeters().meters, [meter2, meter3])
+        topology = mg.wiring_topology()
+        self.assertIs(topology.upstream_meter(meter2), meter1)
+        self.assertEqual(topology.levels(), [[meter1], [meter2], [meter3]])
+        self.assertEqual(mg.meters_directly_downstream_of_mains().meters,
+                         [meter2])
+
+        # mains() and submeters() do not need any wiring metadata
+        meter4 = ElecMeter(metadata={}, meter_id=ElecMeterID(4,1,'WIRING'))
+        mg = MeterGroup([meter1, meter4])
+        self.assertIs(mg.mains(), meter1)
+        self.assertEqual(mg.submeters().meters, [meter4])
+
     def test_proportion_of_energy_submetered(self):
         meters = []
         for i in [1,2,3]:
@@ -121,6 +176,39 @@ class TestMeterGroup(unittest.TestCase):
         self.assertEqual(len(mg.meters), 2)
         """
 
+    def test_indexed_lookup(self):
+        meters = [ElecMeter(metadata={'site_meter': True},
+                            meter_id=ElecMeterID(1, 1, 'INDEXED'))]
+        for building in [1, 2]:
+            for i in range(2, 5):
+                meters.append(ElecMeter(meter_id=ElecMeterID(i, building,
+                                                             'INDEXED')))
+        mg = MeterGroup(meters[:4])
+        self.assertIs(mg[ElecMeterID(3, 1, 'INDEXED')], meters[2])
+        self.assertIs(mg[3], meters[2])
+        self.assertIs(mg[ElecMeterID(0, 1, 'INDEXED')], meters[0])
+        self.assertIn(meters[1], mg.meters)
+        self.assertNotIn(meters[4], mg.meters)
+
+        # Indexes are updated when meters are added and removed
+        mg.meters.extend(meters[4:])
+        self.assertIs(mg[ElecMeterID(2, 2, 'INDEXED')], meters[4])
+        self.assertEqual(mg.select(building=2).meters, meters[4:])
+        with self.assertRaises(Exception):
+            mg[3]  # two meters with instance 3
+        mg.meters.remove(meters[5])
+        self.assertIs(mg[3], meters[2])
+        self.assertNotIn(meters[5], mg.meters)
+        with self.assertRaises(KeyError):
+            mg[ElecMeterID(3, 2, 'INDEXED')]
+
+        # Nested MeterGroups
+        nested = MeterGroup([meters[5], meters[6]])
+        mg.meters.append(nested)
+        self.assertIs(mg[[meters[6].identifier, meters[5].identifier]], nested)
+        self.assertIs(mg[nested.identifier], nested)
+        self.assertEqual(mg.select(building=2).meters, [meters[4], nested])
+
     def test_full_results_with_no_sections_raises_runtime_error(self):
         mg = MeterGroup([ElecMeter(), ElecMeter()])
         with self.assertRaises(RuntimeError):
@@ -134,6 +222,56 @@ class TestMeterGroup(unittest.TestCase):
         ds.buildings[1].elec.clear_cache()
         ds.store.close()
 
+    def test_total_energy_n_jobs(self):
+        filename = join(data_dir(), 'random.h5')
+        ds = DataSet(filename)
+        elec = ds.buildings[1].elec
+        elec.clear_cache()
+        energy = elec.total_energy(n_jobs=2)
+        # Stats cached by the worker processes are written by this process
+        self.assertTrue(energy.equals(elec.total_energy()))
+        self.assertTrue(elec.energy_per_meter(n_jobs=2).equals(
+            elec.energy_per_meter()))
+        elec.clear_cache()
+        ds.store.close()
+
+    def test_recording_store_records_write_sessions(self):
+        recording_store = _RecordingStore(self.datastore)
+        key = '/building1/elec/meter1'
+        df = self.datastore[key]
+        with recording_store.write_session(dtype=np.float32,
+                                           complib='zlib') as session:
+            session.append('/building1/elec/cache/meter1/a', df)
+            session.put('/building1/elec/cache/meter1/b', df)
+        self.assertEqual([(operation, key) for operation, key, value in
+                          recording_store.writes],
+                         [('append', '/building1/elec/cache/meter1/a'),
+                          ('put', '/building1/elec/cache/meter1/b')])
+        for operation, key, value in recording_store.writes:
+            self.assertTrue((value.dtypes == np.float32).all())
+        with self.assertRaises(KeyError):
+            self.datastore['/building1/elec/cache/meter1/a']
+
+    def test_make_writes_skips_rows_already_cached(self):
+        dirname = mkdtemp()
+        store = _CountingHDFDataStore(join(dirname, 'cache.h5'), mode='w')
+        try:
+            key = '/building1/elec/cache/meter1/total_energy'
+            starts = pd.date_range('2014-01-01', periods=3, freq='H')
+            rows = pd.DataFrame({'active': [1.0, 2.0, 3.0],
+                                 'end': starts + timedelta(hours=1)},
+                                index=starts)
+            _make_writes([store], [(0, 'append', key, rows.iloc[:2])])
+            _make_writes([store], [(0, 'append', key, rows)])
+            # The cached statistic is only read once
+            self.assertEqual(store.n_reads, 1)
+            cached = store[key]
+            self.assertEqual(list(cached.index), list(starts))
+            self.assertEqual(list(cached['active']), [1.0, 2.0, 3.0])
+        finally:
+            store.close()
+            rmtree(dirname)
+
     def test_load(self):
         filename = join(data_dir(), 'energy.h5')
         ds = DataSet(filename)
@@ -147,6 +285,113 @@ class TestMeterGroup(unittest.TestCase):
         self.assertEqual(df.columns.levels, [['energy'], ['reactive']])
         df = elec.load(ac_type='active').next()
         self.assertEqual(df.columns.levels, [['power'], ['active']])
+
+    def test_combine_chunks_from_generators(self):
+        filename = join(data_dir(), 'energy.h5')
+        ds = DataSet(filename)
+        elec = ds.buildings[1].elec
+        df = elec.load().next()
+        kwargs = {'sections': [df.timeframe]}
+        combined = combine_chunks_from_generators(df.index, df.columns,
+                                                  elec.meters, kwargs)
+        expected = combine_chunks(
+            df.index, df.columns,
+            first_chunk_from_each_meter(elec.meters, kwargs))
+        self.assertTrue(combined.equals(expected))
+        self.assertEqual(combined.timeframe, expected.timeframe)
+
+    def test_load_n_workers(self):
+        filename = join(data_dir(), 'energy.h5')
+        ds = DataSet(filename)
+        elec = ds.buildings[1].elec
+        for kwargs in [{}, {'chunksize': 5}, {'ac_type': 'active'}]:
+            expected = list(elec.load(**kwargs))
+            loaded = list(elec.load(n_workers=3, **kwargs))
+            self.assertEqual(len(loaded), len(expected))
+            for df, expected_df in zip(loaded, expected):
+                self.assertTrue(df.equals(expected_df))
+                self.assertEqual(df.timeframe, expected_df.timeframe)
+
+    def test_load_stream(self):
+        filename = join(data_dir(), 'energy.h5')
+        ds = DataSet(filename)
+        elec = ds.buildings[1].elec
+        for kwargs in [{}, {'chunksize': 5}, {'ac_type': 'active'}]:
+            expected = list(elec.load(**kwargs))
+            loaded = list(elec.load(stream=True, **kwargs))
+            self.assertEqual(len(loaded), len(expected))
+            for df, expected_df in zip(loaded, expected):
+                self.assertTrue(df.equals(expected_df))
+                self.assertEqual(df.timeframe, expected_df.timeframe)
+        with self.assertRaises(ValueError):
+            elec.load(stream=True, n_workers=2).next()
+
+    def test_load_batched(self):
+        filename = join(data_dir(), 'energy.h5')
+        ds = DataSet(filename)
+        elec = ds.buildings[1].elec
+        for kwargs in [{}, {'chunksize': 5}, {'ac_type': 'active'}]:
+            expected = list(elec.load(**kwargs))
+            loaded = list(elec.load(batched=True, **kwargs))
+            self.assertEqual(len(loaded), len(expected))
+            for df, expected_df in zip(loaded, expected):
+                self.assertTrue(df.equals(expected_df))
+                self.assertEqual(df.timeframe, expected_df.timeframe)
+
+    def test_load_uses_rollups(self):
+        filename = join(data_dir(), 'energy.h5')
+        ds = DataSet(filename)
+        elec = ds.buildings[1].elec
+        elec.clear_cache()
+        n_rollup_reads = {}
+        def counting(meter):
+            get_rollup = meter.get_rollup
+            def wrapper(*args, **kwargs):
+                n_rollup_reads[meter.identifier] += 1
+                return get_rollup(*args, **kwargs)
+            return wrapper
+        try:
+            elec.build_rollups()
+            kwargs = {'sample_period': 3600}
+            from_raw = pd.concat(list(elec.load(use_rollups=False, **kwargs)))
+            for meter in elec.meters:
+                meter.get_rollup = counting(meter)
+            for batched in [False, True]:
+                for meter in elec.meters:
+                    n_rollup_reads[meter.identifier] = 0
+                from_rollups = pd.concat(list(elec.load(batched=batched,
+                                                        **kwargs)))
+                for meter in elec.meters:
+                    self.assertGreater(n_rollup_reads[meter.identifier], 0)
+                loaded, expected = from_rollups.align(from_raw)
+                np.testing.assert_array_almost_equal(
+                    loaded.values, expected.values, decimal=3)
+        finally:
+            for meter in elec.meters:
+                meter.__dict__.pop('get_rollup', None)
+            elec.clear_cache()
+
+    def test_dataframe_of_meters_preallocate(self):
+        filename = join(data_dir(), 'energy.h5')
+        ds = DataSet(filename)
+        elec = ds.buildings[1].elec
+        expected = elec.dataframe_of_meters()
+        tmpdir = mkdtemp()
+        try:
+            memmap_filename = join(tmpdir, 'meters.dat')
+            for kwargs in [{'preallocate': True},
+                           {'memmap_filename': memmap_filename}]:
+                df = elec.dataframe_of_meters(**kwargs)
+                self.assertEqual(df.values.dtype, np.float32)
+                self.assertEqual(list(df.columns), list(elec.identifier.meters))
+                self.assertTrue(expected.index.isin(df.index).all())
+                for meter_id in expected.columns:
+                    np.testing.assert_array_almost_equal(
+                        df[meter_id].reindex(expected.index).values,
+                        expected[meter_id].values, decimal=2)
+                del df
+        finally:
+            rmtree(tmpdir)
         
 
 if __name__ == '__main__':
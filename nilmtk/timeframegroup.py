@@ -1,5 +1,4 @@
 from __future__ import print_function, division
-import matplotlib.pyplot as plt
 import pandas as pd
 from datetime import timedelta
 
@@ -19,6 +18,7 @@ class TimeFrameGroup(list):
         super(TimeFrameGroup, self).__init__(*args)
 
     def plot(self, ax=None, y=0, height=1, gap=0.05, color='b', **kwargs):
+        import matplotlib.pyplot as plt
         if ax is None:
             ax = plt.gca()
         ax.xaxis.axis_date()
@@ -1,16 +1,13 @@
 from __future__ import print_function, division
 import numpy as np
 import pandas as pd
-import networkx as nx
 from os.path import isdir, dirname, abspath
 from os import getcwd
 from inspect import currentframe, getfile, getsourcefile
 from sys import getfilesystemencoding, stdout
-from IPython.core.display import HTML, display
 from collections import OrderedDict
 import datetime
 import pytz
-from nilmtk.datastore import HDFDataStore, CSVDataStore
 
 
 def show_versions():
@@ -72,6 +69,7 @@ def tree_root(graph):
     graph : networkx.Graph
     """
     # from http://stackoverflow.com/a/4123177/732596
+    import networkx as nx
     assert isinstance(graph, nx.Graph)
     roots = [node for node, in_degree in graph.in_degree_iter()
              if in_degree == 0]
@@ -242,6 +240,7 @@ def dict_to_html(dictionary):
 
 
 def print_dict(dictionary):
+    from IPython.core.display import HTML, display
     html = dict_to_html(dictionary)
     display(HTML(html))
 
@@ -299,23 +298,41 @@ def timestamp_is_naive(timestamp):
         return False
 
 
+def copy_chunk(chunk):
+    """Returns a copy of `chunk` (a pd.DataFrame loaded from a
+    DataStore) with its `timeframe` and a copy of its `look_ahead`."""
+    chunk_copy = chunk.copy()
+    chunk_copy.timeframe = getattr(chunk, 'timeframe', None)
+    look_ahead = getattr(chunk, 'look_ahead', None)
+    if look_ahead is not None:
+        chunk_copy.look_ahead = look_ahead.copy()
+    return chunk_copy
+
+
 def get_datastore(filename, format, mode='a'):
     """
     Parameters
     ----------
     filename : string
-    format : 'CSV' or 'HDF'
+    format : 'CSV', 'HDF', 'PARQUET' or 'MMAP'
     mode : 'a' (append) or 'w' (write), optional
 
     Returns
     -------
     metadata : dict
     """
+    # Imported here because nilmtk.datastore imports nilmtk.utils.
+    from nilmtk.datastore import (HDFDataStore, CSVDataStore,
+                                  ParquetDataStore, MmapDataStore)
     if filename is not None:
         if format == 'HDF':
             return HDFDataStore(filename, mode)
         elif format == 'CSV':
             return CSVDataStore(filename)
+        elif format == 'PARQUET':
+            return ParquetDataStore(filename)
+        elif format == 'MMAP':
+            return MmapDataStore(filename)
         else:
             raise ValueError('format not recognised')
     else:
@@ -0,0 +1,209 @@
+from __future__ import print_function, division
+import numpy as np
+import pandas as pd
+
+
+class WiringTopology(object):
+    """The wiring hierarchy of a list of meters, stored as arrays so that
+    hierarchy queries do not need to build a networkx graph.
+
+    Nodes are ElecMeters.  There is an edge from each ElecMeter's
+    `upstream_meter()` to the ElecMeter (MeterGroups are flattened into
+    their ElecMeters).  Upstream meters which are not in `meters` are
+    still nodes (as in `MeterGroup.wiring_graph`).  ElecMeters without an
+    upstream meter and without any downstream meters are not nodes.
+
+    'submeter_of: 0' means the meter is directly downstream of mains.  If
+    `meters` contains exactly one site meter for the meter's building
+    then that site meter is used, without looking it up through
+    `nilmtk.global_meter_group`.
+
+    Build with `MeterGroup.wiring_topology()`, which caches the topology
+    until the MeterGroup's meters change.
+
+    Attributes
+    ----------
+    meters : list of ElecMeters and/or MeterGroups
+        The (top level) meters the topology was built from.
+    site_meters : list
+        Elements of `meters` which are site meters.
+    submeters : list
+        Elements of `meters` which are not site meters.
+    nodes : list of ElecMeters
+    parent : np.ndarray of ints
+        Index into `nodes` of each node's upstream meter, or -1 for roots.
+    children : list of lists of ints
+        Indices into `nodes` of each node's downstream meters, in the
+        order of `meters`.
+    depth : np.ndarray of ints
+        Number of meters upstream of each node (0 for roots).
+    """
+
+    def __init__(self, meters):
+        self.meters = list(meters)
+        self.site_meters = [meter for meter in self.meters
+                            if meter.is_site_meter()]
+        self.submeters = [meter for meter in self.meters
+                          if not meter.is_site_meter()]
+
+        # Use the objects in `meters` for nodes wherever possible.
+        elecmeters = _flatten(self.meters)
+        elecmeter_lookup = dict((meter, meter) for meter in elecmeters)
+        site_meters_per_building = {}
+        for meter in elecmeters:
+            if meter.is_site_meter():
+                building = _building_of(meter)
+                site_meters_per_building.setdefault(building, []).append(meter)
+        self.nodes = []
+        self._edges = []
+        self._node_index = {}
+        parents = []
+        for meter in elecmeters:
+            upstream_meter = _upstream_meter(meter, site_meters_per_building)
+            if upstream_meter is None:
+                continue
+            upstream_meter = elecmeter_lookup.get(upstream_meter,
+                                                  upstream_meter)
+            parent_i = self._add_node(upstream_meter, parents)
+            child_i = self._add_node(meter, parents)
+            parents[child_i] = parent_i
+            self._edges.append((parent_i, child_i))
+
+        self.parent = np.array(parents, dtype=np.int64)
+        self.children = [[] for _ in self.nodes]
+        for parent_i, child_i in self._edges:
+            self.children[parent_i].append(child_i)
+        self.depth = self._depths()
+
+    def _add_node(self, meter, parents):
+        try:
+            return self._node_index[meter]
+        except KeyError:
+            i = len(self.nodes)
+            self._node_index[meter] = i
+            self.nodes.append(meter)
+            parents.append(-1)
+            return i
+
+    def _depths(self):
+        depth = np.zeros(len(self.nodes), dtype=np.int64)
+        level = [i for i in range(len(self.nodes)) if self.parent[i] == -1]
+        current_depth = 0
+        while level:
+            depth[level] = current_depth
+            level = [child_i for i in level for child_i in self.children[i]]
+            current_depth += 1
+        return depth
+
+    def roots(self):
+        """Returns list of nodes with no upstream meter."""
+        return [self.nodes[i] for i in np.flatnonzero(self.parent == -1)]
+
+    def root(self):
+        """Returns the single root node.  Raises RuntimeError if there
+        is not exactly one root (as `nilmtk.utils.tree_root` does)."""
+        roots = self.roots()
+        if len(roots) > 1:
+            raise RuntimeError('Tree has more than one root!')
+        if not roots:
+            raise RuntimeError('Tree has no root!')
+        return roots[0]
+
+    def upstream_meter(self, meter):
+        """Returns the node upstream of `meter`, or None if `meter` is a
+        root or is not a node."""
+        i = self._node_index.get(meter)
+        if i is None or self.parent[i] == -1:
+            return
+        return self.nodes[self.parent[i]]
+
+    def downstream_meters(self, meter):
+        """Returns list of the nodes directly downstream of `meter`."""
+        i = self._node_index.get(meter)
+        if i is None:
+            return []
+        return [self.nodes[child_i] for child_i in self.children[i]]
+
+    def nodes_adjacent_to_root(self):
+        """Returns list of nodes directly downstream of the `root()`."""
+        return self.downstream_meters(self.root())
+
+    def levels(self):
+        """Returns list of lists of nodes.  Element `d` is the list of
+        nodes with `depth` d."""
+        levels = [[] for _ in range(self.depth.max() + 1 if self.nodes else 0)]
+        for node, depth in zip(self.nodes, self.depth):
+            levels[depth].append(node)
+        return levels
+
+    def sum_of_children(self, values):
+        """Sums the values of each node's direct children.
+
+        Parameters
+        ----------
+        values : pd.Series or dict
+            Maps meter identifiers (ElecMeterIDs) to numbers.  Missing
+            and NaN values are ignored.
+
+        Returns
+        -------
+        pd.Series indexed by the identifier of each node which has at
+        least one child with a value.
+        """
+        if isinstance(values, pd.Series):
+            values = dict(values.iteritems())
+        n_nodes = len(self.nodes)
+        if not n_nodes:
+            return pd.Series()
+        node_values = np.array(
+            [values.get(node.identifier, np.NaN) for node in self.nodes],
+            dtype=np.float64)
+        has_value = (self.parent >= 0) & ~np.isnan(node_values)
+        sums = np.bincount(self.parent[has_value],
+                           weights=node_values[has_value], minlength=n_nodes)
+        counts = np.bincount(self.parent[has_value], minlength=n_nodes)
+        parents = np.flatnonzero(counts)
+        return pd.Series(sums[parents],
+                         index=[self.nodes[i].identifier for i in parents])
+
+    def graph(self):
+        """Returns a new networkx.DiGraph of the topology."""
+        import networkx as nx
+        graph = nx.DiGraph()
+        for parent_i, child_i in self._edges:
+            graph.add_edge(self.nodes[parent_i], self.nodes[child_i])
+        return graph
+
+
+def _building_of(meter):
+    identifier = meter.identifier
+    if identifier is None:
+        return
+    return (identifier.building, identifier.dataset)
+
+
+def _upstream_meter(meter, site_meters_per_building):
+    """Returns `meter.upstream_meter()`, except that 'submeter_of: 0'
+    is resolved against `site_meters_per_building` where possible."""
+    metadata = meter.metadata
+    building = _building_of(meter)
+    if (building is not None and not meter.is_site_meter() and
+            metadata.get('submeter_of') == 0 and
+            metadata.get('upstream_meter_in_building') in (None, building[0])):
+        site_meters = site_meters_per_building.get(building, [])
+        if len(site_meters) == 1:
+            return site_meters[0]
+    return meter.upstream_meter(raise_warning=False)
+
+
+def _flatten(meters):
+    """Returns list of the ElecMeters in `meters` (descending into
+    MeterGroups)."""
+    elecmeters = []
+    for meter in meters:
+        nested_meters = getattr(meter, 'meters', None)
+        if nested_meters is None:
+            elecmeters.append(meter)
+        else:
+            elecmeters.extend(_flatten(nested_meters))
+    return elecmeters